@@ -1,10 +1,65 @@
-import json
-import os
-from datetime import datetime
+import argparse
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
 
-DATA_FILE = 'autoservice_data.json'
+from autoservice_core import AutoserviceService, ReservationLedger, ServiceError
+from autoservice_metrics import UntimedModule, metrics, timed
+from autoservice_reports import ReportEngine
+from autoservice_search import SEARCH_FIELDS, SearchIndex
+from autoservice_store import create_store
+from autoservice_widgets import AutocompleteCombobox, ChangeBus, TableSync, VirtualTable
+
+# Момент запуска - для замера времени до первой отрисовки окна
+STARTED = time.perf_counter()
+
+# Ожидание ответа пользователя в окнах сообщений не входит в замеры операций
+messagebox = UntimedModule(messagebox, metrics)
+
+# Содержимое вкладки строится при первом ее выборе; при запуске - только
+# содержимое видимой вкладки
+LAZY_TABS = True
+
+# Виртуальная прокрутка таблиц заказов и автомобилей: в таблице создаются
+# только строки видимого окна с запасом, всего не больше VIRTUAL_PAGE_SIZE
+VIRTUAL_TABLES = True
+VIRTUAL_PAGE_SIZE = 100
+
+# Остальные таблицы заполняются порциями по TABLE_CHUNK_SIZE строк из цикла
+# событий, чтобы окно не переставало отвечать; первые TABLE_FIRST_ROWS строк
+# (экран) показываются сразу
+TABLE_CHUNK_SIZE = 500
+TABLE_FIRST_ROWS = 100
+
+# Показывать окно до загрузки заказов: клиенты, автомобили и запчасти
+# загружаются сразу, заказы - в фоновом потоке (только в режиме журнала)
+LAZY_ORDERS = True
+
+# После загрузки заказов закрытые заказы старше ARCHIVE_AFTER_DAYS дней
+# (см. autoservice_archive.py) переносятся в архив по месяцам
+ARCHIVE_ON_START = True
+ORDERS_CURRENT = "Текущие"
+
+# Отчеты вкладки "Отчеты"; для отчетов по клиентам и запчастям
+# показываются первые REPORT_LIMIT строк
+REPORT_PERIODS = {
+    "Выручка по дням": 'day',
+    "Выручка по неделям": 'week',
+    "Выручка по месяцам": 'month'
+}
+REPORTS = list(REPORT_PERIODS) + [
+    "Выручка по статусам",
+    "Выручка по клиентам",
+    "Выручка по маркам",
+    "Запчасти по количеству",
+    "Запчасти по выручке"
+]
+REPORT_LIMIT = 100
+
+# Максимальное количество подсказок в полях выбора клиента и запчасти
+AUTOCOMPLETE_LIMIT = 50
 
 class AutoserviceApp:
     def __init__(self, root):
@@ -13,79 +68,403 @@ class AutoserviceApp:
         self.root.geometry("1000x600")
         
         # Инициализация данных
-        self.data = self.init_data()
-        self.selected_parts = []
+        self.store = self.init_data()
+        self.service = AutoserviceService(self.store)
+        self.reservation = ReservationLedger(self.store)
+        self.search_queries = {}
+        self.search_indexes = {}
+        self.search_results = {}
+        self.index_changes = {}
+        self.store.subscribe(self.on_record_changed)
+        # Вкладки обновляются только при показе (см. refresh_current_tab)
+        self.views = ChangeBus(on_dirty=self.schedule_refresh)
+        self.store.subscribe(self.views.on_change)
+        self.refresh_pending = None
+        self.reports = ReportEngine(self.store)
         self.total_var = tk.StringVar(value="0 руб.")
+        self.table_rows = {}
+        self.table_jobs = {}
+        self.orders_month = None
         
         # Создание вкладок
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(fill='both', expand=True)
         
-        # Создаем все необходимые вкладки
-        self.create_clients_tab()
-        self.create_cars_tab()
-        self.create_orders_tab()
-        self.create_parts_tab()
-        self.create_new_order_tab()
-        
-        self.update_all_tables()
+        # Создаем все необходимые вкладки (содержимое - см. build_tab)
+        self.tab_builders = {}
+        self.clients_tab = self.add_tab("Клиенты", self.create_clients_tab)
+        self.cars_tab = self.add_tab("Автомобили", self.create_cars_tab)
+        self.orders_tab = self.add_tab("Заказы", self.create_orders_tab)
+        self.parts_tab = self.add_tab("Запчасти", self.create_parts_tab)
+        self.new_order_tab = self.add_tab("Новый заказ", self.create_new_order_tab)
+        self.reports_tab = self.add_tab("Отчеты", self.create_reports_tab)
+        self.register_views()
+        if not LAZY_TABS:
+            self.build_tabs()
+        self.notebook.bind("<<NotebookTabChanged>>", lambda e: self.refresh_current_tab())
+        
+        if self.store.orders_loaded:
+            self.archive_orders()
+        self.refresh_current_tab()
+        if not self.store.orders_loaded:
+            self.load_orders_in_background()
+        self.build_search_indexes()
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.bind("<F12>", lambda e: self.show_diagnostics())
 
+    @timed()
     def init_data(self):
         """Инициализация данных"""
-        if not os.path.exists(DATA_FILE):
-            return {
-                'clients': [],
-                'cars': [],
-                'orders': [],
-                'parts': [],
-                'next_ids': {
-                    'client': 1,
-                    'car': 1,
-                    'order': 1,
-                    'part': 1
-                }
-            }
+        return create_store(lazy_orders=LAZY_ORDERS)
+    
+    def load_orders_in_background(self):
+        """Фоновая загрузка заказов с индикатором прогресса"""
+        for tab in (self.orders_tab, self.new_order_tab):
+            self.notebook.tab(tab, state='disabled')
+        
+        self.show_orders_status()
+        ttk.Label(self.status_frame, text="Загрузка заказов...").pack(side='left', padx=5)
+        self.orders_progress = ttk.Progressbar(self.status_frame, maximum=1.0, length=200)
+        self.orders_progress.pack(side='left', padx=5, pady=2)
+        
+        self.orders_queue = queue.Queue()
+        
+        def worker():
+            try:
+                for chunk in self.store.pending_orders:
+                    self.orders_queue.put(chunk)
+                self.orders_queue.put(None)
+            except Exception as e:
+                self.orders_queue.put(e)
+        
+        threading.Thread(target=worker, name='orders-loader', daemon=True).start()
+        self.root.after(50, self.poll_orders_loading)
+    
+    def poll_orders_loading(self):
+        """Прием загруженных порций заказов в главном потоке"""
+        for _ in range(5):
+            try:
+                item = self.orders_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, Exception):
+                self.orders_loading_failed(item)
+                return
+            if item is None:
+                self.store.orders_loaded = True
+                self.store.pending_orders = None
+                self.status_frame.destroy()
+                for tab in (self.orders_tab, self.new_order_tab):
+                    self.notebook.tab(tab, state='normal')
+                self.archive_orders()
+                self.views.mark(str(self.orders_tab))
+                return
+            orders, progress = item
+            self.store.extend('orders', orders)
+            self.orders_progress['value'] = progress
+        self.root.after(10, self.poll_orders_loading)
+    
+    def show_orders_status(self):
+        """Строка состояния под вкладками (для загрузки заказов)"""
+        self.status_frame = ttk.Frame(self.root)
+        self.status_frame.pack(side='bottom', fill='x', before=self.notebook)
+    
+    def orders_loading_failed(self, error):
+        """Ошибка фоновой загрузки заказов.
+
+        Частично загруженные заказы убираются из памяти, вкладки заказов
+        остаются недоступны, а в строке состояния видны ошибка и кнопка
+        повторной загрузки.
+        """
+        self.status_frame.destroy()
+        self.store.discard_orders()
+        self.show_orders_status()
+        ttk.Label(
+            self.status_frame, text=f"Не удалось загрузить заказы: {error}", foreground='red'
+        ).pack(side='left', padx=5)
+        ttk.Button(self.status_frame, text="Повторить", command=self.retry_orders_loading).pack(side='left', padx=5)
+        messagebox.showerror("Ошибка", f"Не удалось загрузить заказы: {error}")
+    
+    def retry_orders_loading(self):
+        """Повторная фоновая загрузка заказов после ошибки"""
         try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {
-                'clients': [],
-                'cars': [],
-                'orders': [],
-                'parts': [],
-                'next_ids': {
-                    'client': 1,
-                    'car': 1,
-                    'order': 1,
-                    'part': 1
-                }
-            }
+            self.store.reload_orders()
+        except Exception as e:
+            self.orders_loading_failed(e)
+            return
+        self.status_frame.destroy()
+        self.load_orders_in_background()
+    
+    @timed()
+    def archive_orders(self):
+        """Перенос старых закрытых заказов в архив"""
+        if not ARCHIVE_ON_START:
+            return
+        try:
+            if self.service.archive_closed_orders():
+                self.save_data()
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось перенести заказы в архив: {e}")
+    
+    def build_search_indexes(self):
+        """Построение поисковых индексов в фоновом потоке.
+
+        Поток строит индексы по копиям списков записей, а изменения,
+        сделанные за это время, запоминаются и применяются к готовому
+        индексу в главном потоке (см. install_search_index).
+        """
+        records = {entity: list(self.store.all(entity)) for entity in SEARCH_FIELDS}
+        self.index_changes = {entity: [] for entity in records}
+        self.index_queue = queue.Queue()
+        
+        def worker():
+            for entity, entity_records in records.items():
+                try:
+                    self.index_queue.put((entity, SearchIndex.build(entity, entity_records)))
+                except Exception:
+                    # Индекс будет построен заново в главном потоке
+                    self.index_queue.put((entity, None))
+        
+        threading.Thread(target=worker, name='search-indexer', daemon=True).start()
+        self.root.after(50, self.poll_search_indexes)
+    
+    def poll_search_indexes(self):
+        """Прием построенных поисковых индексов в главном потоке"""
+        while self.index_changes:
+            try:
+                entity, index = self.index_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.install_search_index(entity, index)
+        if self.index_changes:
+            self.root.after(50, self.poll_search_indexes)
+    
+    def install_search_index(self, entity, index):
+        """Применение к построенному индексу изменений, сделанных во время построения"""
+        changes = self.index_changes.pop(entity)
+        if index is None:
+            index = SearchIndex.build(entity, self.store.all(entity))
+        else:
+            for record_id, record in changes:
+                if record is None:
+                    index.remove(record_id)
+                else:
+                    index.update(record)
+        self.search_indexes[entity] = index
+        self.search_results.pop(entity, None)
+    
+    def on_record_changed(self, entity, record_id, record):
+        """Обновление поисковых индексов при изменении записи"""
+        if entity in self.index_changes:
+            self.index_changes[entity].append((record_id, record))
+        index = self.search_indexes.get(entity)
+        if index is not None:
+            if record is None:
+                index.remove(record_id)
+            else:
+                index.update(record)
+        self.search_results.pop(entity, None)
+    
+    def create_search_bar(self, toolbar, entity, update_table):
+        """Поле поиска на панели инструментов вкладки"""
+        search_var = tk.StringVar()
+        ttk.Entry(toolbar, textvariable=search_var, width=30).pack(side='right', padx=2)
+        ttk.Label(toolbar, text="Поиск:").pack(side='right', padx=2)
+        search_var.trace_add('write', lambda *args: self.search(entity, search_var.get(), update_table))
+    
+    def search(self, entity, query, update_table):
+        """Фильтрация таблицы вкладки по строке поиска"""
+        self.search_queries[entity] = query.strip()
+        self.search_results.pop(entity, None)
+        if entity == 'cars' and self.cars_view:
+            self.cars_view.offset = 0
+        update_table()
+    
+    def filtered_ids(self, entity):
+        """Отсортированные id записей, подходящих под строку поиска (None - без поиска)"""
+        query = self.search_queries.get(entity)
+        if not query:
+            return None
+        if entity not in self.search_results:
+            self.search_results[entity] = sorted(self.search_index(entity).search(query))
+        return self.search_results[entity]
+    
+    def search_index(self, entity):
+        """Поисковый индекс сущности.
+
+        Индексы строятся в фоне при запуске; поиск до окончания
+        построения ждет индекс своей сущности.
+        """
+        while entity in self.index_changes:
+            self.install_search_index(*self.index_queue.get())
+        return self.search_indexes[entity]
+    
+    def lookup(self, entity, query, limit, label, predicate=None):
+        """Первые limit записей, подходящих под строку, в виде (id, подпись).
+
+        predicate - дополнительный отбор записей.
+        """
+        query = query.strip()
+        if query:
+            ids = sorted(self.search_index(entity).search(query))
+            records = (self.store.get(entity, record_id) for record_id in ids)
+        else:
+            records = self.store.iter_records(entity)
+        matches = []
+        for record in records:
+            if predicate is None or predicate(record):
+                matches.append((record['id'], label(record)))
+                if len(matches) >= limit:
+                    break
+        return matches
+    
+    def client_label(self, client):
+        """Подпись клиента в поле выбора"""
+        return f"{client['id']} - {client['fio']}"
+    
+    def part_label(self, part):
+        """Подпись запчасти в поле выбора (остаток с учетом резерва)"""
+        return f"{part['id']} - {part['name']} ({part['price']} руб., {self.reservation.available(part)} шт.)"
+    
+    def lookup_clients(self, query, limit):
+        """Подсказки для поля выбора клиента"""
+        return self.lookup('clients', query, limit, self.client_label)
+    
+    def lookup_parts(self, query, limit):
+        """Подсказки для поля выбора запчасти: только имеющиеся в наличии"""
+        return self.lookup(
+            'parts', query, limit, self.part_label,
+            predicate=lambda part: self.reservation.available(part) > 0
+        )
     
+    def table_records(self, entity, start=0, stop=None):
+        """Записи для таблицы вкладки с учетом поиска"""
+        ids = self.filtered_ids(entity)
+        if ids is None:
+            if stop is None:
+                return self.store.all(entity)
+            return self.store.slice(entity, start, stop)
+        return [self.store.get(entity, record_id) for record_id in ids[start:stop]]
+    
+    def table_count(self, entity):
+        """Количество записей в таблице вкладки с учетом поиска"""
+        ids = self.filtered_ids(entity)
+        return self.store.count(entity) if ids is None else len(ids)
+    
+    def orders_not_loaded(self):
+        """Предупреждение, если заказы еще загружаются"""
+        if self.store.orders_loaded:
+            return False
+        messagebox.showwarning("Ошибка", "Заказы еще загружаются, повторите попытку позже")
+        return True
+    
+    @timed()
     def save_data(self):
-        """Сохранение данных в файл"""
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=4, ensure_ascii=False)
+        """Сохранение накопленных изменений"""
+        self.store.save()
     
-    def get_next_id(self, entity_type):
-        """Получение следующего ID"""
-        next_id = self.data['next_ids'][entity_type]
-        self.data['next_ids'][entity_type] += 1
-        return next_id
+    def on_close(self):
+        """Закрытие окна приложения"""
+        with metrics.timer('store.close'):
+            self.store.close()
+        self.root.destroy()
+
+    def add_tab(self, text, builder):
+        """Пустая вкладка; builder строит ее содержимое при первом выборе"""
+        tab = ttk.Frame(self.notebook)
+        self.notebook.add(tab, text=text)
+        self.tab_builders[str(tab)] = builder
+        return tab
     
-    def update_all_tables(self):
-        """Обновление всех таблиц"""
-        self.update_clients_table()
-        self.update_cars_table()
-        self.update_orders_table()
-        self.update_parts_table()
+    def build_tab(self, tab):
+        """Построение содержимого вкладки, если оно еще не построено"""
+        builder = self.tab_builders.pop(str(tab), None)
+        if builder is not None:
+            with metrics.timer(builder.__name__):
+                builder()
+    
+    def build_tabs(self):
+        """Построение содержимого всех вкладок"""
+        for tab in list(self.tab_builders):
+            self.build_tab(tab)
+    
+    def register_views(self):
+        """Вкладки и сущности, при изменении которых вкладку нужно обновить"""
+        self.views.register(str(self.clients_tab), ('clients',), self.update_clients_table)
+        self.views.register(str(self.cars_tab), ('cars', 'clients'), self.update_cars_table)
+        self.views.register(str(self.orders_tab), ('orders', 'clients', 'cars'), self.update_orders_table)
+        self.views.register(str(self.parts_tab), ('parts',), self.update_parts_table)
+        self.views.register(str(self.new_order_tab), ('clients', 'cars', 'parts'), self.update_new_order_form)
+    
+    def schedule_refresh(self):
+        """Обновление выбранной вкладки после завершения текущей операции"""
+        if self.refresh_pending is None:
+            self.refresh_pending = self.root.after_idle(self.refresh_current_tab)
+    
+    def refresh_current_tab(self):
+        """Построение выбранной вкладки и ее обновление, если ее данные изменились"""
+        self.refresh_pending = None
+        tab = self.notebook.select()
+        self.build_tab(tab)
+        self.views.refresh(tab)
+    
+    def sync_table(self, table, records, row):
+        """Применение к таблице только добавленных, измененных и удаленных строк.
+        
+        records - записи таблицы, row(запись) - значения строки; id записи
+        служит iid строки. Строки применяются порциями (см. TableSync);
+        незаконченное заполнение таблицы отменяется новым.
+        """
+        key = str(table)
+        job = self.table_jobs.pop(key, None)
+        if job is not None:
+            job.cancel()
+        job = TableSync(
+            table, self.table_rows.setdefault(key, {}), records, row,
+            TABLE_CHUNK_SIZE, TABLE_FIRST_ROWS, on_done=lambda: self.table_jobs.pop(key, None)
+        )
+        self.table_jobs[key] = job
+        job.start()
+    
+    def flush_tables(self):
+        """Заполнение таблиц до конца сразу, без цикла событий"""
+        for job in list(self.table_jobs.values()):
+            job.complete()
+    
+    def sync_changed_rows(self, table, entity, changes, row):
+        """Обновление строк таблицы только для измененных записей.
+        
+        Подходит для таблиц со всеми записями сущности в порядке id: новые
+        записи добавляются в конец. Возвращает False, если так обновить
+        нельзя (нет списка изменений, изменились другие сущности или
+        включен поиск, таблица еще заполняется) и ее нужно обновить целиком.
+        """
+        if changes is None or changes.keys() != {entity} or self.search_queries.get(entity):
+            return False
+        if str(table) in self.table_jobs:
+            # Таблица еще заполняется - заполняем заново
+            return False
+        shown = self.table_rows.setdefault(str(table), {})
+        for record_id in sorted(changes[entity]):
+            record = self.store.get(entity, record_id)
+            if record is None:
+                if record_id in shown:
+                    table.delete(record_id)
+                    del shown[record_id]
+                continue
+            values = row(record)
+            old_values = shown.get(record_id)
+            if old_values is None:
+                table.insert("", "end", iid=record_id, values=values)
+            elif old_values != values:
+                table.item(record_id, values=values)
+            shown[record_id] = values
+        return True
 
     # Методы для вкладки клиентов
     def create_clients_tab(self):
         """Вкладка клиентов"""
-        self.clients_tab = ttk.Frame(self.notebook)
-        self.notebook.add(self.clients_tab, text="Клиенты")
-        
         toolbar = ttk.Frame(self.clients_tab)
         toolbar.pack(fill='x', padx=5, pady=5)
         
@@ -98,6 +477,8 @@ class AutoserviceApp:
         del_btn = ttk.Button(toolbar, text="Удалить", command=self.delete_client)
         del_btn.pack(side='left', padx=2)
         
+        self.create_search_bar(toolbar, 'clients', self.update_clients_table)
+        
         columns = ("id", "fio", "phone", "email")
         self.clients_table = ttk.Treeview(self.clients_tab, columns=columns, show="headings")
         
@@ -112,18 +493,21 @@ class AutoserviceApp:
         self.clients_table.pack(fill='both', expand=True, padx=5, pady=5)
         scrollbar.pack(side='right', fill='y')
 
-    def update_clients_table(self):
-        """Обновление таблицы клиентов"""
-        for row in self.clients_table.get_children():
-            self.clients_table.delete(row)
-        
-        for client in self.data['clients']:
-            self.clients_table.insert("", "end", values=(
-                client['id'],
-                client['fio'],
-                client['phone'],
-                client['email']
-            ))
+    @timed()
+    def update_clients_table(self, changes=None):
+        """Обновление таблицы клиентов (changes - измененные записи, см. ChangeBus)"""
+        if self.sync_changed_rows(self.clients_table, 'clients', changes, self.client_row):
+            return
+        self.sync_table(self.clients_table, self.table_records('clients'), self.client_row)
+    
+    def client_row(self, client):
+        """Значения строки таблицы клиентов"""
+        return (
+            client['id'],
+            client['fio'],
+            client['phone'],
+            client['email']
+        )
     
     def add_client(self):
         """Добавление нового клиента"""
@@ -144,25 +528,25 @@ class AutoserviceApp:
         email_entry = ttk.Entry(dialog)
         email_entry.grid(row=2, column=1, padx=5, pady=5, sticky='we')
         
+        @timed('add_client.save')
         def save():
-            if not fio_entry.get().strip():
-                messagebox.showerror("Ошибка", "Введите ФИО клиента")
-                return
-                
-            client = {
-                'id': self.get_next_id('client'),
-                'fio': fio_entry.get().strip(),
-                'phone': phone_entry.get().strip(),
-                'email': email_entry.get().strip()
-            }
-            self.data['clients'].append(client)
+            try:
+                client = self.service.add_client(fio_entry.get(), phone_entry.get(), email_entry.get())
+            except ServiceError as e:
+                messagebox.showerror("Ошибка", str(e))
+                return None
+            
             self.save_data()
-            self.update_clients_table()
             dialog.destroy()
             messagebox.showinfo("Успех", "Клиент успешно добавлен")
             return client  # Возвращаем созданного клиента
         
-        save_btn = ttk.Button(dialog, text="Сохранить", command=lambda: [save(), self.add_car_dialog(save()['id'])])
+        def save_and_add_car():
+            client = save()
+            if client:
+                self.add_car_dialog(client['id'])
+        
+        save_btn = ttk.Button(dialog, text="Сохранить", command=save_and_add_car)
         save_btn.grid(row=3, column=1, padx=5, pady=5, sticky='e')
     
     def edit_client(self):
@@ -173,7 +557,7 @@ class AutoserviceApp:
             return
         
         client_id = self.clients_table.item(selected)['values'][0]
-        client = next(c for c in self.data['clients'] if c['id'] == client_id)
+        client = self.store.get('clients', client_id)
         
         dialog = tk.Toplevel(self.root)
         dialog.title("Редактирование клиента")
@@ -195,16 +579,15 @@ class AutoserviceApp:
         email_entry.insert(0, client['email'])
         email_entry.grid(row=2, column=1, padx=5, pady=5, sticky='we')
         
+        @timed('edit_client.save')
         def save():
-            if not fio_entry.get().strip():
-                messagebox.showerror("Ошибка", "Введите ФИО клиента")
+            try:
+                self.service.update_client(client_id, fio_entry.get(), phone_entry.get(), email_entry.get())
+            except ServiceError as e:
+                messagebox.showerror("Ошибка", str(e))
                 return
-                
-            client['fio'] = fio_entry.get().strip()
-            client['phone'] = phone_entry.get().strip()
-            client['email'] = email_entry.get().strip()
+            
             self.save_data()
-            self.update_clients_table()
             dialog.destroy()
             messagebox.showinfo("Успех", "Данные клиента обновлены")
         
@@ -222,29 +605,22 @@ class AutoserviceApp:
         client_id = self.clients_table.item(selected)['values'][0]
         
         # Проверка на связанные автомобили
-        client_cars = [c for c in self.data['cars'] if c['client_id'] == client_id]
-        if client_cars:
-            messagebox.showwarning(
-                "Ошибка", 
-                "Нельзя удалить клиента с привязанными автомобилями!\n"
-                f"У клиента {len(client_cars)} автомобилей."
-            )
+        try:
+            self.service.check_delete_client(client_id)
+        except ServiceError as e:
+            messagebox.showwarning("Ошибка", str(e))
             return
         
         if messagebox.askyesno(
             "Подтверждение", 
             "Вы уверены, что хотите удалить этого клиента?"
         ):
-            self.data['clients'] = [c for c in self.data['clients'] if c['id'] != client_id]
+            self.service.delete_client(client_id)
             self.save_data()
-            self.update_clients_table()
             messagebox.showinfo("Успех", "Клиент удален")
     
     def create_cars_tab(self):
         """Вкладка автомобилей"""
-        self.cars_tab = ttk.Frame(self.notebook)
-        self.notebook.add(self.cars_tab, text="Автомобили")
-        
         # Панель инструментов
         toolbar = ttk.Frame(self.cars_tab)
         toolbar.pack(fill='x', padx=5, pady=5)
@@ -258,11 +634,26 @@ class AutoserviceApp:
         del_btn = ttk.Button(toolbar, text="Удалить", command=self.delete_car)
         del_btn.pack(side='left', padx=2)
         
+        self.create_search_bar(toolbar, 'cars', self.update_cars_table)
+        
         # Таблица автомобилей
         columns = ("id", "vin", "brand", "model", "client_id", "client_fio")
-        self.cars_table = ttk.Treeview(
-            self.cars_tab, columns=columns, show="headings"
-        )
+        if VIRTUAL_TABLES:
+            self.cars_view = VirtualTable(
+                self.cars_tab, columns,
+                count=lambda: self.table_count('cars'),
+                rows=lambda start, stop: [
+                    (car['id'], self.car_row(car))
+                    for car in self.table_records('cars', start, stop)
+                ],
+                page_size=VIRTUAL_PAGE_SIZE
+            )
+            self.cars_table = self.cars_view.tree
+        else:
+            self.cars_view = None
+            self.cars_table = ttk.Treeview(
+                self.cars_tab, columns=columns, show="headings"
+            )
         
         self.cars_table.heading("id", text="ID")
         self.cars_table.heading("vin", text="VIN")
@@ -278,32 +669,36 @@ class AutoserviceApp:
         self.cars_table.column("client_id", width=70)
         self.cars_table.column("client_fio", width=150)
         
-        scrollbar = ttk.Scrollbar(
-            self.cars_tab, orient="vertical", command=self.cars_table.yview
-        )
-        self.cars_table.configure(yscrollcommand=scrollbar.set)
+        if self.cars_view:
+            scrollbar = self.cars_view.scrollbar
+        else:
+            scrollbar = ttk.Scrollbar(
+                self.cars_tab, orient="vertical", command=self.cars_table.yview
+            )
+            self.cars_table.configure(yscrollcommand=scrollbar.set)
         
         self.cars_table.pack(fill='both', expand=True, padx=5, pady=5)
         scrollbar.pack(side='right', fill='y')
     
-    def update_cars_table(self):
-        """Обновление таблицы автомобилей"""
-        for row in self.cars_table.get_children():
-            self.cars_table.delete(row)
-        
-        for car in self.data['cars']:
-            client = next(
-                (c for c in self.data['clients'] if c['id'] == car['client_id']), 
-                {'fio': 'Неизвестно'}
-            )
-            self.cars_table.insert("", "end", values=(
-                car['id'],
-                car['vin'],
-                car['brand'],
-                car['model'],
-                car['client_id'],
-                client['fio']
-            ))
+    @timed()
+    def update_cars_table(self, changes=None):
+        """Обновление таблицы автомобилей (окно виртуальной таблицы - целиком)"""
+        if self.cars_view:
+            self.cars_view.refresh()
+            return
+        self.sync_table(self.cars_table, self.table_records('cars'), self.car_row)
+    
+    def car_row(self, car):
+        """Значения строки таблицы автомобилей"""
+        client = self.store.get('clients', car['client_id'], {'fio': 'Неизвестно'})
+        return (
+            car['id'],
+            car['vin'],
+            car['brand'],
+            car['model'],
+            car['client_id'],
+            client['fio']
+        )
     
     def add_car_dialog(self, client_id=None):
         """Диалог добавления автомобиля"""
@@ -314,22 +709,20 @@ class AutoserviceApp:
         
         # Если client_id не указан, показываем выбор клиента
         if client_id is None:
-            if not self.data['clients']:
+            if not self.store.count('clients'):
                 messagebox.showerror("Ошибка", "Нет клиентов для привязки автомобиля")
                 dialog.destroy()
                 return
                 
             tk.Label(dialog, text="Клиент:").grid(row=0, column=0, padx=5, pady=5, sticky='e')
             client_var = tk.StringVar()
-            client_combobox = ttk.Combobox(
-                dialog, textvariable=client_var,
-                values=[f"{c['id']} - {c['fio']}" for c in self.data['clients']],
-                state="readonly"
+            client_combobox = AutocompleteCombobox(
+                dialog, self.lookup_clients, AUTOCOMPLETE_LIMIT, textvariable=client_var
             )
             client_combobox.grid(row=0, column=1, padx=5, pady=5, sticky='we')
-            client_combobox.current(0)
+            client_combobox.reset()
         else:
-            client = next((c for c in self.data['clients'] if c['id'] == client_id), None)
+            client = self.store.get('clients', client_id)
             if not client:
                 messagebox.showerror("Ошибка", "Клиент не найден")
                 dialog.destroy()
@@ -351,46 +744,23 @@ class AutoserviceApp:
         model_entry = ttk.Entry(dialog)
         model_entry.grid(row=3, column=1, padx=5, pady=5, sticky='we')
         
+        @timed('add_car_dialog.save')
         def save():
             if client_id is None:
-                try:
-                    selected_client = client_combobox.get().split(' - ')[0]
-                    current_client_id = int(selected_client)
-                except (ValueError, IndexError):
+                current_client_id = client_combobox.selected_id()
+                if current_client_id is None:
                     messagebox.showerror("Ошибка", "Выберите клиента")
                     return
             else:
                 current_client_id = client_id
             
-            vin = vin_entry.get().strip().upper()
-            brand = brand_entry.get().strip()
-            model = model_entry.get().strip()
-            
-            if not vin:
-                messagebox.showerror("Ошибка", "Введите VIN автомобиля")
-                return
-            if not brand:
-                messagebox.showerror("Ошибка", "Введите марку автомобиля")
-                return
-            if not model:
-                messagebox.showerror("Ошибка", "Введите модель автомобиля")
-                return
-            
-            # Проверка на уникальность VIN
-            if any(c['vin'].upper() == vin for c in self.data['cars']):
-                messagebox.showerror("Ошибка", "Автомобиль с таким VIN уже существует")
+            try:
+                self.service.add_car(current_client_id, vin_entry.get(), brand_entry.get(), model_entry.get())
+            except ServiceError as e:
+                messagebox.showerror("Ошибка", str(e))
                 return
             
-            car = {
-                'id': self.get_next_id('car'),
-                'vin': vin,
-                'brand': brand,
-                'model': model,
-                'client_id': current_client_id
-            }
-            self.data['cars'].append(car)
             self.save_data()
-            self.update_cars_table()
             dialog.destroy()
             messagebox.showinfo("Успех", "Автомобиль успешно добавлен")
         
@@ -406,8 +776,8 @@ class AutoserviceApp:
             return
         
         car_id = self.cars_table.item(selected)['values'][0]
-        car = next(c for c in self.data['cars'] if c['id'] == car_id)
-        client = next(c for c in self.data['clients'] if c['id'] == car['client_id'])
+        car = self.store.get('cars', car_id)
+        client = self.store.get('clients', car['client_id'])
         
         dialog = tk.Toplevel(self.root)
         dialog.title("Редактирование автомобиля")
@@ -433,31 +803,15 @@ class AutoserviceApp:
         model_entry.insert(0, car['model'])
         model_entry.grid(row=3, column=1, padx=5, pady=5, sticky='we')
         
+        @timed('edit_car.save')
         def save():
-            vin = vin_entry.get().strip().upper()
-            brand = brand_entry.get().strip()
-            model = model_entry.get().strip()
-            
-            if not vin:
-                messagebox.showerror("Ошибка", "Введите VIN автомобиля")
-                return
-            if not brand:
-                messagebox.showerror("Ошибка", "Введите марку автомобиля")
-                return
-            if not model:
-                messagebox.showerror("Ошибка", "Введите модель автомобиля")
-                return
-            
-            # Проверка на уникальность VIN (кроме текущего автомобиля)
-            if any(c['vin'].upper() == vin and c['id'] != car_id for c in self.data['cars']):
-                messagebox.showerror("Ошибка", "Автомобиль с таким VIN уже существует")
+            try:
+                self.service.update_car(car_id, vin_entry.get(), brand_entry.get(), model_entry.get())
+            except ServiceError as e:
+                messagebox.showerror("Ошибка", str(e))
                 return
             
-            car['vin'] = vin
-            car['brand'] = brand
-            car['model'] = model
             self.save_data()
-            self.update_cars_table()
             dialog.destroy()
             messagebox.showinfo("Успех", "Данные автомобиля обновлены")
         
@@ -475,29 +829,22 @@ class AutoserviceApp:
         car_id = self.cars_table.item(selected)['values'][0]
         
         # Проверка на связанные заказы
-        car_orders = [o for o in self.data['orders'] if o.get('car_id') == car_id]
-        if car_orders:
-            messagebox.showwarning(
-                "Ошибка", 
-                "Нельзя удалить автомобиль с привязанными заказами!\n"
-                f"У автомобиля {len(car_orders)} заказов."
-            )
+        try:
+            self.service.check_delete_car(car_id)
+        except ServiceError as e:
+            messagebox.showwarning("Ошибка", str(e))
             return
         
         if messagebox.askyesno(
             "Подтверждение", 
             "Вы уверены, что хотите удалить этот автомобиль?"
         ):
-            self.data['cars'] = [c for c in self.data['cars'] if c['id'] != car_id]
+            self.service.delete_car(car_id)
             self.save_data()
-            self.update_cars_table()
             messagebox.showinfo("Успех", "Автомобиль удален")
     
     def create_orders_tab(self):
         """Вкладка заказов"""
-        self.orders_tab = ttk.Frame(self.notebook)
-        self.notebook.add(self.orders_tab, text="Заказы")
-        
         # Панель инструментов
         toolbar = ttk.Frame(self.orders_tab)
         toolbar.pack(fill='x', padx=5, pady=5)
@@ -511,11 +858,36 @@ class AutoserviceApp:
         del_btn = ttk.Button(toolbar, text="Удалить", command=self.delete_order)
         del_btn.pack(side='left', padx=2)
         
+        # Выбор между текущими заказами и месяцем архива
+        self.orders_month_var = tk.StringVar(value=ORDERS_CURRENT)
+        self.orders_month_combobox = ttk.Combobox(
+            toolbar, textvariable=self.orders_month_var, width=12, state="readonly",
+            postcommand=lambda: self.orders_month_combobox.configure(
+                values=[ORDERS_CURRENT] + self.store.archived_months()[::-1]
+            )
+        )
+        self.orders_month_combobox.pack(side='right', padx=2)
+        self.orders_month_combobox.bind("<<ComboboxSelected>>", lambda e: self.select_orders_month())
+        ttk.Label(toolbar, text="Показать:").pack(side='right', padx=2)
+        
         # Таблица заказов
         columns = ("id", "date", "client", "car", "status", "total")
-        self.orders_table = ttk.Treeview(
-            self.orders_tab, columns=columns, show="headings"
-        )
+        if VIRTUAL_TABLES:
+            self.orders_view = VirtualTable(
+                self.orders_tab, columns,
+                count=self.orders_count,
+                rows=lambda start, stop: [
+                    (order['id'], self.order_row(order))
+                    for order in self.orders_slice(start, stop)
+                ],
+                page_size=VIRTUAL_PAGE_SIZE
+            )
+            self.orders_table = self.orders_view.tree
+        else:
+            self.orders_view = None
+            self.orders_table = ttk.Treeview(
+                self.orders_tab, columns=columns, show="headings"
+            )
         
         self.orders_table.heading("id", text="ID")
         self.orders_table.heading("date", text="Дата")
@@ -531,36 +903,61 @@ class AutoserviceApp:
         self.orders_table.column("status", width=100)
         self.orders_table.column("total", width=80)
         
-        scrollbar = ttk.Scrollbar(
-            self.orders_tab, orient="vertical", command=self.orders_table.yview
-        )
-        self.orders_table.configure(yscrollcommand=scrollbar.set)
+        if self.orders_view:
+            scrollbar = self.orders_view.scrollbar
+        else:
+            scrollbar = ttk.Scrollbar(
+                self.orders_tab, orient="vertical", command=self.orders_table.yview
+            )
+            self.orders_table.configure(yscrollcommand=scrollbar.set)
         
         self.orders_table.pack(fill='both', expand=True, padx=5, pady=5)
         scrollbar.pack(side='right', fill='y')
     
-    def update_orders_table(self):
-        """Обновление таблицы заказов"""
-        for row in self.orders_table.get_children():
-            self.orders_table.delete(row)
-        
-        for order in self.data['orders']:
-            client = next(
-                (c for c in self.data['clients'] if c['id'] == order['client_id']), 
-                {'fio': 'Неизвестно'}
-            )
-            car = next(
-                (c for c in self.data['cars'] if c['id'] == order.get('car_id')), 
-                {'brand': '?', 'model': '?', 'vin': '?'}
-            )
-            self.orders_table.insert("", "end", values=(
-                order['id'],
-                order['date'],
-                client['fio'],
-                f"{car['brand']} {car['model']} ({car['vin']})",
-                order['status'],
-                f"{order['total']} руб."
-            ))
+    @timed()
+    def update_orders_table(self, changes=None):
+        """Обновление таблицы заказов (окно виртуальной таблицы - целиком)"""
+        if self.orders_view:
+            self.orders_view.refresh()
+            return
+        self.sync_table(self.orders_table, self.orders_slice(0, None), self.order_row)
+    
+    def select_orders_month(self):
+        """Переключение таблицы заказов между текущими и месяцем архива"""
+        month = self.orders_month_var.get()
+        self.orders_month = None if month == ORDERS_CURRENT else month
+        if self.orders_view:
+            self.orders_view.offset = 0
+        self.update_orders_table()
+    
+    def orders_count(self):
+        """Количество заказов в таблице"""
+        if self.orders_month is None:
+            return self.store.count('orders')
+        return len(self.store.archived_orders(self.orders_month))
+    
+    def orders_slice(self, start, stop):
+        """Заказы таблицы: текущие или выбранного месяца архива (читается при первом просмотре)"""
+        if self.orders_month is None:
+            if stop is None:
+                return self.store.all('orders')
+            return self.store.slice('orders', start, stop)
+        return self.store.archived_orders(self.orders_month)[start:stop]
+    
+    def order_row(self, order):
+        """Значения строки таблицы заказов"""
+        client = self.store.get('clients', order['client_id'], {'fio': 'Неизвестно'})
+        car = self.store.get(
+            'cars', order.get('car_id'), {'brand': '?', 'model': '?', 'vin': '?'}
+        )
+        return (
+            order['id'],
+            order['date'],
+            client['fio'],
+            f"{car['brand']} {car['model']} ({car['vin']})",
+            order['status'],
+            f"{order['total']} руб."
+        )
     
     def view_order(self):
         """Просмотр деталей заказа"""
@@ -570,9 +967,9 @@ class AutoserviceApp:
             return
         
         order_id = self.orders_table.item(selected)['values'][0]
-        order = next(o for o in self.data['orders'] if o['id'] == order_id)
-        client = next(c for c in self.data['clients'] if c['id'] == order['client_id'])
-        car = next(c for c in self.data['cars'] if c['id'] == order.get('car_id'))
+        order = self.store.get('orders', order_id) or self.store.get_archived_order(order_id)
+        client = self.store.get('clients', order['client_id'])
+        car = self.store.get('cars', order.get('car_id'))
         
         dialog = tk.Toplevel(self.root)
         dialog.title(f"Заказ №{order_id}")
@@ -634,7 +1031,11 @@ class AutoserviceApp:
             return
         
         order_id = self.orders_table.item(selected)['values'][0]
-        order = next(o for o in self.data['orders'] if o['id'] == order_id)
+        try:
+            order = self.service.get_order(order_id)
+        except ServiceError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
         
         dialog = tk.Toplevel(self.root)
         dialog.title("Изменение статуса заказа")
@@ -649,10 +1050,14 @@ class AutoserviceApp:
         ttk.Radiobutton(dialog, text="Готово", variable=status_var, value="готово").pack(anchor='w')
         ttk.Radiobutton(dialog, text="Отменен", variable=status_var, value="отменен").pack(anchor='w')
         
+        @timed('change_order_status.save')
         def save():
-            order['status'] = status_var.get()
+            try:
+                self.service.change_order_status(order_id, status_var.get())
+            except ServiceError as e:
+                messagebox.showerror("Ошибка", str(e))
+                return
             self.save_data()
-            self.update_orders_table()
             dialog.destroy()
             messagebox.showinfo("Успех", "Статус заказа обновлен")
         
@@ -672,27 +1077,17 @@ class AutoserviceApp:
             "Вы уверены, что хотите удалить этот заказ?\n"
             "Это действие нельзя отменить."
         ):
-            # Возвращаем запчасти на склад
-            order = next(o for o in self.data['orders'] if o['id'] == order_id)
-            for part_in_order in order.get('parts', []):
-                part = next(
-                    (p for p in self.data['parts'] if p['id'] == part_in_order['part_id']), 
-                    None
-                )
-                if part:
-                    part['quantity'] += part_in_order['quantity']
-            
-            self.data['orders'] = [o for o in self.data['orders'] if o['id'] != order_id]
+            # Запчасти заказа возвращаются на склад
+            try:
+                self.service.delete_order(order_id)
+            except ServiceError as e:
+                messagebox.showerror("Ошибка", str(e))
+                return
             self.save_data()
-            self.update_orders_table()
-            self.update_parts_table()
             messagebox.showinfo("Успех", "Заказ удален")
     
     def create_parts_tab(self):
         """Вкладка запчастей"""
-        self.parts_tab = ttk.Frame(self.notebook)
-        self.notebook.add(self.parts_tab, text="Запчасти")
-        
         # Панель инструментов
         toolbar = ttk.Frame(self.parts_tab)
         toolbar.pack(fill='x', padx=5, pady=5)
@@ -706,6 +1101,8 @@ class AutoserviceApp:
         del_btn = ttk.Button(toolbar, text="Удалить", command=self.delete_part)
         del_btn.pack(side='left', padx=2)
         
+        self.create_search_bar(toolbar, 'parts', self.update_parts_table)
+        
         # Таблица запчастей
         columns = ("id", "name", "price", "quantity")
         self.parts_table = ttk.Treeview(
@@ -730,18 +1127,21 @@ class AutoserviceApp:
         self.parts_table.pack(fill='both', expand=True, padx=5, pady=5)
         scrollbar.pack(side='right', fill='y')
     
-    def update_parts_table(self):
-        """Обновление таблицы запчастей"""
-        for row in self.parts_table.get_children():
-            self.parts_table.delete(row)
-        
-        for part in self.data['parts']:
-            self.parts_table.insert("", "end", values=(
-                part['id'],
-                part['name'],
-                f"{part['price']} руб.",
-                part['quantity']
-            ))
+    @timed()
+    def update_parts_table(self, changes=None):
+        """Обновление таблицы запчастей (changes - измененные записи, см. ChangeBus)"""
+        if self.sync_changed_rows(self.parts_table, 'parts', changes, self.part_row):
+            return
+        self.sync_table(self.parts_table, self.table_records('parts'), self.part_row)
+    
+    def part_row(self, part):
+        """Значения строки таблицы запчастей"""
+        return (
+            part['id'],
+            part['name'],
+            f"{part['price']} руб.",
+            part['quantity']
+        )
     
     def add_part(self):
         """Добавление запчасти"""
@@ -762,35 +1162,20 @@ class AutoserviceApp:
         quantity_entry = ttk.Entry(dialog)
         quantity_entry.grid(row=2, column=1, padx=5, pady=5, sticky='we')
         
+        @timed('add_part.save')
         def save():
             try:
                 name = name_entry.get().strip()
                 price = float(price_entry.get())
                 quantity = int(quantity_entry.get())
-                
-                if not name:
-                    messagebox.showerror("Ошибка", "Введите название запчасти")
-                    return
-                if price <= 0:
-                    messagebox.showerror("Ошибка", "Цена должна быть больше 0")
-                    return
-                if quantity < 0:
-                    messagebox.showerror("Ошибка", "Количество не может быть отрицательным")
-                    return
-                
-                part = {
-                    'id': self.get_next_id('part'),
-                    'name': name,
-                    'price': price,
-                    'quantity': quantity
-                }
-                self.data['parts'].append(part)
+                self.service.add_part(name, price, quantity)
                 self.save_data()
-                self.update_parts_table()
                 dialog.destroy()
                 messagebox.showinfo("Успех", "Запчасть успешно добавлена")
             except ValueError:
                 messagebox.showerror("Ошибка", "Введите корректные числовые значения для цены и количества")
+            except ServiceError as e:
+                messagebox.showerror("Ошибка", str(e))
         
         ttk.Button(dialog, text="Сохранить", command=save).grid(
             row=3, column=1, padx=5, pady=5, sticky='e'
@@ -804,7 +1189,7 @@ class AutoserviceApp:
             return
         
         part_id = self.parts_table.item(selected)['values'][0]
-        part = next(p for p in self.data['parts'] if p['id'] == part_id)
+        part = self.store.get('parts', part_id)
         
         dialog = tk.Toplevel(self.root)
         dialog.title("Редактирование запчасти")
@@ -826,31 +1211,20 @@ class AutoserviceApp:
         quantity_entry.insert(0, str(part['quantity']))
         quantity_entry.grid(row=2, column=1, padx=5, pady=5, sticky='we')
         
+        @timed('edit_part.save')
         def save():
             try:
                 name = name_entry.get().strip()
                 price = float(price_entry.get())
                 quantity = int(quantity_entry.get())
-                
-                if not name:
-                    messagebox.showerror("Ошибка", "Введите название запчасти")
-                    return
-                if price <= 0:
-                    messagebox.showerror("Ошибка", "Цена должна быть больше 0")
-                    return
-                if quantity < 0:
-                    messagebox.showerror("Ошибка", "Количество не может быть отрицательным")
-                    return
-                
-                part['name'] = name
-                part['price'] = price
-                part['quantity'] = quantity
+                self.service.update_part(part_id, name, price, quantity)
                 self.save_data()
-                self.update_parts_table()
                 dialog.destroy()
                 messagebox.showinfo("Успех", "Данные запчасти обновлены")
             except ValueError:
                 messagebox.showerror("Ошибка", "Введите корректные числовые значения для цены и количества")
+            except ServiceError as e:
+                messagebox.showerror("Ошибка", str(e))
         
         ttk.Button(dialog, text="Сохранить", command=save).grid(
             row=3, column=1, padx=5, pady=5, sticky='e'
@@ -866,36 +1240,22 @@ class AutoserviceApp:
         part_id = self.parts_table.item(selected)['values'][0]
         
         # Проверка на использование в заказах
-        part_in_orders = False
-        for order in self.data['orders']:
-            for part in order.get('parts', []):
-                if part['part_id'] == part_id:
-                    part_in_orders = True
-                    break
-            if part_in_orders:
-                break
-        
-        if part_in_orders:
-            messagebox.showwarning(
-                "Ошибка", 
-                "Нельзя удалить запчасть, которая используется в заказах!"
-            )
+        try:
+            self.service.check_delete_part(part_id)
+        except ServiceError as e:
+            messagebox.showwarning("Ошибка", str(e))
             return
         
         if messagebox.askyesno(
             "Подтверждение", 
             "Вы уверены, что хотите удалить эту запчасть?"
         ):
-            self.data['parts'] = [p for p in self.data['parts'] if p['id'] != part_id]
+            self.service.delete_part(part_id)
             self.save_data()
-            self.update_parts_table()
             messagebox.showinfo("Успех", "Запчасть удалена")
     
     def create_new_order_tab(self):
         """Вкладка создания нового заказа"""
-        self.new_order_tab = ttk.Frame(self.notebook)
-        self.notebook.add(self.new_order_tab, text="Новый заказ")
-        
         main_frame = ttk.Frame(self.new_order_tab)
         main_frame.pack(fill='both', expand=True, padx=5, pady=5)
         
@@ -913,14 +1273,10 @@ class AutoserviceApp:
         # Выбор клиента
         ttk.Label(scrollable_frame, text="Клиент:").grid(row=0, column=0, padx=5, pady=5, sticky='e')
         self.client_var = tk.StringVar()
-        self.client_combobox = ttk.Combobox(
-            scrollable_frame, textvariable=self.client_var,
-            values=[f"{c['id']} - {c['fio']}" for c in self.data['clients']],
-            state="readonly"
+        self.client_combobox = AutocompleteCombobox(
+            scrollable_frame, self.lookup_clients, AUTOCOMPLETE_LIMIT, textvariable=self.client_var
         )
         self.client_combobox.grid(row=0, column=1, padx=5, pady=5, sticky='we')
-        if self.data['clients']:
-            self.client_combobox.current(0)
         
         # Выбор автомобиля
         ttk.Label(scrollable_frame, text="Автомобиль:").grid(row=1, column=0, padx=5, pady=5, sticky='e')
@@ -929,6 +1285,7 @@ class AutoserviceApp:
         self.car_combobox.grid(row=1, column=1, padx=5, pady=5, sticky='we')
         
         self.client_combobox.bind("<<ComboboxSelected>>", self.update_cars_combobox)
+        self.client_combobox.bind("<KeyRelease>", self.update_cars_combobox, add=True)
         
         # Работы
         ttk.Label(scrollable_frame, text="Работы:").grid(row=2, column=0, padx=5, pady=5, sticky='ne')
@@ -962,10 +1319,8 @@ class AutoserviceApp:
         ttk.Label(parts_toolbar, text="Добавить запчасть:").pack(side='left')
         
         self.part_var = tk.StringVar()
-        self.part_combobox = ttk.Combobox(
-            parts_toolbar, textvariable=self.part_var,
-            values=[f"{p['id']} - {p['name']} ({p['price']} руб., {p['quantity']} шт.)" for p in self.data['parts']],
-            width=30, state="readonly"
+        self.part_combobox = AutocompleteCombobox(
+            parts_toolbar, self.lookup_parts, AUTOCOMPLETE_LIMIT, textvariable=self.part_var, width=30
         )
         self.part_combobox.pack(side='left', padx=5)
         
@@ -991,89 +1346,62 @@ class AutoserviceApp:
             row=7, column=1, padx=5, pady=10, sticky='e'
         )
         
-        self.selected_parts = []
-        self.update_cars_combobox()
-        self.update_parts_combobox()
+        self.reservation.clear()
+
+    @timed()
+    def update_new_order_form(self, changes=None):
+        """Обновление полей выбора вкладки нового заказа (changes - измененные записи, см. ChangeBus)"""
+        client_id = self.client_combobox.selected_id()
+        client = self.store.get('clients', client_id) if client_id is not None else None
+        if client is None:
+            self.client_combobox.reset()
+        elif changes is None or client_id in changes.get('clients', ()):
+            self.client_combobox.select(client_id, self.client_label(client))
+        if changes is None or 'cars' in changes or client is None:
+            self.update_cars_combobox()
+        if changes is None or 'parts' in changes:
+            self.update_parts_combobox()
 
     def update_cars_combobox(self, event=None):
-        """Обновление списка автомобилей при выборе клиента"""
-        selected_client = self.client_combobox.get().split(' - ')[0]
-        if not selected_client.isdigit():
-            return
-        
-        client_id = int(selected_client)
-        client_cars = [c for c in self.data['cars'] if c['client_id'] == client_id]
+        """Обновление списка автомобилей выбранного клиента (выбранный автомобиль сохраняется)"""
+        client_id = self.client_combobox.selected_id()
+        client_cars = self.store.cars_of_client(client_id) if client_id is not None else []
         
+        current = self.car_combobox.get().split(' - ')[0]
         self.car_combobox['values'] = [f"{c['id']} - {c['brand']} {c['model']} ({c['vin']})" for c in client_cars]
-        if client_cars:
+        ids = [str(c['id']) for c in client_cars]
+        if current in ids:
+            self.car_combobox.current(ids.index(current))
+        elif client_cars:
             self.car_combobox.current(0)
         else:
             self.car_combobox.set('')
     
+    @timed()
     def update_parts_combobox(self):
         """Обновление списка доступных запчастей"""
-        available_parts = []
-        for part in self.data['parts']:
-            # Проверяем, сколько уже добавлено этой запчасти в заказ
-            added_quantity = sum(p['quantity'] for p in self.selected_parts if p['part_id'] == part['id'])
-            available_quantity = part['quantity'] - added_quantity
-            
-            if available_quantity > 0:
-                available_parts.append(
-                    f"{part['id']} - {part['name']} ({part['price']} руб., {available_quantity} шт.)"
-                )
-        
-        self.part_combobox['values'] = available_parts
-        if available_parts:
-            self.part_combobox.current(0)
-        else:
-            self.part_combobox.set('')
+        self.part_combobox.reset()
 
     def add_part_to_order(self):
         """Добавление запчасти к заказу"""
-        part_str = self.part_combobox.get()
-        if not part_str:
+        part_id = self.part_combobox.selected_id()
+        if part_id is None:
             messagebox.showwarning("Ошибка", "Выберите запчасть")
             return
         
         try:
-            part_id = int(part_str.split(' - ')[0])
             quantity = int(self.part_quantity.get())
         except (ValueError, IndexError):
             messagebox.showerror("Ошибка", "Некорректные данные")
             return
         
-        if quantity <= 0:
-            messagebox.showerror("Ошибка", "Количество должно быть больше 0")
-            return
-        
-        part = next((p for p in self.data['parts'] if p['id'] == part_id), None)
-        if not part:
-            messagebox.showerror("Ошибка", "Запчасть не найдена")
-            return
-        
-        # Проверяем доступное количество
-        added_quantity = sum(p['quantity'] for p in self.selected_parts if p['part_id'] == part_id)
-        available_quantity = part['quantity'] - added_quantity
-        
-        if quantity > available_quantity:
-            messagebox.showerror("Ошибка", 
-                f"Недостаточно запчастей на складе. Доступно: {available_quantity}")
+        # Резервируем с проверкой доступного количества
+        try:
+            self.service.reserve(self.reservation, part_id, quantity)
+        except ServiceError as e:
+            messagebox.showerror("Ошибка", str(e))
             return
         
-        # Проверяем, не добавлена ли уже эта запчасть
-        for item in self.selected_parts:
-            if item['part_id'] == part_id:
-                item['quantity'] += quantity
-                break
-        else:
-            self.selected_parts.append({
-                'part_id': part_id,
-                'name': part['name'],
-                'price': part['price'],
-                'quantity': quantity
-            })
-        
         # Обновляем таблицу
         self.update_selected_parts_table()
         self.update_parts_combobox()
@@ -1086,20 +1414,20 @@ class AutoserviceApp:
             messagebox.showwarning("Ошибка", "Выберите запчасть для удаления")
             return
         
-        part_name = self.selected_parts_table.item(selected)['values'][0]
-        self.selected_parts = [p for p in self.selected_parts if p['name'] != part_name]
+        self.reservation.release(int(selected))
         
         self.update_selected_parts_table()
         self.update_parts_combobox()
         self.calculate_total()
 
+    @timed()
     def update_selected_parts_table(self):
         """Обновление таблицы выбранных запчастей"""
         for row in self.selected_parts_table.get_children():
             self.selected_parts_table.delete(row)
         
-        for part in self.selected_parts:
-            self.selected_parts_table.insert("", "end", values=(
+        for part in self.reservation.lines():
+            self.selected_parts_table.insert("", "end", iid=part['part_id'], values=(
                 part['name'],
                 f"{part['price']} руб.",
                 part['quantity'],
@@ -1108,24 +1436,20 @@ class AutoserviceApp:
 
     def calculate_total(self):
         """Расчет общей суммы заказа"""
-        parts_cost = sum(p['price'] * p['quantity'] for p in self.selected_parts)
         works = self.works_text.get("1.0", "end-1c").split('\n')
         works = [w.strip() for w in works if w.strip()]
-        works_cost = len(works) * 1000  # Условная стоимость работы
-        total = parts_cost + works_cost
-        self.total_var.set(f"{total} руб.")
+        self.total_var.set(f"{self.service.order_total(works, self.reservation)} руб.")
 
+    @timed()
     def save_new_order(self):
         """Сохранение нового заказа"""
         try:
             # Проверка клиента
-            client_str = self.client_combobox.get()
-            if not client_str:
+            client_id = self.client_combobox.selected_id()
+            if client_id is None:
                 messagebox.showerror("Ошибка", "Выберите клиента")
                 return
             
-            client_id = int(client_str.split(' - ')[0])
-            
             # Проверка автомобиля
             car_str = self.car_combobox.get()
             if not car_str:
@@ -1134,62 +1458,21 @@ class AutoserviceApp:
             
             car_id = int(car_str.split(' - ')[0])
             
-            # Получаем работы
+            # Создаем заказ со списанием запчастей со склада (всех или ни одной)
             works = self.works_text.get("1.0", "end-1c").split('\n')
-            works = [w.strip() for w in works if w.strip()]
-            
-            # Проверяем, что есть либо работы, либо запчасти
-            if not works and not self.selected_parts:
-                messagebox.showerror("Ошибка", "Добавьте работы или запчасти")
+            try:
+                order = self.service.create_order(client_id, car_id, works, self.reservation)
+            except ServiceError as e:
+                messagebox.showerror("Ошибка", str(e))
                 return
-            
-            # Проверяем доступность всех запчастей
-            for part in self.selected_parts:
-                db_part = next((p for p in self.data['parts'] if p['id'] == part['part_id']), None)
-                if not db_part or db_part['quantity'] < part['quantity']:
-                    messagebox.showerror("Ошибка", 
-                        f"Недостаточно запчастей '{part['name']}' на складе")
-                    return
-            
-            # Создаем заказ
-            order = {
-                'id': self.get_next_id('order'),
-                'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'client_id': client_id,
-                'car_id': car_id,
-                'works': works,
-                'parts': [{
-                    'part_id': p['part_id'],
-                    'name': p['name'],
-                    'price': p['price'],
-                    'quantity': p['quantity']
-                } for p in self.selected_parts],
-                'status': 'в работе',
-                'total': int(self.total_var.get().split()[0])
-            }
-            
-            # Уменьшаем количество запчастей на складе
-            for part_in_order in self.selected_parts:
-                part = next((p for p in self.data['parts'] if p['id'] == part_in_order['part_id']), None)
-                if part:
-                    part['quantity'] -= part_in_order['quantity']
-            
-            # Добавляем заказ
-            self.data['orders'].append(order)
             self.save_data()
             
             # Очищаем форму
             self.works_text.delete("1.0", "end")
             for row in self.selected_parts_table.get_children():
                 self.selected_parts_table.delete(row)
-            self.selected_parts.clear()
             self.total_var.set("0 руб.")
             
-            # Обновляем таблицы
-            self.update_orders_table()
-            self.update_parts_table()
-            self.update_parts_combobox()
-            
             messagebox.showinfo("Успех", f"Заказ №{order['id']} успешно создан!")
             
         except ValueError as e:
@@ -1197,7 +1480,128 @@ class AutoserviceApp:
         except Exception as e:
             messagebox.showerror("Ошибка", f"Произошла ошибка: {str(e)}")
 
+    # Методы для вкладки отчетов
+    def create_reports_tab(self):
+        """Вкладка отчетов"""
+        # Панель инструментов
+        toolbar = ttk.Frame(self.reports_tab)
+        toolbar.pack(fill='x', padx=5, pady=5)
+        
+        ttk.Label(toolbar, text="Отчет:").pack(side='left', padx=2)
+        self.report_var = tk.StringVar(value=REPORTS[0])
+        report_combobox = ttk.Combobox(
+            toolbar, textvariable=self.report_var, values=REPORTS, width=40, state="readonly"
+        )
+        report_combobox.pack(side='left', padx=2)
+        report_combobox.bind("<<ComboboxSelected>>", lambda e: self.update_report_table())
+        
+        ttk.Button(toolbar, text="Обновить", command=self.update_report_table).pack(side='left', padx=2)
+        
+        # Таблица отчета
+        columns = ("name", "count", "amount")
+        self.report_table = ttk.Treeview(self.reports_tab, columns=columns, show="headings")
+        
+        self.report_table.column("name", width=300)
+        self.report_table.column("count", width=150)
+        self.report_table.column("amount", width=150)
+        
+        scrollbar = ttk.Scrollbar(
+            self.reports_tab, orient="vertical", command=self.report_table.yview
+        )
+        self.report_table.configure(yscrollcommand=scrollbar.set)
+        
+        self.report_table.pack(fill='both', expand=True, padx=5, pady=5)
+        scrollbar.pack(side='right', fill='y')
+    
+    def report_rows(self, report):
+        """Заголовки и строки отчета"""
+        if report in REPORT_PERIODS:
+            rows = self.reports.revenue_by_period(REPORT_PERIODS[report])
+            return ("Период", "Заказов", "Выручка"), rows
+        if report == "Выручка по статусам":
+            return ("Статус", "Заказов", "Выручка"), self.reports.revenue_by_status()
+        if report == "Выручка по клиентам":
+            rows = []
+            for client_id, count, revenue in self.reports.revenue_by_client(REPORT_LIMIT):
+                client = self.store.get('clients', client_id)
+                rows.append((client['fio'] if client else "Неизвестно", count, revenue))
+            return ("Клиент", "Заказов", "Выручка"), rows
+        if report == "Выручка по маркам":
+            rows = [(brand or "Неизвестно", count, revenue)
+                    for brand, count, revenue in self.reports.revenue_by_brand()]
+            return ("Марка", "Заказов", "Выручка"), rows
+        by = 'quantity' if report == "Запчасти по количеству" else 'revenue'
+        rows = [(name, quantity, revenue)
+                for part_id, name, quantity, revenue in self.reports.top_parts(by, REPORT_LIMIT)]
+        return ("Запчасть", "Количество", "Выручка"), rows
+    
+    @timed()
+    def update_report_table(self):
+        """Построение выбранного отчета"""
+        if self.orders_not_loaded():
+            return
+        headings, rows = self.report_rows(self.report_var.get())
+        for column, text in zip(("name", "count", "amount"), headings):
+            self.report_table.heading(column, text=text)
+        self.report_table.delete(*self.report_table.get_children())
+        for name, count, amount in rows:
+            self.report_table.insert("", "end", values=(name, count, f"{amount:.2f} руб."))
+
+    # Окно диагностики
+    def show_diagnostics(self):
+        """Окно с замерами длительности операций (F12)"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Диагностика")
+        dialog.geometry("800x400")
+        
+        toolbar = ttk.Frame(dialog)
+        toolbar.pack(fill='x', padx=5, pady=5)
+        
+        columns = ("name", "count", "avg", "p95", "max", "slow")
+        table = ttk.Treeview(dialog, columns=columns, show="headings")
+        
+        table.heading("name", text="Операция")
+        table.heading("count", text="Вызовов")
+        table.heading("avg", text="Среднее, мс")
+        table.heading("p95", text="95%, мс")
+        table.heading("max", text="Максимум, мс")
+        table.heading("slow", text="Медленных")
+        
+        table.column("name", width=250)
+        for column in columns[1:]:
+            table.column(column, width=100)
+        
+        def refresh():
+            table.delete(*table.get_children())
+            for name, stats in metrics.snapshot().items():
+                table.insert("", "end", values=(
+                    name, stats['count'], stats['avg_ms'], stats['p95_ms'], stats['max_ms'], stats['slow']
+                ))
+        
+        def dump():
+            path = metrics.dump()
+            messagebox.showinfo("Диагностика", f"Замеры сохранены в файл {path}", parent=dialog)
+        
+        ttk.Button(toolbar, text="Обновить", command=refresh).pack(side='left', padx=2)
+        ttk.Button(toolbar, text="Сохранить в JSON", command=dump).pack(side='left', padx=2)
+        ttk.Label(
+            toolbar, text=f"Медленные операции (от {metrics.threshold * 1000:.0f} мс) пишутся в {metrics.log_path}"
+        ).pack(side='right', padx=2)
+        
+        table.pack(fill='both', expand=True, padx=5, pady=5)
+        refresh()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Автосервис 'АвтоМир'")
+    parser.add_argument('--startup-time', action='store_true',
+                        help="вывести время от запуска до первой отрисовки окна и выйти")
+    args = parser.parse_args()
     root = tk.Tk()
     app = AutoserviceApp(root)
-    root.mainloop()
\ No newline at end of file
+    if args.startup_time:
+        # update обрабатывает все ожидающие события, включая отрисовку окна
+        root.update()
+        print(f"Время до первой отрисовки окна: {(time.perf_counter() - STARTED) * 1000:.0f} мс")
+        app.on_close()
+    else:
+        root.mainloop()
\ No newline at end of file
@@ -0,0 +1,145 @@
+import json
+import os
+from collections import OrderedDict
+
+from autoservice_records import as_json, make_records
+from autoservice_storage import write_atomic
+
+ARCHIVE_DIR = 'autoservice_archive'
+INDEX_FILE = 'index.json'
+
+# Закрытые заказы старше ARCHIVE_AFTER_DAYS дней переносятся в архив
+ARCHIVE_AFTER_DAYS = int(os.environ.get('AUTOSERVICE_ARCHIVE_DAYS', 90))
+
+# Количество месяцев архива, которые держатся в памяти после чтения
+ARCHIVE_CACHE_MONTHS = 12
+
+
+def order_month(order):
+    """Месяц заказа 'ГГГГ-ММ' (раздел архива)"""
+    return str(order.get('date', ''))[:7] or '0000-00'
+
+
+def month_summary(orders):
+    """Сводка раздела архива для индекса.
+
+    Кроме количества и диапазона id хранится число заказов каждого
+    автомобиля и строк с каждой запчастью - для проверок при удалении
+    без чтения разделов. Ключи - id в виде строк, как в JSON.
+    """
+    cars = {}
+    parts = {}
+    for order in orders:
+        car_key = str(order.get('car_id'))
+        cars[car_key] = cars.get(car_key, 0) + 1
+        for line in order.get('parts', ()):
+            part_key = str(line['part_id'])
+            parts[part_key] = parts.get(part_key, 0) + 1
+    return {
+        'count': len(orders),
+        'min_id': min(order['id'] for order in orders),
+        'max_id': max(order['id'] for order in orders),
+        'cars': cars,
+        'parts': parts
+    }
+
+
+class OrderArchive:
+    """Архив закрытых заказов: JSON-файл на каждый месяц и общий индекс.
+
+    Заказы архива не меняются, поэтому не держатся в памяти и не
+    переписываются при сохранении данных. Раздел читается при первом
+    обращении и остается в кэше последних прочитанных месяцев. Индекс
+    (сводки разделов) маленький и загружается сразу.
+
+    Разделы пишутся раньше индекса, а сводка раздела в индексе строится
+    по его содержимому целиком, поэтому повторный перенос тех же заказов
+    после сбоя ничего не портит.
+    """
+
+    def __init__(self, path=ARCHIVE_DIR, cache_months=ARCHIVE_CACHE_MONTHS):
+        self.path = path
+        self.index_path = os.path.join(path, INDEX_FILE)
+        self.cache_months = cache_months
+        self.cache = OrderedDict()
+        self.index = {'months': {}}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+
+    def month_path(self, month):
+        """Файл раздела архива"""
+        return os.path.join(self.path, f"orders-{month}.json")
+
+    def months(self):
+        """Месяцы архива по возрастанию"""
+        return sorted(self.index['months'])
+
+    def count(self, month=None):
+        """Количество заказов в архиве (или в одном месяце)"""
+        if month is not None:
+            return self.index['months'].get(month, {}).get('count', 0)
+        return sum(summary['count'] for summary in self.index['months'].values())
+
+    def count_orders(self, car_id):
+        """Количество архивных заказов автомобиля"""
+        key = str(car_id)
+        return sum(summary['cars'].get(key, 0) for summary in self.index['months'].values())
+
+    def count_part_usage(self, part_id):
+        """Количество строк архивных заказов с запчастью"""
+        key = str(part_id)
+        return sum(summary['parts'].get(key, 0) for summary in self.index['months'].values())
+
+    def read_month(self, month):
+        """Заказы одного месяца в порядке id"""
+        orders = self.cache.get(month)
+        if orders is not None:
+            self.cache.move_to_end(month)
+            return orders
+        orders = []
+        if month in self.index['months'] and os.path.exists(self.month_path(month)):
+            with open(self.month_path(month), 'r', encoding='utf-8') as f:
+                orders = make_records('orders', json.load(f)['orders'])
+        self.cache[month] = orders
+        while len(self.cache) > self.cache_months:
+            self.cache.popitem(last=False)
+        return orders
+
+    def iter_orders(self, date_from=None, date_to=None):
+        """Заказы архива по месяцам; date_from и date_to ('ГГГГ-ММ-ДД') отсекают лишние месяцы"""
+        for month in self.months():
+            if date_from and month < date_from[:7] or date_to and month > date_to[:7]:
+                continue
+            yield from self.read_month(month)
+
+    def get(self, order_id):
+        """Архивный заказ по id (читаются только месяцы с подходящим диапазоном id)"""
+        for month, summary in self.index['months'].items():
+            if summary['min_id'] <= order_id <= summary['max_id']:
+                for order in self.read_month(month):
+                    if order['id'] == order_id:
+                        return order
+        return None
+
+    def add(self, orders):
+        """Добавление заказов в разделы по месяцам"""
+        by_month = {}
+        for order in orders:
+            by_month.setdefault(order_month(order), []).append(order)
+        if not by_month:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        for month, added in by_month.items():
+            merged = {order['id']: order for order in self.read_month(month)}
+            merged.update((order['id'], order) for order in added)
+            month_orders = [merged[order_id] for order_id in sorted(merged)]
+            write_atomic(
+                self.month_path(month),
+                json.dumps({'month': month, 'orders': month_orders}, ensure_ascii=False, default=as_json)
+            )
+            self.cache[month] = month_orders
+            self.index['months'][month] = month_summary(month_orders)
+        while len(self.cache) > self.cache_months:
+            self.cache.popitem(last=False)
+        write_atomic(self.index_path, json.dumps(self.index, ensure_ascii=False))
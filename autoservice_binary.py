@@ -0,0 +1,356 @@
+import argparse
+import json
+import lzma
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate, compress
+
+from autoservice_records import RECORD_TYPES, Record, as_json
+
+# Двоичный снимок:
+#   заголовок  MAGIC, версия формата (u16), сжатие (u8), число разделов (u16)
+#   раздел     имя (u8 длина + UTF-8), длина данных (u64), данные
+# Раздел - ключ верхнего уровня данных: список записей хранится таблицей
+# по столбцам ('T'), остальное - JSON ('J'). Данные разделов сжимаются
+# по отдельности, чтобы при загрузке без заказов не распаковывать заказы.
+# Все числа - little-endian.
+MAGIC = b'ASNP'
+VERSION = 1
+HEADER = struct.Struct('<4sHBH')
+SECTION_LENGTH = struct.Struct('<Q')
+COLUMN_HEADER = struct.Struct('<BQ')
+TABLE_HEADER = struct.Struct('<IH')
+STRINGS_HEADER = struct.Struct('<IQ')
+
+COMPRESSION = {'none': 0, 'zlib': 1, 'lzma': 2}
+COMPRESS = {
+    0: lambda payload: payload,
+    1: lambda payload: zlib.compress(payload, 6),
+    2: lambda payload: lzma.compress(payload, preset=1)
+}
+DECOMPRESS = {
+    0: lambda payload: payload,
+    1: zlib.decompress,
+    2: lzma.decompress
+}
+
+# Виды столбцов: целые (int64), вещественные (double), числа вперемешку
+# (double + признак целого), строки (словарь значений + номера), списки
+# (длины + столбец элементов), таблица (вложенные записи) и JSON для
+# всего остального
+INTS, FLOATS, NUMBERS, STRINGS, LISTS, TABLE, JSON = b'ifnslTj'
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+# Целые, которые double хранит точно
+EXACT_INT = 2 ** 53
+UINT32 = next(code for code in 'IL' if array(code).itemsize == 4)
+# Отсутствующее в записи поле (в столбце JSON)
+MISSING = object()
+# Ошибки разбора поврежденного снимка
+DECODE_ERRORS = (struct.error, zlib.error, lzma.LZMAError, UnicodeDecodeError,
+                 IndexError, ValueError, OverflowError)
+
+
+class SnapshotError(ValueError):
+    """Поврежденный или неподдерживаемый двоичный снимок"""
+
+
+def is_binary_snapshot(content):
+    """Начинаются ли данные с сигнатуры двоичного снимка"""
+    return content[:len(MAGIC)] == MAGIC
+
+
+def to_le(values):
+    """Байты массива в порядке little-endian"""
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+
+def from_le(typecode, payload):
+    """Массив из байтов в порядке little-endian"""
+    values = array(typecode)
+    values.frombytes(payload)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def column_kind(values):
+    """Вид столбца для непустого списка значений"""
+    types = set(map(type, values))
+    if types == {int} and INT64_MIN <= min(values) and max(values) <= INT64_MAX:
+        return INTS
+    if types == {float}:
+        return FLOATS
+    if types == {int, float} and all(-EXACT_INT <= value <= EXACT_INT for value in values if type(value) is int):
+        return NUMBERS
+    if types == {str} and not any('\0' in value for value in values):
+        return STRINGS
+    if types == {list}:
+        return LISTS
+    if all(issubclass(t, (dict, Record)) for t in types):
+        return TABLE
+    return JSON
+
+
+def encode_json_column(values):
+    """Столбец JSON: значение в списке из одного элемента, пропуск - пустой список"""
+    payload = json.dumps(
+        [[] if value is MISSING else [value] for value in values],
+        ensure_ascii=False, default=as_json
+    ).encode('utf-8')
+    return COLUMN_HEADER.pack(JSON, len(payload)) + payload
+
+
+def encode_column(values):
+    """Кодирование столбца: вид, длина и данные"""
+    kind = column_kind(values) if values else JSON
+    if kind == INTS:
+        payload = to_le(array('q', values))
+    elif kind == FLOATS:
+        payload = to_le(array('d', values))
+    elif kind == NUMBERS:
+        payload = to_le(array('d', values)) + bytes(type(value) is int for value in values)
+    elif kind == STRINGS:
+        codes = {}
+        indexes = array(UINT32, [codes.setdefault(value, len(codes)) for value in values])
+        blob = '\0'.join(codes).encode('utf-8')
+        payload = STRINGS_HEADER.pack(len(codes), len(blob)) + blob + to_le(indexes)
+    elif kind == LISTS:
+        lengths = encode_column([len(value) for value in values])
+        items = encode_column([item for value in values for item in value])
+        payload = lengths + items
+    elif kind == TABLE:
+        payload = encode_table(values)
+    else:
+        return encode_json_column(values)
+    return COLUMN_HEADER.pack(kind, len(payload)) + payload
+
+
+def decode_column(content, pos, count, item_type=None):
+    """Декодирование столбца из count значений.
+
+    item_type - тип записей (Record) для вложенных таблиц. Возвращает
+    значения, позицию после столбца и признак того, что значения готовы
+    для Record.from_columns (строки - общие экземпляры, вложенные
+    записи - нужного типа, пропусков нет).
+    """
+    kind, length = COLUMN_HEADER.unpack_from(content, pos)
+    pos += COLUMN_HEADER.size
+    payload = content[pos:pos + length]
+    prepared = True
+    if kind == INTS:
+        values = from_le('q', payload).tolist()
+    elif kind == FLOATS:
+        values = from_le('d', payload).tolist()
+    elif kind == NUMBERS:
+        values = from_le('d', payload[:count * 8]).tolist()
+        for index in compress(range(count), payload[count * 8:]):
+            values[index] = int(values[index])
+    elif kind == STRINGS:
+        unique, blob_length = STRINGS_HEADER.unpack_from(payload, 0)
+        start = STRINGS_HEADER.size
+        blob = bytes(payload[start:start + blob_length]).decode('utf-8')
+        strings = [sys.intern(value) for value in blob.split('\0')]
+        if len(strings) != unique:
+            raise SnapshotError("Словарь строк поврежден")
+        values = list(map(strings.__getitem__, from_le(UINT32, payload[start + blob_length:])))
+    elif kind == LISTS:
+        lengths, items_pos, _ = decode_column(payload, 0, count)
+        items, _, prepared = decode_column(payload, items_pos, sum(lengths), item_type)
+        ends = list(accumulate(lengths))
+        values = list(map(items.__getitem__, map(slice, [0] + ends[:-1], ends)))
+    elif kind == TABLE:
+        values = decode_table(payload, item_type)
+        prepared = item_type is not None
+    elif kind == JSON:
+        values = [value[0] if value else MISSING for value in json.loads(bytes(payload).decode('utf-8'))]
+        prepared = False
+    else:
+        raise SnapshotError(f"Неизвестный вид столбца: {kind}")
+    if len(values) != count:
+        raise SnapshotError("Длина столбца не совпадает с числом записей")
+    return values, pos + length, prepared
+
+
+def encode_table(records):
+    """Кодирование списка записей по столбцам.
+
+    Столбцы - все ключи записей в порядке первого появления; если ключа
+    нет хотя бы в одной записи, столбец пишется в JSON с пропусками.
+    Список и записи Record сначала копируются (list и Record.as_dict не
+    отпускают GIL), чтобы при записи из фонового потока не попасть на
+    половину изменения.
+    """
+    rows = [record.as_dict() if isinstance(record, Record) else record for record in list(records)]
+    names = {}
+    for row in rows:
+        for key in row:
+            names.setdefault(key, None)
+    parts = [TABLE_HEADER.pack(len(rows), len(names))]
+    for name in names:
+        encoded_name = name.encode('utf-8')
+        values = [row.get(name, MISSING) for row in rows]
+        if any(value is MISSING for value in values):
+            column = encode_json_column(values)
+        else:
+            column = encode_column(values)
+        parts.append(bytes([len(encoded_name)]) + encoded_name + column)
+    return b''.join(parts)
+
+
+def decode_table(content, record_type=None):
+    """Декодирование таблицы в список записей record_type (или словарей)"""
+    count, columns_count = TABLE_HEADER.unpack_from(content, 0)
+    pos = TABLE_HEADER.size
+    columns = {}
+    all_prepared = True
+    for _ in range(columns_count):
+        name_length = content[pos]
+        name = bytes(content[pos + 1:pos + 1 + name_length]).decode('utf-8')
+        item_type = record_type.ITEM_TYPES.get(name) if record_type else None
+        columns[name], pos, prepared = decode_column(content, pos + 1 + name_length, count, item_type)
+        all_prepared = all_prepared and prepared
+    if record_type is not None and all_prepared and record_type.FIELD_SET.issuperset(columns):
+        return record_type.from_columns(columns, count)
+
+    names = list(columns)
+    if not all_prepared and any(MISSING in column for column in columns.values()):
+        rows = [
+            {name: value for name, value in zip(names, row) if value is not MISSING}
+            for row in zip(*columns.values())
+        ]
+    elif names:
+        rows = [dict(zip(names, row)) for row in zip(*columns.values())]
+    else:
+        rows = [{} for _ in range(count)]
+    if record_type is not None:
+        rows = [record_type.from_dict(row) for row in rows]
+    return rows
+
+
+def encode_section(value):
+    """Данные раздела: таблица для списка записей, иначе JSON"""
+    if isinstance(value, list) and all(isinstance(item, (dict, Record)) for item in value):
+        return b'T' + encode_table(value)
+    return b'J' + json.dumps(value, ensure_ascii=False, default=as_json).encode('utf-8')
+
+
+def decode_section(name, payload):
+    """Значение раздела name (записи сущностей - в виде Record)"""
+    payload = memoryview(payload)
+    if payload[:1] == b'T':
+        return decode_table(payload[1:], RECORD_TYPES.get(name))
+    if payload[:1] == b'J':
+        return json.loads(bytes(payload[1:]).decode('utf-8'))
+    raise SnapshotError("Неизвестный вид раздела")
+
+
+def encode_snapshot(data, compression='none'):
+    """Двоичный снимок данных (заказы - последним разделом)"""
+    method = COMPRESSION[compression]
+    keys = [key for key in data if key != 'orders'] + (['orders'] if 'orders' in data else [])
+    parts = [HEADER.pack(MAGIC, VERSION, method, len(keys))]
+    for key in keys:
+        payload = COMPRESS[method](encode_section(data[key]))
+        encoded_key = key.encode('utf-8')
+        parts.append(bytes([len(encoded_key)]) + encoded_key + SECTION_LENGTH.pack(len(payload)) + payload)
+    return b''.join(parts)
+
+
+def read_sections(content):
+    """Разделы снимка без распаковки: [(имя, способ сжатия, данные)]"""
+    magic, version, method, count = HEADER.unpack_from(content, 0)
+    if magic != MAGIC:
+        raise SnapshotError("Это не двоичный снимок")
+    if version > VERSION:
+        raise SnapshotError(f"Снимок версии {version} не поддерживается (последняя - {VERSION})")
+    if method not in DECOMPRESS:
+        raise SnapshotError(f"Неизвестный способ сжатия: {method}")
+    pos = HEADER.size
+    sections = []
+    for _ in range(count):
+        name_length = content[pos]
+        name = bytes(content[pos + 1:pos + 1 + name_length]).decode('utf-8')
+        pos += 1 + name_length
+        length, = SECTION_LENGTH.unpack_from(content, pos)
+        pos += SECTION_LENGTH.size
+        if pos + length > len(content):
+            raise SnapshotError("Снимок обрезан")
+        sections.append((name, method, content[pos:pos + length]))
+        pos += length
+    return sections
+
+
+def decode_snapshot(content):
+    """Данные из двоичного снимка"""
+    data, orders = decode_snapshot_head(content)
+    data['orders'] = orders()
+    return data
+
+
+def decode_snapshot_head(content):
+    """Данные снимка без заказов и функция, декодирующая заказы.
+
+    Раздел заказов только находится в файле; распаковка и разбор - при
+    вызове функции (например, в фоновом потоке).
+    """
+    try:
+        data = {}
+        orders_section = None
+        for name, method, payload in read_sections(memoryview(content)):
+            if name == 'orders':
+                orders_section = (method, payload)
+            else:
+                data[name] = decode_section(name, DECOMPRESS[method](payload))
+    except SnapshotError:
+        raise
+    except DECODE_ERRORS as e:
+        raise SnapshotError(f"Снимок поврежден: {e}") from e
+    data.setdefault('orders', [])
+
+    def orders():
+        if orders_section is None:
+            return []
+        method, payload = orders_section
+        try:
+            return decode_section('orders', DECOMPRESS[method](payload))
+        except SnapshotError:
+            raise
+        except DECODE_ERRORS as e:
+            raise SnapshotError(f"Снимок поврежден: {e}") from e
+
+    return data, orders
+
+
+def convert(src, dst, to_format, compression='none'):
+    """Преобразование файла данных между JSON и двоичным снимком"""
+    with open(src, 'rb') as f:
+        content = f.read()
+    if is_binary_snapshot(content):
+        data = decode_snapshot(content)
+    else:
+        data = json.loads(content)
+    if to_format == 'json':
+        # Заказы - последним ключом, как в снимках приложения
+        ordered = {key: value for key, value in data.items() if key != 'orders'}
+        ordered['orders'] = data.get('orders', [])
+        output = json.dumps(ordered, ensure_ascii=False, default=as_json).encode('utf-8')
+    else:
+        output = encode_snapshot(data, compression)
+    with open(dst, 'wb') as f:
+        f.write(output)
+    return len(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Преобразование файла данных автосервиса между JSON и двоичным снимком")
+    parser.add_argument('format', choices=('binary', 'json'), help="формат результата")
+    parser.add_argument('src')
+    parser.add_argument('dst')
+    parser.add_argument('--compression', choices=sorted(COMPRESSION), default='none',
+                        help="сжатие двоичного снимка")
+    args = parser.parse_args()
+    print(f"Записано байт: {convert(args.src, args.dst, args.format, args.compression)}")
@@ -0,0 +1,129 @@
+import argparse
+import sys
+
+from autoservice_archive import ARCHIVE_AFTER_DAYS
+from autoservice_core import ORDER_STATUSES, AutoserviceService, ReservationLedger, ServiceError
+from autoservice_csv import EXPORT_FORMATS, PARSERS, export_orders, import_csv
+from autoservice_store import create_store
+
+
+def run_import(store, args):
+    """Команда import: загрузка записей из CSV-файла"""
+    imported, rejected = import_csv(store, args.entity, args.path, args.delimiter)
+    for line_number, message in rejected:
+        print(f"{args.path}:{line_number}: {message}", file=sys.stderr)
+    print(f"Добавлено: {imported}, отклонено: {len(rejected)}")
+    return 1 if rejected else 0
+
+
+def run_export(store, args):
+    """Команда export: выгрузка заказов в CSV или JSONL"""
+    if args.path == '-':
+        count = export_orders(store, sys.stdout, args.format, args.date_from, args.date_to, args.status)
+    else:
+        with open(args.path, 'w', newline='', encoding='utf-8') as out:
+            count = export_orders(store, out, args.format, args.date_from, args.date_to, args.status)
+    print(f"Выгружено заказов: {count}", file=sys.stderr)
+    return 0
+
+
+def part_line(value):
+    """Аргумент --part в виде ID[:количество]"""
+    part_id, _, quantity = value.partition(':')
+    try:
+        return int(part_id), int(quantity or 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается ID[:количество], получено {value!r}")
+
+
+def run_create_order(store, args):
+    """Команда create-order: создание заказа"""
+    service = AutoserviceService(store)
+    reservation = ReservationLedger(store)
+    for part_id, quantity in args.part or ():
+        service.reserve(reservation, part_id, quantity)
+    order = service.create_order(args.client, args.car, args.work or [], reservation)
+    store.save()
+    print(f"Заказ №{order['id']} создан, сумма {order['total']} руб.")
+    return 0
+
+
+def run_set_status(store, args):
+    """Команда set-status: изменение статуса заказа"""
+    AutoserviceService(store).change_order_status(args.order, args.status)
+    store.save()
+    return 0
+
+
+def run_low_stock(store, args):
+    """Команда low-stock: запчасти с малым остатком"""
+    for part in AutoserviceService(store).low_stock(args.threshold):
+        print(f"{part['id']}\t{part['quantity']}\t{part['name']}")
+    return 0
+
+
+def run_archive(store, args):
+    """Команда archive: перенос закрытых заказов в архив"""
+    count = AutoserviceService(store).archive_closed_orders(args.days)
+    store.save()
+    print(f"Перенесено в архив заказов: {count}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обслуживание данных автосервиса без интерфейса")
+    parser.add_argument('--storage', choices=('json', 'journal', 'sqlite'),
+                        help="режим хранения (по умолчанию AUTOSERVICE_STORAGE)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    # needs_orders - команде нужны все заказы; остальные команды в режиме
+    # журнала не разбирают заказы из снимка
+    import_parser = commands.add_parser('import', help="импорт записей из CSV-файла с заголовком")
+    import_parser.add_argument('entity', choices=sorted(PARSERS))
+    import_parser.add_argument('path')
+    import_parser.add_argument('--delimiter', default=',', help="разделитель полей (по умолчанию ',')")
+    import_parser.set_defaults(handler=run_import, needs_orders=False)
+
+    export_parser = commands.add_parser('export', help="выгрузка заказов с клиентами, автомобилями и запчастями")
+    export_parser.add_argument('path', help="файл выгрузки ('-' - стандартный вывод)")
+    export_parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    export_parser.add_argument('--from', dest='date_from', metavar='ГГГГ-ММ-ДД', help="начальная дата включительно")
+    export_parser.add_argument('--to', dest='date_to', metavar='ГГГГ-ММ-ДД', help="конечная дата включительно")
+    export_parser.add_argument('--status', action='append', help="статус заказа (можно указать несколько раз)")
+    export_parser.set_defaults(handler=run_export, needs_orders=True)
+
+    order_parser = commands.add_parser('create-order', help="создание заказа")
+    order_parser.add_argument('--client', type=int, required=True, help="ID клиента")
+    order_parser.add_argument('--car', type=int, required=True, help="ID автомобиля клиента")
+    order_parser.add_argument('--work', action='append', help="работа (можно указать несколько раз)")
+    order_parser.add_argument('--part', type=part_line, action='append', metavar='ID[:КОЛ-ВО]',
+                              help="запчасть (можно указать несколько раз)")
+    order_parser.set_defaults(handler=run_create_order, needs_orders=False)
+
+    status_parser = commands.add_parser('set-status', help="изменение статуса заказа")
+    status_parser.add_argument('order', type=int, help="ID заказа")
+    status_parser.add_argument('status', choices=ORDER_STATUSES)
+    status_parser.set_defaults(handler=run_set_status, needs_orders=True)
+
+    stock_parser = commands.add_parser('low-stock', help="запчасти с остатком не больше порога")
+    stock_parser.add_argument('--threshold', type=int, default=5)
+    stock_parser.set_defaults(handler=run_low_stock, needs_orders=False)
+
+    archive_parser = commands.add_parser('archive', help="перенос закрытых заказов в архив по месяцам")
+    archive_parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                                help=f"возраст заказа в днях (по умолчанию {ARCHIVE_AFTER_DAYS})")
+    archive_parser.set_defaults(handler=run_archive, needs_orders=True)
+
+    args = parser.parse_args(argv)
+    store = create_store(args.storage, lazy_orders=not args.needs_orders)
+    try:
+        return args.handler(store, args)
+    except ServiceError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+import functools
+from datetime import datetime, timedelta
+
+from autoservice_archive import ARCHIVE_AFTER_DAYS
+from autoservice_store import UniqueConstraintError
+
+WORK_PRICE = 1000  # Условная стоимость работы
+ORDER_STATUSES = ('в работе', 'готово', 'отменен')
+# Заказы с этими статусами больше не меняются и уходят в архив
+CLOSED_STATUSES = ('готово', 'отменен')
+
+
+class ServiceError(Exception):
+    """Ошибка операции автосервиса (сообщение - для пользователя)"""
+
+
+class ValidationError(ServiceError):
+    """Некорректные данные записи"""
+
+
+class NotFoundError(ServiceError):
+    """Запись не найдена"""
+
+
+class IntegrityError(ServiceError):
+    """Операция нарушила бы связи между записями"""
+
+
+class StockError(ServiceError):
+    """Недостаточно запчастей на складе"""
+
+
+def mutation(method):
+    """Операция сервиса, меняющая данные, под блокировкой хранилища.
+
+    Записи меняются на месте до вызова store.update, поэтому блокировку
+    держит вся операция, а не только методы хранилища (см. Repository.lock).
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.store.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def change_stock(store, changes):
+    """Изменение остатков запчастей: все или ни одного.
+
+    changes - [(запчасть, изменение остатка)]. Если хранилище отклонило
+    изменение одной из запчастей, уже измененные возвращаются к прежним
+    остаткам, а ошибка выбрасывается как ServiceError.
+    """
+    done = []
+    try:
+        for part, delta in changes:
+            part['quantity'] += delta
+            done.append((part, delta))
+            store.update('parts', part)
+    except UniqueConstraintError as e:
+        failed, delta = done.pop()
+        failed['quantity'] -= delta
+        for part, delta in reversed(done):
+            part['quantity'] -= delta
+            store.update('parts', part)
+        raise ServiceError(f"Не удалось изменить остаток запчасти '{failed['name']}': {e}") from e
+
+
+class ReservationLedger:
+    """Резерв запчастей для черновика заказа.
+
+    Для каждой запчасти хранится строка заказа с зарезервированным
+    количеством, поэтому доступный остаток считается за O(1) без обхода
+    выбранных запчастей. commit проверяет остатки по всем строкам и только
+    потом списывает их со склада.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.lines_by_part = {}
+
+    def __bool__(self):
+        return bool(self.lines_by_part)
+
+    def reserved(self, part_id):
+        """Зарезервированное количество запчасти"""
+        line = self.lines_by_part.get(part_id)
+        return line['quantity'] if line else 0
+
+    def available(self, part):
+        """Доступный остаток запчасти с учетом резерва"""
+        return part['quantity'] - self.reserved(part['id'])
+
+    def reserve(self, part, quantity):
+        """Резервирование запчасти"""
+        available = self.available(part)
+        if quantity > available:
+            raise StockError(f"Недостаточно запчастей на складе. Доступно: {available}")
+        line = self.lines_by_part.get(part['id'])
+        if line:
+            line['quantity'] += quantity
+        else:
+            self.lines_by_part[part['id']] = {
+                'part_id': part['id'],
+                'name': part['name'],
+                'price': part['price'],
+                'quantity': quantity
+            }
+
+    def release(self, part_id):
+        """Снятие резерва запчасти"""
+        return self.lines_by_part.pop(part_id, None)
+
+    def lines(self):
+        """Строки заказа"""
+        return list(self.lines_by_part.values())
+
+    def total(self):
+        """Стоимость зарезервированных запчастей"""
+        return sum(line['price'] * line['quantity'] for line in self.lines_by_part.values())
+
+    def clear(self):
+        """Очистка резерва"""
+        self.lines_by_part.clear()
+
+    def commit(self):
+        """Списание зарезервированных запчастей со склада.
+
+        Возвращает строки заказа; если хотя бы одной запчасти не хватает,
+        склад не меняется.
+        """
+        changes = []
+        for line in self.lines_by_part.values():
+            part = self.store.get('parts', line['part_id'])
+            if not part or part['quantity'] < line['quantity']:
+                raise StockError(f"Недостаточно запчастей '{line['name']}' на складе")
+            changes.append((part, -line['quantity']))
+        change_stock(self.store, changes)
+        lines = self.lines()
+        self.clear()
+        return lines
+
+
+def validate_client(fio, phone='', email=''):
+    """Поля клиента по правилам диалога"""
+    fio = fio.strip()
+    if not fio:
+        raise ValidationError("Введите ФИО клиента")
+    return {'fio': fio, 'phone': phone.strip(), 'email': email.strip()}
+
+
+def validate_car(vin, brand, model):
+    """Поля автомобиля по правилам диалога (VIN в верхнем регистре)"""
+    vin = vin.strip().upper()
+    brand = brand.strip()
+    model = model.strip()
+    if not vin:
+        raise ValidationError("Введите VIN автомобиля")
+    if not brand:
+        raise ValidationError("Введите марку автомобиля")
+    if not model:
+        raise ValidationError("Введите модель автомобиля")
+    return {'vin': vin, 'brand': brand, 'model': model}
+
+
+def validate_part(name, price, quantity):
+    """Поля запчасти по правилам диалога"""
+    name = name.strip()
+    if not name:
+        raise ValidationError("Введите название запчасти")
+    if price <= 0:
+        raise ValidationError("Цена должна быть больше 0")
+    if quantity < 0:
+        raise ValidationError("Количество не может быть отрицательным")
+    return {'name': name, 'price': price, 'quantity': quantity}
+
+
+class AutoserviceService:
+    """Операции автосервиса без интерфейса.
+
+    Проверяет данные по тем же правилам, что и диалоги, выделяет ID,
+    следит за остатками склада и связями между записями. Ошибки -
+    исключения ServiceError с сообщением для пользователя. Изменения
+    фиксируются вызовом store.save().
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, entity, record_id, message):
+        """Запись по id или NotFoundError"""
+        record = self.store.get(entity, record_id)
+        if record is None:
+            raise NotFoundError(message)
+        return record
+
+    def check_unique(self, entity, fields, record_id=None):
+        """Проверка ограничений уникальности"""
+        try:
+            self.store.check_unique(entity, fields, record_id)
+        except UniqueConstraintError as e:
+            raise ValidationError(str(e)) from e
+
+    def check_orders_loaded(self):
+        """Проверки по заказам возможны только после их загрузки"""
+        if not self.store.orders_loaded:
+            raise ServiceError("Заказы еще загружаются, повторите попытку позже")
+
+    # Клиенты
+    @mutation
+    def add_client(self, fio, phone='', email=''):
+        """Добавление клиента"""
+        fields = validate_client(fio, phone, email)
+        self.check_unique('clients', fields)
+        return self.store.insert('clients', {'id': self.store.next_id('client'), **fields})
+
+    @mutation
+    def update_client(self, client_id, fio, phone='', email=''):
+        """Изменение данных клиента"""
+        client = self.get('clients', client_id, "Клиент не найден")
+        fields = validate_client(fio, phone, email)
+        self.check_unique('clients', fields, client_id)
+        client.update(fields)
+        return self.store.update('clients', client)
+
+    def check_delete_client(self, client_id):
+        """Клиента можно удалить, только если у него нет автомобилей"""
+        cars_count = self.store.count_cars(client_id)
+        if cars_count:
+            raise IntegrityError(
+                "Нельзя удалить клиента с привязанными автомобилями!\n"
+                f"У клиента {cars_count} автомобилей."
+            )
+
+    @mutation
+    def delete_client(self, client_id):
+        """Удаление клиента"""
+        self.check_delete_client(client_id)
+        return self.store.delete('clients', client_id)
+
+    # Автомобили
+    @mutation
+    def add_car(self, client_id, vin, brand, model):
+        """Добавление автомобиля клиента"""
+        self.get('clients', client_id, "Клиент не найден")
+        fields = validate_car(vin, brand, model)
+        self.check_unique('cars', fields)
+        return self.store.insert('cars', {'id': self.store.next_id('car'), **fields, 'client_id': client_id})
+
+    @mutation
+    def update_car(self, car_id, vin, brand, model):
+        """Изменение данных автомобиля"""
+        car = self.get('cars', car_id, "Автомобиль не найден")
+        fields = validate_car(vin, brand, model)
+        self.check_unique('cars', fields, car_id)
+        car.update(fields)
+        return self.store.update('cars', car)
+
+    def check_delete_car(self, car_id):
+        """Автомобиль можно удалить, только если по нему нет заказов"""
+        self.check_orders_loaded()
+        orders_count = self.store.count_orders(car_id)
+        if orders_count:
+            raise IntegrityError(
+                "Нельзя удалить автомобиль с привязанными заказами!\n"
+                f"У автомобиля {orders_count} заказов."
+            )
+
+    @mutation
+    def delete_car(self, car_id):
+        """Удаление автомобиля"""
+        self.check_delete_car(car_id)
+        return self.store.delete('cars', car_id)
+
+    # Запчасти
+    @mutation
+    def add_part(self, name, price, quantity):
+        """Добавление запчасти"""
+        fields = validate_part(name, price, quantity)
+        self.check_unique('parts', fields)
+        return self.store.insert('parts', {'id': self.store.next_id('part'), **fields})
+
+    @mutation
+    def update_part(self, part_id, name, price, quantity):
+        """Изменение данных запчасти"""
+        part = self.get('parts', part_id, "Запчасть не найдена")
+        fields = validate_part(name, price, quantity)
+        self.check_unique('parts', fields, part_id)
+        part.update(fields)
+        return self.store.update('parts', part)
+
+    def check_delete_part(self, part_id):
+        """Запчасть можно удалить, только если она не использована в заказах"""
+        self.check_orders_loaded()
+        if self.store.count_part_usage(part_id):
+            raise IntegrityError("Нельзя удалить запчасть, которая используется в заказах!")
+
+    @mutation
+    def delete_part(self, part_id):
+        """Удаление запчасти"""
+        self.check_delete_part(part_id)
+        return self.store.delete('parts', part_id)
+
+    def low_stock(self, threshold):
+        """Запчасти с остатком не больше threshold, по возрастанию остатка"""
+        parts = [part for part in self.store.iter_records('parts') if part['quantity'] <= threshold]
+        return sorted(parts, key=lambda part: (part['quantity'], part['id']))
+
+    # Заказы
+    def reserve(self, reservation, part_id, quantity):
+        """Резервирование запчасти для черновика заказа"""
+        if quantity <= 0:
+            raise ValidationError("Количество должно быть больше 0")
+        part = self.get('parts', part_id, "Запчасть не найдена")
+        reservation.reserve(part, quantity)
+
+    @staticmethod
+    def order_total(works, reservation):
+        """Стоимость заказа: запчасти и работы"""
+        return reservation.total() + len(works) * WORK_PRICE
+
+    @mutation
+    def create_order(self, client_id, car_id, works, reservation):
+        """Создание заказа со списанием зарезервированных запчастей"""
+        self.get('clients', client_id, "Клиент не найден")
+        car = self.get('cars', car_id, "Автомобиль не найден")
+        if car['client_id'] != client_id:
+            raise ValidationError("Автомобиль не принадлежит клиенту")
+        works = [work.strip() for work in works if work.strip()]
+        if not works and not reservation:
+            raise ValidationError("Добавьте работы или запчасти")
+
+        # Списываем запчасти со склада (все или ни одной)
+        total = self.order_total(works, reservation)
+        parts = reservation.commit()
+        return self.store.insert('orders', {
+            'id': self.store.next_id('order'),
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'client_id': client_id,
+            'car_id': car_id,
+            'works': works,
+            'parts': parts,
+            'status': 'в работе',
+            'total': total
+        })
+
+    def get_order(self, order_id):
+        """Заказ рабочего набора; архивные заказы не меняются"""
+        order = self.store.get('orders', order_id)
+        if order is not None:
+            return order
+        if self.store.get_archived_order(order_id) is not None:
+            raise ValidationError("Заказ перенесен в архив и не может быть изменен")
+        raise NotFoundError("Заказ не найден")
+
+    @mutation
+    def change_order_status(self, order_id, status):
+        """Изменение статуса заказа"""
+        if status not in ORDER_STATUSES:
+            raise ValidationError(f"Неизвестный статус заказа: {status}")
+        order = self.get_order(order_id)
+        order['status'] = status
+        return self.store.update('orders', order)
+
+    @mutation
+    def delete_order(self, order_id):
+        """Удаление заказа с возвратом запчастей на склад"""
+        order = self.get_order(order_id)
+        changes = []
+        for line in order.get('parts', []):
+            part = self.store.get('parts', line['part_id'])
+            if part:
+                changes.append((part, line['quantity']))
+        change_stock(self.store, changes)
+        return self.store.delete('orders', order_id)
+
+    @mutation
+    def archive_closed_orders(self, days=ARCHIVE_AFTER_DAYS):
+        """Перенос в архив закрытых заказов старше days дней.
+
+        Граница сравнивается с датой и временем заказа, так что при days=0
+        переносятся все закрытые заказы, в том числе сегодняшние.
+        """
+        self.check_orders_loaded()
+        before = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+        return self.store.archive_orders(CLOSED_STATUSES, before)
@@ -0,0 +1,184 @@
+import csv
+import json
+
+from autoservice_core import ValidationError, validate_car, validate_client, validate_part
+from autoservice_records import as_json
+from autoservice_storage import ENTITY_TYPES
+from autoservice_store import UniqueConstraintError
+
+# Количество строк, для которых ID выделяются одним вызовом
+IMPORT_BATCH_SIZE = 1000
+
+
+def field(row, name):
+    """Текстовое поле строки CSV (пустое, если столбца нет)"""
+    return row.get(name) or ''
+
+
+def parse_client(store, row):
+    """Клиент из строки CSV (fio, phone, email)"""
+    return validate_client(field(row, 'fio'), field(row, 'phone'), field(row, 'email'))
+
+
+def parse_car(store, row):
+    """Автомобиль из строки CSV (vin, brand, model, client_id или client_phone)"""
+    car = validate_car(field(row, 'vin'), field(row, 'brand'), field(row, 'model'))
+    client_id = field(row, 'client_id').strip()
+    phone = field(row, 'client_phone').strip()
+    if client_id:
+        try:
+            client_id = int(client_id)
+        except ValueError:
+            raise ValidationError("Некорректный ID клиента")
+        if store.get('clients', client_id) is None:
+            raise ValidationError("Клиент не найден")
+    elif phone:
+        client_id = store.find_unique('clients', 'phone', phone)
+        if client_id is None:
+            raise ValidationError("Клиент не найден")
+    else:
+        raise ValidationError("Выберите клиента")
+    car['client_id'] = client_id
+    return car
+
+
+def parse_part(store, row):
+    """Запчасть из строки CSV (name, price, quantity)"""
+    try:
+        price = float(field(row, 'price').strip().replace(',', '.'))
+        quantity = int(field(row, 'quantity').strip())
+    except ValueError:
+        raise ValidationError("Введите корректные числовые значения для цены и количества")
+    return validate_part(field(row, 'name'), price, quantity)
+
+
+PARSERS = {
+    'clients': parse_client,
+    'cars': parse_car,
+    'parts': parse_part
+}
+
+
+def import_rows(store, entity, rows, batch_size=IMPORT_BATCH_SIZE):
+    """Импорт строк (словарей полей) в хранилище без сохранения.
+
+    Строки проверяются по тем же правилам, что и в диалогах, включая
+    ограничения уникальности (в том числе между строками файла). ID
+    выделяются сразу на пачку проверенных строк. Возвращает количество
+    добавленных записей и список отклоненных строк [(номер, сообщение)];
+    строки нумеруются с 2, как в файле с заголовком.
+    """
+    parse = PARSERS[entity]
+    entity_type = ENTITY_TYPES[entity]
+    imported = 0
+    rejected = []
+    batch = []
+
+    def flush():
+        inserted = 0
+        ids = store.allocate_ids(entity_type, len(batch))
+        for record_id, (line_number, record) in zip(ids, batch):
+            try:
+                store.insert(entity, {'id': record_id, **record})
+                inserted += 1
+            except UniqueConstraintError as e:
+                # Дубликат среди строк одной пачки
+                rejected.append((line_number, str(e)))
+        batch.clear()
+        return inserted
+
+    for line_number, row in enumerate(rows, 2):
+        try:
+            record = parse(store, row)
+            store.check_unique(entity, record)
+        except (ValidationError, UniqueConstraintError) as e:
+            rejected.append((line_number, str(e)))
+            continue
+        batch.append((line_number, record))
+        if len(batch) >= batch_size:
+            imported += flush()
+    if batch:
+        imported += flush()
+    return imported, sorted(rejected)
+
+
+def import_csv(store, entity, path, delimiter=','):
+    """Импорт CSV-файла с заголовком и однократное сохранение"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        result = import_rows(store, entity, csv.DictReader(f, delimiter=delimiter))
+    store.save()
+    return result
+
+
+# Столбцы выгрузки заказов в CSV: строка на каждую запчасть заказа
+EXPORT_COLUMNS = (
+    'order_id', 'date', 'status', 'total',
+    'client_id', 'client_fio', 'client_phone',
+    'car_id', 'vin', 'brand', 'model', 'works',
+    'part_id', 'part_name', 'price', 'quantity', 'line_total'
+)
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+
+def iter_orders(store, date_from=None, date_to=None, statuses=None):
+    """Заказы с данными клиента и автомобиля, по одному.
+
+    date_from и date_to - границы дат 'ГГГГ-ММ-ДД' включительно,
+    statuses - допустимые статусы. Клиенты и автомобили берутся по id.
+    Архивные заказы читаются только за месяцы из диапазона дат.
+    """
+    for order in store.iter_order_history(date_from, date_to):
+        day = str(order.get('date', ''))[:10]
+        if date_from and day < date_from or date_to and day > date_to:
+            continue
+        if statuses and order.get('status') not in statuses:
+            continue
+        client = store.get('clients', order.get('client_id')) or {}
+        car = store.get('cars', order.get('car_id')) or {}
+        yield {
+            'id': order['id'],
+            'date': order.get('date', ''),
+            'status': order.get('status', ''),
+            'total': order.get('total', 0),
+            'client': {key: client.get(key, '') for key in ('id', 'fio', 'phone', 'email')},
+            'car': {key: car.get(key, '') for key in ('id', 'vin', 'brand', 'model')},
+            'works': order.get('works', []),
+            'parts': order.get('parts', [])
+        }
+
+
+def order_csv_rows(order):
+    """Строки CSV заказа: по строке на запчасть (без запчастей - одна строка)"""
+    head = [
+        order['id'], order['date'], order['status'], order['total'],
+        order['client']['id'], order['client']['fio'], order['client']['phone'],
+        order['car']['id'], order['car']['vin'], order['car']['brand'], order['car']['model'],
+        '; '.join(order['works'])
+    ]
+    if not order['parts']:
+        yield head + [''] * 5
+    for line in order['parts']:
+        yield head + [
+            line['part_id'], line['name'], line['price'], line['quantity'],
+            line['price'] * line['quantity']
+        ]
+
+
+def export_orders(store, out, fmt='csv', date_from=None, date_to=None, statuses=None):
+    """Выгрузка заказов в открытый текстовый файл, заказ за заказом.
+
+    Возвращает количество выгруженных заказов.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(EXPORT_COLUMNS)
+    for order in iter_orders(store, date_from, date_to, statuses):
+        if fmt == 'csv':
+            writer.writerows(order_csv_rows(order))
+        else:
+            out.write(json.dumps(order, ensure_ascii=False, default=as_json) + '\n')
+        count += 1
+    return count
@@ -0,0 +1,198 @@
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Операции дольше SLOW_THRESHOLD секунд пишутся в журнал медленных
+# операций SLOW_LOG (до SLOW_LOG_SIZE байт, плюс SLOW_LOG_BACKUPS старых файлов)
+SLOW_THRESHOLD = float(os.environ.get('AUTOSERVICE_SLOW_MS', 200)) / 1000
+SLOW_LOG = 'autoservice_slow.log'
+SLOW_LOG_SIZE = 1024 * 1024
+SLOW_LOG_BACKUPS = 3
+
+# Файл выгрузки счетчиков для разбора
+METRICS_DUMP = 'autoservice_metrics.json'
+
+# Верхние границы интервалов гистограммы длительностей, мс
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float('inf'))
+
+
+class OperationStats:
+    """Количество, суммарное и максимальное время и гистограмма одной операции"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.buckets = [0] * len(BUCKETS)
+
+    def add(self, seconds, slow):
+        """Учет одного выполнения операции"""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.slow += slow
+        ms = seconds * 1000
+        for index, bound in enumerate(BUCKETS):
+            if ms <= bound:
+                self.buckets[index] += 1
+                break
+
+    def percentile(self, q):
+        """Верхняя граница интервала гистограммы, в который попадает q-квантиль, мс"""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max * 1000)
+        return self.max * 1000
+
+    def as_dict(self):
+        """Счетчики операции для выгрузки"""
+        return {
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 3),
+            'avg_ms': round(self.total * 1000 / self.count, 3) if self.count else 0,
+            'max_ms': round(self.max * 1000, 3),
+            'p50_ms': round(self.percentile(0.5), 3),
+            'p95_ms': round(self.percentile(0.95), 3),
+            'slow': self.slow,
+            'histogram_ms': {
+                str(bound): count for bound, count in zip(BUCKETS, self.buckets) if count
+            }
+        }
+
+
+class Metrics:
+    """Замеры длительности операций приложения.
+
+    Счетчики хранятся в памяти; медленные операции (дольше threshold
+    секунд) дополнительно пишутся в журнал с ротацией, который
+    открывается при первой такой операции. Время внутри excluded (например,
+    ожидание ответа в окне сообщения) не входит в замеры объемлющих блоков.
+    """
+
+    def __init__(self, threshold=SLOW_THRESHOLD, log_path=SLOW_LOG):
+        self.threshold = threshold
+        self.log_path = log_path
+        self.stats = {}
+        self.started = datetime.now()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.logger = None
+
+    def record(self, name, seconds):
+        """Учет выполнения операции name длительностью seconds"""
+        slow = seconds >= self.threshold
+        with self.lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = OperationStats()
+            stats.add(seconds, slow)
+        if slow:
+            self.slow_logger().warning("%s %.1f ms", name, seconds * 1000)
+
+    def slow_logger(self):
+        """Журнал медленных операций"""
+        if self.logger is None:
+            logger = logging.getLogger('autoservice.slow')
+            logger.propagate = False
+            if not logger.handlers:
+                handler = logging.handlers.RotatingFileHandler(
+                    self.log_path, maxBytes=SLOW_LOG_SIZE, backupCount=SLOW_LOG_BACKUPS,
+                    encoding='utf-8', delay=True
+                )
+                handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                logger.addHandler(handler)
+            self.logger = logger
+        return self.logger
+
+    def active_timers(self):
+        """Стек исключенного времени выполняющихся замеров текущего потока"""
+        if not hasattr(self.local, 'timers'):
+            self.local.timers = []
+        return self.local.timers
+
+    @contextmanager
+    def timer(self, name):
+        """Замер блока кода"""
+        timers = self.active_timers()
+        excluded = [0.0]
+        timers.append(excluded)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timers.pop()
+            self.record(name, time.perf_counter() - start - excluded[0])
+
+    @contextmanager
+    def excluded(self):
+        """Блок, время которого не входит в выполняющиеся замеры"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            for excluded in self.active_timers():
+                excluded[0] += elapsed
+
+    def untimed(self, func):
+        """Обертка функции, время которой не входит в замеры"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.excluded():
+                return func(*args, **kwargs)
+        return wrapper
+
+    def timed(self, name=None):
+        """Декоратор замера функции (по умолчанию имя - имя функции)"""
+        def decorator(func):
+            operation = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(operation):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """Счетчики всех операций: имя -> словарь"""
+        with self.lock:
+            return {name: stats.as_dict() for name, stats in sorted(self.stats.items())}
+
+    def dump(self, path=METRICS_DUMP):
+        """Выгрузка счетчиков в JSON-файл"""
+        report = {
+            'started': self.started.isoformat(timespec='seconds'),
+            'dumped': datetime.now().isoformat(timespec='seconds'),
+            'slow_threshold_ms': self.threshold * 1000,
+            'operations': self.snapshot()
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        return path
+
+
+class UntimedModule:
+    """Модуль, время в функциях которого не входит в замеры"""
+
+    def __init__(self, module, metrics):
+        self.module = module
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        value = getattr(self.module, name)
+        return self.metrics.untimed(value) if callable(value) else value
+
+
+metrics = Metrics()
+timed = metrics.timed
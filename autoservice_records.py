@@ -0,0 +1,221 @@
+import sys
+from collections import deque
+from collections.abc import MutableMapping
+from itertools import repeat
+from operator import attrgetter
+
+
+def intern_string(value):
+    """Общий экземпляр строки для повторяющихся значений"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def intern_strings(values):
+    """Список строк с общими экземплярами повторяющихся значений"""
+    return [intern_string(value) for value in values]
+
+
+class Record(MutableMapping):
+    """Запись с полями в слотах вместо словаря.
+
+    Ведет себя как словарь (record['fio'], get, update, items, dict(record)),
+    поэтому код, написанный для записей-словарей, работает без изменений.
+    Незаданное поле ведет себя как отсутствующий ключ, ключи не из FIELDS
+    хранятся в словаре extra_fields. В JSON запись пишется через as_json.
+
+    FIELDS - поля в порядке записи в JSON, CONVERTERS - преобразования
+    значений полей при присваивании (общие экземпляры строк, строки заказа),
+    ITEM_TYPES - типы записей в полях-списках записей.
+    """
+
+    __slots__ = ('extra_fields',)
+    FIELDS = ()
+    CONVERTERS = {}
+    ITEM_TYPES = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELD_SET = frozenset(cls.FIELDS)
+        cls.GETTER = attrgetter(*cls.FIELDS)
+
+    def __init__(self, fields=(), **kwargs):
+        self.extra_fields = None
+        self.update(fields, **kwargs)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Запись из словаря (например, разобранного из JSON)"""
+        record = cls.__new__(cls)
+        record.extra_fields = None
+        if cls.FIELD_SET.issuperset(data):
+            for key, value in data.items():
+                setattr(record, key, value)
+        else:
+            for key, value in data.items():
+                record[key] = value
+        for field, convert in cls.CONVERTERS.items():
+            value = getattr(record, field, None)
+            if value is not None:
+                setattr(record, field, convert(value))
+        return record
+
+    @classmethod
+    def from_columns(cls, columns, count):
+        """count записей из столбцов {поле: значения}.
+
+        Значения присваиваются дескрипторами слотов внутри map, без цикла
+        на Python по записям. CONVERTERS не применяются: значения должны
+        быть уже подготовлены (см. autoservice_binary).
+        """
+        records = list(map(cls.__new__, repeat(cls, count)))
+        deque(map(Record.extra_fields.__set__, records, repeat(None)), maxlen=0)
+        for field, values in columns.items():
+            deque(map(getattr(cls, field).__set__, records, values), maxlen=0)
+        return records
+
+    def __getitem__(self, key):
+        if key in self.FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        elif self.extra_fields and key in self.extra_fields:
+            return self.extra_fields[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self.FIELD_SET:
+            return getattr(self, key, default)
+        if self.extra_fields:
+            return self.extra_fields.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        if key in self.FIELD_SET:
+            convert = self.CONVERTERS.get(key)
+            setattr(self, key, convert(value) if convert and value is not None else value)
+        else:
+            if self.extra_fields is None:
+                self.extra_fields = {}
+            self.extra_fields[key] = value
+
+    def __delitem__(self, key):
+        if key in self.FIELD_SET:
+            try:
+                delattr(self, key)
+                return
+            except AttributeError:
+                pass
+        elif self.extra_fields and key in self.extra_fields:
+            del self.extra_fields[key]
+            return
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self.FIELD_SET:
+            return hasattr(self, key)
+        return bool(self.extra_fields) and key in self.extra_fields
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if hasattr(self, field):
+                yield field
+        if self.extra_fields:
+            yield from self.extra_fields
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.as_dict()!r})"
+
+    def as_dict(self):
+        """Поля записи в виде словаря.
+
+        Значения всех полей читаются одним вызовом attrgetter, который не
+        отпускает GIL, так что запись, меняющаяся в другом потоке, не
+        попадает в словарь наполовину измененной.
+        """
+        try:
+            result = dict(zip(self.FIELDS, self.GETTER(self)))
+        except AttributeError:
+            result = {field: getattr(self, field) for field in self.FIELDS if hasattr(self, field)}
+        if self.extra_fields:
+            result.update(self.extra_fields)
+        return result
+
+
+class Client(Record):
+    __slots__ = FIELDS = ('id', 'fio', 'phone', 'email')
+
+
+class Car(Record):
+    __slots__ = FIELDS = ('id', 'vin', 'brand', 'model', 'client_id')
+    CONVERTERS = {'brand': intern_string, 'model': intern_string}
+
+
+class Part(Record):
+    __slots__ = FIELDS = ('id', 'name', 'price', 'quantity')
+    CONVERTERS = {'name': intern_string}
+
+
+class OrderLine(Record):
+    """Строка заказа: название запчасти - общий экземпляр с названием в запчасти"""
+    __slots__ = FIELDS = ('part_id', 'name', 'price', 'quantity')
+    CONVERTERS = {'name': intern_string}
+
+
+def order_lines(lines):
+    """Строки заказа в виде записей OrderLine"""
+    return [OrderLine.from_dict(line) if isinstance(line, dict) else line for line in lines]
+
+
+class Order(Record):
+    __slots__ = FIELDS = ('id', 'date', 'client_id', 'car_id', 'works', 'parts', 'status', 'total')
+    CONVERTERS = {'works': intern_strings, 'parts': order_lines, 'status': intern_string}
+    ITEM_TYPES = {'parts': OrderLine}
+
+
+RECORD_TYPES = {
+    'clients': Client,
+    'cars': Car,
+    'orders': Order,
+    'parts': Part
+}
+
+
+def make_record(entity, data):
+    """Запись сущности из словаря (записи возвращаются как есть)"""
+    if isinstance(data, dict):
+        return RECORD_TYPES[entity].from_dict(data)
+    return data
+
+
+def make_records(entity, records):
+    """Замена словарей в списке записями на месте (словари освобождаются по ходу)"""
+    record_type = RECORD_TYPES[entity]
+    for index, data in enumerate(records):
+        if isinstance(data, dict):
+            records[index] = record_type.from_dict(data)
+    return records
+
+
+def plain_copy(value):
+    """Копия записи из словарей и списков (вложенные записи тоже копируются).
+
+    Копию можно сериализовать в другом потоке, пока запись меняется.
+    """
+    if isinstance(value, Record):
+        value = value.as_dict()
+    if isinstance(value, dict):
+        return {key: plain_copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [plain_copy(item) for item in value]
+    return value
+
+
+def as_json(value):
+    """Преобразование записей для json.dumps (параметр default)"""
+    if isinstance(value, Record):
+        return value.as_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
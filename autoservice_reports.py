@@ -0,0 +1,224 @@
+import heapq
+from array import array
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:  # Без numpy столбцы - массивы array, суммы - циклами Python
+    np = None
+
+PERIODS = ('day', 'week', 'month')
+PART_METRICS = ('quantity', 'revenue')
+
+
+class Categories:
+    """Коды значений столбца: значение -> номер в порядке появления"""
+
+    def __init__(self):
+        self.codes = {}
+        self.labels = []
+
+    def __len__(self):
+        return len(self.labels)
+
+    def code(self, value):
+        """Код значения (новое значение получает следующий номер)"""
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.labels)
+            self.labels.append(value)
+        return code
+
+
+def column(values):
+    """Столбец снимка: массив numpy поверх буфера array или сам array"""
+    if np is not None:
+        return np.frombuffer(values, dtype=np.int64 if values.typecode == 'q' else np.float64)
+    return values
+
+
+def group_totals(codes, values, size):
+    """Количество и сумма значений по кодам групп"""
+    if np is not None:
+        counts = np.bincount(codes, minlength=size)
+        sums = np.bincount(codes, weights=values, minlength=size)
+        return counts.tolist(), sums.tolist()
+    counts = [0] * size
+    sums = [0.0] * size
+    for code, value in zip(codes, values):
+        counts[code] += 1
+        sums[code] += value
+    return counts, sums
+
+
+def period_key(day, period):
+    """Метка периода для дня 'ГГГГ-ММ-ДД'"""
+    if period == 'day':
+        return day
+    try:
+        value = date.fromisoformat(day)
+    except ValueError:
+        return day
+    if period == 'week':
+        year, week, weekday = value.isocalendar()
+        return f"{year}-W{week:02d}"
+    return day[:7]
+
+
+class OrdersSnapshot:
+    """Столбцовый снимок заказов для отчетов.
+
+    Поля заказов и строк заказов разложены по массивам чисел: категории
+    (день, статус, клиент, марка, запчасть) заменены кодами, так что
+    группировка - это суммирование массива по кодам (bincount в numpy).
+    """
+
+    def __init__(self, orders, car_brand):
+        self.days = Categories()
+        self.statuses = Categories()
+        self.clients = Categories()
+        self.brands = Categories()
+        self.parts = Categories()
+        self.part_names = {}
+
+        day, status, client, brand = array('q'), array('q'), array('q'), array('q')
+        total = array('d')
+        line_part, line_quantity, line_revenue = array('q'), array('q'), array('d')
+        brand_codes = {}
+        for order in orders:
+            day.append(self.days.code(str(order.get('date', ''))[:10]))
+            status.append(self.statuses.code(order.get('status', '')))
+            client.append(self.clients.code(order.get('client_id')))
+            car_id = order.get('car_id')
+            if car_id not in brand_codes:
+                brand_codes[car_id] = self.brands.code(car_brand(car_id))
+            brand.append(brand_codes[car_id])
+            total.append(float(order.get('total') or 0))
+            for line in order.get('parts', ()):
+                line_part.append(self.parts.code(line['part_id']))
+                self.part_names[line['part_id']] = line['name']
+                line_quantity.append(line['quantity'])
+                line_revenue.append(line['price'] * line['quantity'])
+
+        self.day = column(day)
+        self.status = column(status)
+        self.client = column(client)
+        self.brand = column(brand)
+        self.total = column(total)
+        self.line_part = column(line_part)
+        self.line_quantity = column(line_quantity)
+        self.line_revenue = column(line_revenue)
+
+    def __len__(self):
+        return len(self.total)
+
+    @classmethod
+    def from_store(cls, store):
+        """Снимок всех заказов хранилища с архивными (марка берется из автомобиля заказа)"""
+        def car_brand(car_id):
+            car = store.get('cars', car_id)
+            return car['brand'] if car else ''
+        return cls(store.iter_order_history(), car_brand)
+
+    def revenue_by(self, codes, categories):
+        """Выручка по категориям: [(значение, заказов, сумма)]"""
+        counts, sums = group_totals(codes, self.total, len(categories))
+        return list(zip(categories.labels, counts, sums))
+
+    def revenue_by_period(self, period='day'):
+        """Выручка по дням, неделям или месяцам в порядке времени"""
+        if period not in PERIODS:
+            raise ValueError(f"Неизвестный период: {period}")
+        totals = {}
+        for day, count, revenue in self.revenue_by(self.day, self.days):
+            key = period_key(day, period)
+            old_count, old_revenue = totals.get(key, (0, 0.0))
+            totals[key] = (old_count + count, old_revenue + revenue)
+        return [(key, count, revenue) for key, (count, revenue) in sorted(totals.items())]
+
+    def revenue_by_status(self):
+        """Выручка по статусам заказов, по убыванию"""
+        return sorted(self.revenue_by(self.status, self.statuses), key=lambda row: -row[2])
+
+    def revenue_by_client(self, limit=None):
+        """Выручка по id клиентов, по убыванию"""
+        return top(self.revenue_by(self.client, self.clients), lambda row: row[2], limit)
+
+    def revenue_by_brand(self):
+        """Выручка по маркам автомобилей, по убыванию"""
+        return sorted(self.revenue_by(self.brand, self.brands), key=lambda row: -row[2])
+
+    def top_parts(self, by='quantity', limit=10):
+        """Самые продаваемые запчасти: [(id, название, количество, выручка)]"""
+        if by not in PART_METRICS:
+            raise ValueError(f"Неизвестный показатель: {by}")
+        size = len(self.parts)
+        if np is not None:
+            quantities = np.bincount(self.line_part, weights=self.line_quantity, minlength=size).tolist()
+            revenues = np.bincount(self.line_part, weights=self.line_revenue, minlength=size).tolist()
+        else:
+            quantities = [0] * size
+            revenues = [0.0] * size
+            for code, quantity, revenue in zip(self.line_part, self.line_quantity, self.line_revenue):
+                quantities[code] += quantity
+                revenues[code] += revenue
+        rows = [
+            (part_id, self.part_names[part_id], int(quantity), revenue)
+            for part_id, quantity, revenue in zip(self.parts.labels, quantities, revenues)
+        ]
+        return top(rows, lambda row: row[2] if by == 'quantity' else row[3], limit)
+
+
+def top(rows, key, limit=None):
+    """Строки по убыванию key (не больше limit)"""
+    if limit is None:
+        return sorted(rows, key=key, reverse=True)
+    return heapq.nlargest(limit, rows, key=key)
+
+
+class ReportEngine:
+    """Отчеты по заказам хранилища.
+
+    Снимок заказов строится при первом отчете и сбрасывается при
+    изменении заказов или автомобилей. Пока заказы загружаются, снимок
+    не запоминается.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.cached = None
+        store.subscribe(self.on_record_changed)
+
+    def on_record_changed(self, entity, record_id, record):
+        """Сброс снимка при изменении данных отчетов"""
+        if entity in ('orders', 'cars'):
+            self.cached = None
+
+    def snapshot(self):
+        """Актуальный снимок заказов"""
+        if self.cached is not None:
+            return self.cached
+        snapshot = OrdersSnapshot.from_store(self.store)
+        if self.store.orders_loaded:
+            self.cached = snapshot
+        return snapshot
+
+    def revenue_by_period(self, period='day'):
+        """Выручка по дням ('day'), неделям ('week') или месяцам ('month')"""
+        return self.snapshot().revenue_by_period(period)
+
+    def revenue_by_status(self):
+        """Выручка по статусам заказов"""
+        return self.snapshot().revenue_by_status()
+
+    def revenue_by_client(self, limit=None):
+        """Выручка по клиентам"""
+        return self.snapshot().revenue_by_client(limit)
+
+    def revenue_by_brand(self):
+        """Выручка по маркам автомобилей"""
+        return self.snapshot().revenue_by_brand()
+
+    def top_parts(self, by='quantity', limit=10):
+        """Запчасти с наибольшим количеством ('quantity') или выручкой ('revenue')"""
+        return self.snapshot().top_parts(by, limit)
@@ -0,0 +1,172 @@
+import bisect
+import re
+from operator import itemgetter
+
+TOKEN = re.compile(r'\w+')
+NON_DIGITS = re.compile(r'\D+')
+
+# Поля записей, по которым выполняется поиск
+SEARCH_FIELDS = {
+    'clients': ('fio', 'phone', 'email'),
+    'cars': ('vin', 'brand', 'model'),
+    'parts': ('name',)
+}
+
+# Во сколько раз строк цифр с префиксом должно быть больше уже найденных
+# записей, чтобы проверять цифры самих записей: id из среза списка
+# выбираются кодом на C, а проверка записи - циклом на Python
+DIGITS_FILTER_RATIO = 20
+
+
+def normalize(text):
+    """Приведение текста к виду для поиска (регистр, ё -> е)"""
+    return str(text).casefold().replace('ё', 'е')
+
+
+def tokenize(text):
+    """Слова текста и цифры каждой его строки для индекса.
+
+    Все цифры строки текста собираются в одну строку цифр, чтобы телефон
+    находился независимо от формата записи. Строки цифр возвращаются
+    отдельно от слов: у каждого телефона своя строка цифр, и в общем
+    списке слов они превращали бы префикс "7" в объединение множеств
+    по всем клиентам. По той же причине из слов убираются числа, равные
+    строке цифр (телефон без разделителей) - они находятся по цифрам.
+    """
+    text = normalize(text)
+    digits = set()
+    for line in text.split('\n'):
+        line_digits = NON_DIGITS.sub('', line)
+        if len(line_digits) > 1:
+            digits.add(line_digits)
+    return set(TOKEN.findall(text)) - digits, digits
+
+
+class SearchIndex:
+    """Инвертированный индекс по префиксам слов.
+
+    Для каждого слова хранится множество id записей, сами слова - в
+    отсортированном списке, так что слова с заданным префиксом находятся
+    двоичным поиском. Строки цифр хранятся отсортированным списком пар
+    (цифры, id) и тоже ищутся по префиксу двоичным поиском. Запрос
+    разбивается на слова, каждое ищется как префикс, результаты
+    пересекаются.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.postings = {}
+        self.tokens = []
+        self.record_tokens = {}
+        self.digits = []
+        self.record_digits = {}
+
+    def record_terms(self, record):
+        """Слова и строки цифр записи по индексируемым полям"""
+        return tokenize('\n'.join(str(record.get(field) or '') for field in self.fields))
+
+    def add(self, record):
+        """Добавление записи в индекс"""
+        record_id = record['id']
+        tokens, digits = self.record_terms(record)
+        self.record_tokens[record_id] = tokens
+        self.record_digits[record_id] = digits
+        for token in tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                bisect.insort(self.tokens, token)
+            ids.add(record_id)
+        for line_digits in digits:
+            bisect.insort(self.digits, (line_digits, record_id))
+
+    def remove(self, record_id):
+        """Удаление записи из индекса"""
+        for token in self.record_tokens.pop(record_id, ()):
+            ids = self.postings[token]
+            ids.discard(record_id)
+            if not ids:
+                del self.postings[token]
+                del self.tokens[bisect.bisect_left(self.tokens, token)]
+        for line_digits in self.record_digits.pop(record_id, ()):
+            del self.digits[bisect.bisect_left(self.digits, (line_digits, record_id))]
+
+    def update(self, record):
+        """Переиндексация измененной записи"""
+        self.remove(record['id'])
+        self.add(record)
+
+    def prefix_range(self, prefix):
+        """Границы слов с префиксом prefix в отсортированном списке"""
+        start = bisect.bisect_left(self.tokens, prefix)
+        stop = bisect.bisect_left(self.tokens, prefix + '\U0010ffff', start)
+        return start, stop
+
+    def digits_range(self, prefix):
+        """Границы строк цифр с префиксом prefix в отсортированном списке"""
+        start = bisect.bisect_left(self.digits, (prefix,))
+        stop = bisect.bisect_left(self.digits, (prefix + '\U0010ffff',), start)
+        return start, stop
+
+    def prefix_ids(self, prefix, within=None):
+        """id записей со словом или строкой цифр, начинающимися с prefix.
+
+        within - уже найденные записи: если подходящих слов больше, чем
+        этих записей (строк цифр - см. DIGITS_FILTER_RATIO), дешевле
+        проверить слова самих записей, чем объединять множества.
+        """
+        result = set()
+        start, stop = self.prefix_range(prefix)
+        if within is not None and stop - start > len(within):
+            result.update(
+                record_id for record_id in within
+                if any(token.startswith(prefix) for token in self.record_tokens[record_id])
+            )
+        else:
+            for token in self.tokens[start:stop]:
+                result |= self.postings[token]
+        if not prefix.isdecimal():
+            return result
+        start, stop = self.digits_range(prefix)
+        if within is not None and stop - start > len(within) * DIGITS_FILTER_RATIO:
+            result.update(
+                record_id for record_id in within
+                if any(line_digits.startswith(prefix) for line_digits in self.record_digits[record_id])
+            )
+        else:
+            result.update(map(itemgetter(1), self.digits[start:stop]))
+        return result
+
+    def search(self, query):
+        """id записей, подходящих под все слова запроса.
+
+        Первым ищется самое длинное слово, остальные - среди уже
+        найденных записей (см. prefix_ids).
+        """
+        terms = sorted(set(TOKEN.findall(normalize(query))), key=len, reverse=True)
+        result = None
+        for term in terms:
+            if result is None:
+                result = self.prefix_ids(term)
+            else:
+                result &= self.prefix_ids(term, result)
+            if not result:
+                break
+        return result if result is not None else set()
+
+    @classmethod
+    def build(cls, entity, records):
+        """Построение индекса по записям сущности"""
+        index = cls(SEARCH_FIELDS[entity])
+        digits = []
+        for record in records:
+            record_id = record['id']
+            tokens, record_digits = index.record_terms(record)
+            index.record_tokens[record_id] = tokens
+            index.record_digits[record_id] = record_digits
+            for token in tokens:
+                index.postings.setdefault(token, set()).add(record_id)
+            digits.extend((line_digits, record_id) for line_digits in record_digits)
+        index.tokens = sorted(index.postings)
+        index.digits = sorted(digits)
+        return index
@@ -0,0 +1,322 @@
+import argparse
+import json
+import os
+import sqlite3
+
+from autoservice_archive import ARCHIVE_DIR, OrderArchive
+from autoservice_storage import DATA_FILE, ENTITY_TYPES, JsonStorage
+from autoservice_store import Repository
+
+SQLITE_FILE = 'autoservice_data.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    id INTEGER PRIMARY KEY,
+    fio TEXT NOT NULL,
+    phone TEXT NOT NULL DEFAULT '',
+    email TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS cars (
+    id INTEGER PRIMARY KEY,
+    vin TEXT NOT NULL,
+    brand TEXT NOT NULL,
+    model TEXT NOT NULL,
+    client_id INTEGER NOT NULL REFERENCES clients (id)
+);
+CREATE TABLE IF NOT EXISTS parts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    quantity INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    client_id INTEGER REFERENCES clients (id),
+    car_id INTEGER REFERENCES cars (id),
+    works TEXT NOT NULL DEFAULT '[]',
+    status TEXT NOT NULL,
+    total NUMERIC NOT NULL
+);
+CREATE TABLE IF NOT EXISTS order_lines (
+    order_id INTEGER NOT NULL REFERENCES orders (id),
+    position INTEGER NOT NULL,
+    part_id INTEGER NOT NULL REFERENCES parts (id),
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (order_id, position)
+);
+CREATE TABLE IF NOT EXISTS next_ids (
+    entity TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cars_client_id ON cars (client_id);
+CREATE INDEX IF NOT EXISTS cars_vin ON cars (vin);
+CREATE INDEX IF NOT EXISTS orders_client_id ON orders (client_id);
+CREATE INDEX IF NOT EXISTS orders_car_id ON orders (car_id);
+CREATE INDEX IF NOT EXISTS orders_date ON orders (date);
+CREATE INDEX IF NOT EXISTS orders_status ON orders (status);
+CREATE INDEX IF NOT EXISTS order_lines_part_id ON order_lines (part_id);
+"""
+
+# Столбцы таблиц в порядке полей записей
+COLUMNS = {
+    'clients': ('id', 'fio', 'phone', 'email'),
+    'cars': ('id', 'vin', 'brand', 'model', 'client_id'),
+    'orders': ('id', 'date', 'client_id', 'car_id', 'works', 'status', 'total'),
+    'parts': ('id', 'name', 'price', 'quantity')
+}
+LINE_COLUMNS = ('part_id', 'name', 'price', 'quantity')
+
+
+class SqliteStore(Repository):
+    """Хранение данных автосервиса в базе SQLite.
+
+    Записи не держатся в памяти: каждый запрос выполняется к базе,
+    изменения накапливаются в транзакции и фиксируются вызовом save.
+    Строки заказов хранятся в отдельной таблице order_lines.
+    """
+
+    def __init__(self, path=SQLITE_FILE):
+        super().__init__()
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        # Журнал WAL: фиксация транзакции - дописывание в конец файла
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO next_ids (entity, value) VALUES (?, 1)",
+            [(key,) for key in ENTITY_TYPES.values()]
+        )
+        self.conn.commit()
+        self.load_unique_indexes()
+
+    def load_unique_indexes(self):
+        """Загрузка в память индексов уникальных полей"""
+        for entity, index in self.unique_indexes.items():
+            fields = [field for field, normalize, message in index.constraints]
+            rows = self.conn.execute(f"SELECT id, {', '.join(fields)} FROM {entity}")
+            for row in rows:
+                index.add(dict(zip(['id'] + fields, row)))
+
+    def to_record(self, entity, row):
+        """Преобразование строки таблицы в запись"""
+        record = dict(zip(COLUMNS[entity], row))
+        if entity == 'orders':
+            record['works'] = json.loads(record['works'])
+            record['parts'] = []
+        return record
+
+    def attach_lines(self, orders):
+        """Загрузка строк для списка заказов"""
+        by_id = {order['id']: order for order in orders}
+        ids = list(by_id)
+        # Ограничение SQLite на количество параметров в запросе
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT order_id, {', '.join(LINE_COLUMNS)} FROM order_lines "
+                f"WHERE order_id IN ({', '.join('?' * len(chunk))}) "
+                "ORDER BY order_id, position",
+                chunk
+            )
+            for row in rows:
+                by_id[row[0]]['parts'].append(dict(zip(LINE_COLUMNS, row[1:])))
+        return orders
+
+    def select(self, entity, where='', params=(), suffix=''):
+        """Выборка записей сущности"""
+        rows = self.conn.execute(
+            f"SELECT {', '.join(COLUMNS[entity])} FROM {entity} {where} ORDER BY id {suffix}",
+            params
+        )
+        records = [self.to_record(entity, row) for row in rows]
+        if entity == 'orders':
+            self.attach_lines(records)
+        return records
+
+    def get(self, entity, record_id, default=None):
+        """Получение записи по id"""
+        records = self.select(entity, "WHERE id = ?", (record_id,))
+        return records[0] if records else default
+
+    def all(self, entity):
+        """Все записи сущности"""
+        return self.select(entity)
+
+    def count(self, entity):
+        """Количество записей сущности"""
+        return self.conn.execute(f"SELECT COUNT(*) FROM {entity}").fetchone()[0]
+
+    def slice(self, entity, start, stop):
+        """Записи сущности с позиции start до stop"""
+        return self.select(entity, suffix="LIMIT ? OFFSET ?", params=(stop - start, start))
+
+    def iter_records(self, entity, chunk_size=500):
+        """Записи сущности по порядку: порции выбираются по id, а не по OFFSET"""
+        last_id = None
+        while True:
+            if last_id is None:
+                records = self.select(entity, suffix="LIMIT ?", params=(chunk_size,))
+            else:
+                records = self.select(entity, "WHERE id > ?", (last_id, chunk_size), "LIMIT ?")
+            yield from records
+            if len(records) < chunk_size:
+                return
+            last_id = records[-1]['id']
+
+    def next_id(self, entity_type):
+        """Получение следующего ID"""
+        next_id = self.conn.execute(
+            "SELECT value FROM next_ids WHERE entity = ?", (entity_type,)
+        ).fetchone()[0]
+        self.conn.execute(
+            "UPDATE next_ids SET value = ? WHERE entity = ?", (next_id + 1, entity_type)
+        )
+        return next_id
+
+    def allocate_ids(self, entity_type, count):
+        """Выделение count идущих подряд ID"""
+        start = self.next_id(entity_type)
+        self.conn.execute(
+            "UPDATE next_ids SET value = value + ? WHERE entity = ?", (count - 1, entity_type)
+        )
+        return range(start, start + count)
+
+    def write(self, entity, record):
+        """Запись строки сущности (и строк заказа)"""
+        values = [record.get(column) for column in COLUMNS[entity]]
+        if entity == 'orders':
+            values[COLUMNS[entity].index('works')] = json.dumps(
+                record.get('works', []), ensure_ascii=False
+            )
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO {entity} ({', '.join(COLUMNS[entity])}) "
+            f"VALUES ({', '.join('?' * len(values))})",
+            values
+        )
+        if entity == 'orders':
+            self.conn.execute("DELETE FROM order_lines WHERE order_id = ?", (record['id'],))
+            self.conn.executemany(
+                f"INSERT INTO order_lines (order_id, position, {', '.join(LINE_COLUMNS)}) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (record['id'], position) + tuple(line[c] for c in LINE_COLUMNS)
+                    for position, line in enumerate(record.get('parts', []))
+                ]
+            )
+        next_key = ENTITY_TYPES[entity]
+        self.conn.execute(
+            "UPDATE next_ids SET value = MAX(value, ?) WHERE entity = ?",
+            (record['id'] + 1, next_key)
+        )
+        return record
+
+    def insert(self, entity, record):
+        """Добавление записи"""
+        self.check_unique(entity, record)
+        self.write(entity, record)
+        self.index_unique(entity, record)
+        self.notify(entity, record['id'], record)
+        return record
+
+    def update(self, entity, record):
+        """Сохранение изменений записи"""
+        self.check_unique(entity, record, record['id'])
+        self.write(entity, record)
+        self.unindex_unique(entity, record['id'])
+        self.index_unique(entity, record)
+        self.notify(entity, record['id'], record)
+        return record
+
+    def delete(self, entity, record_id):
+        """Удаление записи по id"""
+        record = self.get(entity, record_id)
+        if record is None:
+            return None
+        if entity == 'orders':
+            self.conn.execute("DELETE FROM order_lines WHERE order_id = ?", (record_id,))
+        self.conn.execute(f"DELETE FROM {entity} WHERE id = ?", (record_id,))
+        self.unindex_unique(entity, record_id)
+        self.notify(entity, record_id, None)
+        return record
+
+    def cars_of_client(self, client_id):
+        """Автомобили клиента"""
+        return self.select('cars', "WHERE client_id = ?", (client_id,))
+
+    def count_cars(self, client_id):
+        """Количество автомобилей клиента"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM cars WHERE client_id = ?", (client_id,)
+        ).fetchone()[0]
+
+    def count_orders(self, car_id):
+        """Количество заказов автомобиля"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM orders WHERE car_id = ?", (car_id,)
+        ).fetchone()[0]
+
+    def count_part_usage(self, part_id):
+        """Количество строк заказов с запчастью"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM order_lines WHERE part_id = ?", (part_id,)
+        ).fetchone()[0]
+
+    def save(self):
+        """Фиксация транзакции"""
+        self.conn.commit()
+
+    def close(self):
+        """Фиксация изменений и закрытие базы"""
+        self.conn.commit()
+        self.conn.close()
+
+
+def import_json(json_path=DATA_FILE, db_path=SQLITE_FILE, archive_path=None):
+    """Перенос данных из JSON-файла (с учетом журнала) в базу SQLite.
+
+    Данные читаются через JsonStorage: он применяет журнал, не изменяя
+    файлов режима журнала. Заказы из всех месяцев архива (по умолчанию -
+    каталог архива рядом с JSON-файлом) переносятся в ту же таблицу
+    orders: у базы нет отдельного архива, и проверки при удалении
+    автомобилей и запчастей должны видеть и архивные заказы.
+    """
+    if archive_path is None:
+        archive_path = os.path.join(os.path.dirname(json_path), ARCHIVE_DIR)
+    storage = JsonStorage(json_path)
+    try:
+        data = storage.load()
+    finally:
+        storage.close()
+    archive = OrderArchive(archive_path, cache_months=1)
+    store = SqliteStore(db_path)
+    with store.conn:
+        for entity in ENTITY_TYPES:
+            store.conn.execute(f"DELETE FROM {entity}")
+        store.conn.execute("DELETE FROM order_lines")
+        for entity in ENTITY_TYPES:
+            if entity == 'orders':
+                for order in archive.iter_orders():
+                    store.write('orders', order)
+            for record in data[entity]:
+                store.write(entity, record)
+        store.conn.executemany(
+            "UPDATE next_ids SET value = MAX(value, ?) WHERE entity = ?",
+            [(value, key) for key, value in data['next_ids'].items()]
+        )
+    counts = {entity: store.count(entity) for entity in ENTITY_TYPES}
+    store.close()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перенос данных автосервиса из JSON в SQLite")
+    parser.add_argument('json_path', nargs='?', default=DATA_FILE)
+    parser.add_argument('db_path', nargs='?', default=SQLITE_FILE)
+    parser.add_argument('--archive', help="каталог архива заказов (по умолчанию - рядом с JSON-файлом)")
+    args = parser.parse_args()
+    for entity, count in import_json(args.json_path, args.db_path, args.archive).items():
+        print(f"{entity}: {count}")
@@ -0,0 +1,582 @@
+import json
+import os
+import re
+import threading
+import time
+
+from autoservice_binary import SnapshotError, decode_snapshot, decode_snapshot_head, encode_snapshot, is_binary_snapshot
+from autoservice_metrics import metrics, timed
+from autoservice_records import as_json, make_records, plain_copy
+
+DATA_FILE = 'autoservice_data.json'
+JOURNAL_SUFFIX = '.journal'
+
+# Режим хранения: 'json' - полная перезапись файла при каждом сохранении,
+# 'journal' - снимок + журнал изменений с периодическим сжатием,
+# 'sqlite' - база SQLite (см. autoservice_sqlite.py)
+STORAGE_MODE = os.environ.get('AUTOSERVICE_STORAGE', 'journal')
+
+# Формат снимка данных: 'json' или 'binary' (см. autoservice_binary.py).
+# Формат при чтении определяется по содержимому файла, поэтому смена
+# настройки не требует преобразования: файл перезапишется в новом формате
+# при следующем полном сохранении или сжатии журнала
+SNAPSHOT_FORMAT = os.environ.get('AUTOSERVICE_SNAPSHOT', 'json')
+
+# Сжатие двоичного снимка: 'none', 'zlib' или 'lzma'
+SNAPSHOT_COMPRESSION = os.environ.get('AUTOSERVICE_SNAPSHOT_COMPRESSION', 'none')
+
+# Количество записей журнала, после которого снимок пересобирается в фоне
+COMPACT_THRESHOLD = 1000
+
+# Сохранение в фоновом потоке: правки, между которыми прошло меньше
+# SAVE_DELAY секунд, записываются одной операцией, но не позже чем через
+# SAVE_MAX_DELAY секунд после первой несохраненной правки
+BACKGROUND_SAVE = True
+SAVE_DELAY = 0.5
+SAVE_MAX_DELAY = 5.0
+
+# Количество заказов в одной порции при фоновой загрузке
+ORDERS_CHUNK_SIZE = 2000
+
+WHITESPACE = re.compile(r'\s*')
+
+# Соответствие коллекций данных и ключей в next_ids
+ENTITY_TYPES = {
+    'clients': 'client',
+    'cars': 'car',
+    'orders': 'order',
+    'parts': 'part'
+}
+
+
+def empty_data():
+    """Пустая структура данных"""
+    return {
+        'clients': [],
+        'cars': [],
+        'orders': [],
+        'parts': [],
+        'next_ids': {
+            'client': 1,
+            'car': 1,
+            'order': 1,
+            'part': 1
+        }
+    }
+
+
+def read_snapshot(path):
+    """Чтение снимка данных (JSON или двоичного)"""
+    if not os.path.exists(path):
+        return empty_data()
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+        if is_binary_snapshot(content):
+            return decode_snapshot(content)
+        return json.loads(content.decode('utf-8'))
+    except (FileNotFoundError, UnicodeDecodeError, json.JSONDecodeError, SnapshotError):
+        return empty_data()
+
+
+def parse_snapshot_head(text):
+    """Разбор снимка до списка заказов.
+
+    Возвращает данные с пустым списком заказов и позицию, с которой в
+    тексте начинается список заказов. Снимки пишутся с заказами в конце,
+    поэтому все остальное разбирается сразу. В снимках старого формата
+    после заказов идут другие ключи - тогда заказы разбираются здесь же
+    и возвращается позиция None.
+    """
+    decoder = json.JSONDecoder()
+    data = {}
+    orders_pos = None
+    pos = WHITESPACE.match(text, 0).end()
+    if text[pos:pos + 1] != '{':
+        raise json.JSONDecodeError("Ожидался объект", text, pos)
+    pos += 1
+    while True:
+        pos = WHITESPACE.match(text, pos).end()
+        if text[pos:pos + 1] == '}':
+            break
+        if text[pos:pos + 1] == ',':
+            pos = WHITESPACE.match(text, pos + 1).end()
+        key, pos = decoder.raw_decode(text, pos)
+        pos = WHITESPACE.match(text, pos).end()
+        if text[pos:pos + 1] != ':':
+            raise json.JSONDecodeError("Ожидалось ':'", text, pos)
+        pos = WHITESPACE.match(text, pos + 1).end()
+        if key == 'orders' and all(k in data for k in ('clients', 'cars', 'parts', 'next_ids')):
+            orders_pos = pos
+            break
+        data[key], pos = decoder.raw_decode(text, pos)
+    data.setdefault('orders', [])
+    return data, orders_pos
+
+
+def iter_orders(text, pos, chunk_size=ORDERS_CHUNK_SIZE):
+    """Разбор списка заказов порциями: (заказы, доля разобранного текста)"""
+    decoder = json.JSONDecoder()
+    pos = WHITESPACE.match(text, pos).end()
+    if text[pos:pos + 1] != '[':
+        raise json.JSONDecodeError("Ожидался список заказов", text, pos)
+    pos += 1
+    chunk = []
+    while True:
+        pos = WHITESPACE.match(text, pos).end()
+        if text[pos:pos + 1] == ',':
+            pos = WHITESPACE.match(text, pos + 1).end()
+        if text[pos:pos + 1] == ']':
+            break
+        order, pos = decoder.raw_decode(text, pos)
+        chunk.append(order)
+        if len(chunk) >= chunk_size:
+            yield chunk, pos / len(text)
+            chunk = []
+    if chunk:
+        yield chunk, 1.0
+
+
+def iter_chunks(records, chunk_size=ORDERS_CHUNK_SIZE):
+    """Готовый список записей порциями: (записи, доля выданного)"""
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        yield chunk, (start + len(chunk)) / len(records)
+
+
+def fsync_dir(path):
+    """Сброс на диск записи каталога (после переименования файла)"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def serialize_snapshot(data, snapshot_format=None, compression=None):
+    """Содержимое файла снимка: текст JSON или байты двоичного снимка.
+
+    Формат и сжатие по умолчанию - из SNAPSHOT_FORMAT и SNAPSHOT_COMPRESSION.
+    JSON сериализуется одним вызовом json.dumps без отступов. Записи
+    преобразуются в словари кодом на Python, между записями поток может
+    смениться, поэтому при сериализации из фонового потока данные не
+    должны меняться: BackgroundWriter держит для этого блокировку данных.
+    """
+    if (snapshot_format or SNAPSHOT_FORMAT) == 'binary':
+        return encode_snapshot(data, compression or SNAPSHOT_COMPRESSION)
+    # Заказы пишутся последними, чтобы остальное можно было загрузить
+    # раньше них (см. parse_snapshot_head)
+    ordered = {key: value for key, value in data.items() if key != 'orders'}
+    ordered['orders'] = data['orders']
+    return json.dumps(ordered, ensure_ascii=False, default=as_json)
+
+
+def write_snapshot(path, data, snapshot_format=None, compression=None):
+    """Атомарная запись снимка данных через временный файл"""
+    write_atomic(path, serialize_snapshot(data, snapshot_format, compression))
+
+
+def write_atomic(path, content):
+    """Запись текста или байтов в файл через временный файл с переименованием"""
+    tmp_path = path + '.tmp'
+    if isinstance(content, bytes):
+        f = open(tmp_path, 'wb')
+    else:
+        f = open(tmp_path, 'w', encoding='utf-8')
+    with f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(path)
+
+
+def read_journal(path):
+    """Чтение записей журнала (оборванная последняя строка пропускается)"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Запись не успела дописаться до конца - дальше данных нет
+                return
+
+
+def repair_journal(path):
+    """Отрезание оборванной последней записи журнала"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        content = f.read()
+        if content and not content.endswith(b'\n'):
+            f.truncate(content.rfind(b'\n') + 1)
+
+
+def replay(data, changes):
+    """Применение записей журнала к данным"""
+    by_id = {
+        entity: {r['id']: r for r in data[entity]}
+        for entity in ENTITY_TYPES
+    }
+    for change in changes:
+        records = by_id[change['entity']]
+        if change['op'] == 'put':
+            record = change['record']
+            records[record['id']] = record
+            key = ENTITY_TYPES[change['entity']]
+            data['next_ids'][key] = max(data['next_ids'][key], record['id'] + 1)
+        elif change['op'] == 'delete':
+            records.pop(change['id'], None)
+    for entity, records in by_id.items():
+        data[entity] = list(records.values())
+    return data
+
+
+class JsonStorage:
+    """Хранение всех данных в одном JSON-файле.
+
+    Журнал, оставшийся от режима журнала, применяется при загрузке и
+    удаляется после записи снимка, так что режимы можно чередовать.
+    """
+
+    # save записывает данные целиком, а не только список изменений
+    writes_data = True
+
+    def __init__(self, path=DATA_FILE):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.compacting_path = self.journal_path + '.compacting'
+
+    def load(self):
+        """Загрузка данных"""
+        data = read_snapshot(self.path)
+        return replay(data, list(read_journal(self.compacting_path)) + list(read_journal(self.journal_path)))
+
+    def save(self, data, changes=None):
+        """Сохранение данных (список изменений не используется)"""
+        self.save_snapshot(serialize_snapshot(data))
+
+    def save_snapshot(self, content):
+        """Запись готового содержимого снимка (см. serialize_snapshot)"""
+        write_atomic(self.path, content)
+        self.remove_journal()
+
+    def remove_journal(self):
+        """Удаление журнала, уже вошедшего в снимок"""
+        for path in (self.journal_path, self.compacting_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        """Завершение работы с хранилищем"""
+
+
+class JournalStorage(JsonStorage):
+    """Снимок данных + журнал изменений.
+
+    Каждое изменение дописывается в журнал отдельной строкой, поэтому
+    стоимость сохранения зависит от размера изменения, а не всех данных.
+    Когда журнал разрастается, он переименовывается и в фоновом потоке
+    сливается со снимком. Записи журнала идемпотентны (запись целиком
+    или удаление по id), так что повторное применение после сбоя безопасно.
+    """
+
+    writes_data = False
+
+    def __init__(self, path=DATA_FILE, compact_threshold=COMPACT_THRESHOLD):
+        super().__init__(path)
+        self.compact_threshold = compact_threshold
+        self.entries = 0
+        self.lock = threading.Lock()
+        self.compactor = None
+
+    def load(self):
+        """Загрузка снимка и применение журнала"""
+        data = read_snapshot(self.path)
+        repair_journal(self.journal_path)
+        pending = list(read_journal(self.compacting_path))
+        journal = list(read_journal(self.journal_path))
+        self.entries = len(journal)
+        replay(data, pending + journal)
+        return data
+
+    def load_partial(self):
+        """Загрузка данных без заказов.
+
+        Возвращает данные с пустым списком заказов и генератор порций
+        заказов (заказы, доля загруженного) для разбора в фоновом потоке.
+        Записи журнала о заказах применяются к заказам по мере разбора,
+        порции выдаются уже в виде записей Record, чтобы и это преобразование
+        выполнялось в фоновом потоке. Заказы двоичного снимка декодируются
+        в фоновом потоке целиком и выдаются порциями.
+        """
+        content = b''
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                content = f.read()
+        text = ''
+        binary_orders = None
+        try:
+            if is_binary_snapshot(content):
+                data, binary_orders = decode_snapshot_head(content)
+                orders_pos = None
+            else:
+                text = content.decode('utf-8')
+                data, orders_pos = parse_snapshot_head(text) if text else (empty_data(), None)
+        except (UnicodeDecodeError, json.JSONDecodeError, SnapshotError):
+            data, orders_pos, binary_orders = empty_data(), None, None
+
+        repair_journal(self.journal_path)
+        pending = list(read_journal(self.compacting_path))
+        journal = list(read_journal(self.journal_path))
+        self.entries = len(journal)
+
+        changes = pending + journal
+        replay(data, [c for c in changes if c['entity'] != 'orders'])
+        # Итоговое состояние заказов по журналу: запись или None (удален)
+        journal_orders = {}
+        for change in changes:
+            if change['entity'] != 'orders':
+                continue
+            if change['op'] == 'put':
+                record = change['record']
+                journal_orders[record['id']] = record
+                data['next_ids']['order'] = max(data['next_ids']['order'], record['id'] + 1)
+            elif change['op'] == 'delete':
+                journal_orders[change['id']] = None
+
+        # В снимке старого формата заказы уже разобраны
+        parsed_orders, data['orders'] = data['orders'], []
+
+        def orders():
+            if binary_orders is not None:
+                chunks = iter_chunks(binary_orders())
+            elif orders_pos is not None:
+                chunks = iter_orders(text, orders_pos)
+            else:
+                chunks = [(parsed_orders, 1.0)]
+            for chunk, progress in chunks:
+                result = []
+                for order in chunk:
+                    if order['id'] in journal_orders:
+                        order = journal_orders.pop(order['id'])
+                        if order is None:
+                            continue
+                    result.append(order)
+                yield make_records('orders', result), progress
+            yield make_records('orders', [order for order in journal_orders.values() if order is not None]), 1.0
+
+        return data, orders()
+
+    def save(self, data, changes=None):
+        """Дописывание изменений в журнал.
+
+        Без списка изменений данные сохраняются целиком в новый снимок.
+        """
+        if changes is None:
+            self.save_snapshot(serialize_snapshot(data))
+            return
+
+        if not changes:
+            return
+        with self.lock:
+            self.append(changes)
+        if self.entries >= self.compact_threshold:
+            self.compact_in_background()
+
+    def save_snapshot(self, content):
+        """Запись готового снимка вместо снимка и журнала"""
+        self.wait()
+        with self.lock:
+            write_atomic(self.path, content)
+            self.remove_journal()
+            self.entries = 0
+
+    def append(self, changes):
+        """Дописывание записей в журнал (под self.lock)"""
+        lines = ''.join(json.dumps(change, ensure_ascii=False, default=as_json) + '\n' for change in changes)
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries += len(changes)
+
+    def compact_in_background(self):
+        """Запуск сжатия журнала в фоновом потоке"""
+        if self.compactor is not None and self.compactor.is_alive():
+            return
+        self.compactor = threading.Thread(target=self.compact, name='journal-compactor')
+        self.compactor.start()
+
+    @timed('compact_journal')
+    def compact(self):
+        """Слияние журнала со снимком"""
+        with self.lock:
+            if not os.path.exists(self.compacting_path):
+                if not os.path.exists(self.journal_path):
+                    return
+                os.replace(self.journal_path, self.compacting_path)
+                self.entries = 0
+        data = replay(read_snapshot(self.path), read_journal(self.compacting_path))
+        write_snapshot(self.path, data)
+        os.remove(self.compacting_path)
+
+    def wait(self):
+        """Ожидание завершения фонового сжатия"""
+        if self.compactor is not None:
+            self.compactor.join()
+
+    def close(self):
+        """Завершение работы с хранилищем"""
+        self.wait()
+
+
+class BackgroundWriter:
+    """Сохранение через другое хранилище в фоновом потоке.
+
+    save только запоминает данные и изменения и помечает их как
+    несохраненные. Поток дожидается паузы в правках и сохраняет все
+    накопленное одним вызовом, так что серия правок дает одну запись на
+    диск, а главный поток не ждет диска. flush сохраняет немедленно и
+    дожидается записи. Ошибка записи выбрасывается из следующего
+    вызова save или flush.
+
+    Снимок получается согласованным между записями: изменения копируются
+    в save, в главном потоке, а данные целиком (полное сохранение или
+    хранилище с writes_data) сериализуются под блокировкой data_lock,
+    которую держат и изменения данных (см. Repository.lock). Запись на
+    диск и fsync идут уже после ее снятия, так что правка данных ждет
+    только сериализации.
+    """
+
+    def __init__(self, storage, delay=SAVE_DELAY, max_delay=SAVE_MAX_DELAY):
+        self.storage = storage
+        self.delay = delay
+        self.max_delay = max_delay
+        self.cond = threading.Condition()
+        self.data_lock = threading.RLock()
+        self.data = None
+        self.changes = []
+        self.full = False
+        self.dirty = False
+        self.urgent = False
+        self.writing = False
+        self.closed = False
+        self.error = None
+        self.first_change = self.last_change = 0
+        self.thread = threading.Thread(target=self.run, name='storage-writer', daemon=True)
+        self.thread.start()
+
+    def load(self):
+        """Загрузка данных"""
+        return self.storage.load()
+
+    def load_partial(self):
+        """Загрузка данных без заказов (см. JournalStorage.load_partial)"""
+        return self.storage.load_partial()
+
+    def save(self, data, changes=None):
+        """Постановка изменений в очередь на запись"""
+        if changes is not None:
+            # Копия изменений на момент вызова: записи могут измениться
+            # до того, как поток дойдет до их записи
+            changes = [plain_copy(change) for change in changes]
+        with self.cond:
+            self.raise_error()
+            self.data = data
+            if changes is None:
+                self.full = True
+            else:
+                self.changes.extend(changes)
+            now = time.monotonic()
+            if not self.dirty:
+                self.first_change = now
+            self.last_change = now
+            self.dirty = True
+            self.cond.notify_all()
+
+    def run(self):
+        """Цикл фонового потока записи"""
+        while True:
+            with self.cond:
+                while not self.dirty and not self.closed:
+                    self.cond.wait()
+                if not self.dirty:
+                    return
+                # Ждем паузы в правках
+                while not self.urgent and not self.closed:
+                    deadline = min(self.last_change + self.delay, self.first_change + self.max_delay)
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self.cond.wait(timeout)
+                data, changes, full = self.data, self.changes, self.full
+                self.changes, self.full = [], False
+                self.dirty = self.urgent = False
+                self.writing = True
+            try:
+                # save_data в главном потоке замеряет только постановку в
+                # очередь, сама запись на диск замеряется здесь
+                if full or self.storage.writes_data:
+                    with metrics.timer('storage_save'):
+                        with self.data_lock:
+                            content = serialize_snapshot(data)
+                        self.storage.save_snapshot(content)
+                else:
+                    with metrics.timer('storage_save'):
+                        self.storage.save(data, changes)
+            except Exception as e:
+                with self.cond:
+                    self.error = e
+            finally:
+                with self.cond:
+                    self.writing = False
+                    self.cond.notify_all()
+
+    def raise_error(self):
+        """Выброс ошибки, случившейся при фоновой записи"""
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def flush(self):
+        """Немедленная запись и ожидание ее завершения"""
+        with self.cond:
+            if self.dirty:
+                self.urgent = True
+                self.cond.notify_all()
+            while (self.dirty or self.writing) and self.thread.is_alive():
+                self.cond.wait()
+            self.raise_error()
+
+    def close(self):
+        """Запись несохраненных изменений и остановка потока"""
+        try:
+            self.flush()
+        finally:
+            with self.cond:
+                self.closed = True
+                self.cond.notify_all()
+            self.thread.join()
+            self.storage.close()
+
+
+def create_storage(mode=None, path=DATA_FILE):
+    """Создание хранилища для выбранного режима"""
+    mode = mode or STORAGE_MODE
+    if mode == 'json':
+        storage = JsonStorage(path)
+    elif mode == 'journal':
+        storage = JournalStorage(path)
+    else:
+        raise ValueError(f"Неизвестный режим хранения: {mode}")
+    if BACKGROUND_SAVE:
+        storage = BackgroundWriter(storage)
+    return storage
@@ -0,0 +1,535 @@
+import functools
+import re
+import threading
+from collections import Counter, defaultdict
+
+from autoservice_archive import OrderArchive
+from autoservice_records import make_record, make_records
+from autoservice_storage import ENTITY_TYPES, STORAGE_MODE, create_storage
+
+
+class UniqueConstraintError(Exception):
+    """Нарушение ограничения уникальности"""
+
+
+def normalize_vin(value):
+    """VIN без учета регистра и пробелов по краям"""
+    return value.strip().upper()
+
+
+def normalize_phone(value):
+    """Телефон как цифры номера (8 в начале российского номера - как 7)"""
+    digits = re.sub(r'\D', '', value)
+    if len(digits) == 11 and digits.startswith('8'):
+        digits = '7' + digits[1:]
+    return digits
+
+
+def normalize_name(value):
+    """Название без учета регистра, ё и лишних пробелов"""
+    return ' '.join(value.casefold().replace('ё', 'е').split())
+
+
+# Ограничения уникальности: сущность -> [(поле, нормализация, сообщение)].
+# Пустые значения не проверяются.
+UNIQUE_CONSTRAINTS = {
+    'clients': [('phone', normalize_phone, "Клиент с таким телефоном уже существует")],
+    'cars': [('vin', normalize_vin, "Автомобиль с таким VIN уже существует")],
+    'parts': [('name', normalize_name, "Запчасть с таким названием уже существует")]
+}
+
+
+class UniqueIndex:
+    """Хеш-индексы нормализованных уникальных полей одной сущности.
+
+    Для ключа хранится множество id, чтобы уже имеющиеся в данных
+    дубликаты не мешали загрузке; новые дубликаты не допускаются.
+    """
+
+    def __init__(self, constraints):
+        self.constraints = constraints
+        self.ids_by_key = {field: {} for field, normalize, message in constraints}
+        self.record_keys = {}
+
+    def keys(self, record):
+        """Нормализованные значения уникальных полей записи"""
+        keys = {}
+        for field, normalize, message in self.constraints:
+            value = record.get(field)
+            key = normalize(str(value)) if value is not None else ''
+            if key:
+                keys[field] = key
+        return keys
+
+    def check(self, record, record_id=None):
+        """Проверка уникальности полей записи (record_id - id изменяемой записи).
+
+        У изменяемой записи проверяются только поля, нормализованное
+        значение которых изменилось: иначе уже имеющийся в данных дубликат
+        не дал бы изменить, например, остаток запчасти.
+        """
+        keys = self.keys(record)
+        old_keys = self.record_keys.get(record_id, {}) if record_id is not None else {}
+        for field, normalize, message in self.constraints:
+            if field not in keys or keys[field] == old_keys.get(field):
+                continue
+            ids = self.ids_by_key[field].get(keys[field], ())
+            if any(other_id != record_id for other_id in ids):
+                raise UniqueConstraintError(message)
+
+    def add(self, record):
+        """Добавление записи в индексы"""
+        keys = self.keys(record)
+        self.record_keys[record['id']] = keys
+        for field, key in keys.items():
+            self.ids_by_key[field].setdefault(key, set()).add(record['id'])
+
+    def remove(self, record_id):
+        """Удаление записи из индексов"""
+        for field, key in self.record_keys.pop(record_id, {}).items():
+            ids = self.ids_by_key[field][key]
+            ids.discard(record_id)
+            if not ids:
+                del self.ids_by_key[field][key]
+
+    def find(self, field, value):
+        """id записей с таким значением уникального поля"""
+        for constraint_field, normalize, message in self.constraints:
+            if constraint_field == field:
+                return set(self.ids_by_key[field].get(normalize(str(value)), ()))
+        raise KeyError(field)
+
+
+def locked(method):
+    """Метод хранилища, меняющий данные, под блокировкой self.lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class Repository:
+    """Интерфейс доступа к данным автосервиса.
+
+    entity - имя коллекции ('clients', 'cars', 'orders', 'parts'),
+    записи - словари в формате JSON-файла данных. Измененную на месте
+    запись нужно передать в update, изменения фиксируются вызовом save.
+
+    Если orders_loaded ложно, заказы еще загружаются: порции заказов
+    выдает генератор pending_orders, и проверки по заказам неполны.
+
+    Закрытые заказы могут быть перенесены в архив (archive): тогда
+    коллекция 'orders' - только рабочий набор, а все заказы вместе с
+    архивными выдает iter_order_history.
+
+    lock - блокировка данных: ее держат изменения записей (вместе с
+    изменением на месте перед update, см. AutoserviceService) и запись
+    данных целиком из фонового потока.
+    """
+
+    orders_loaded = True
+    pending_orders = None
+    archive = None
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.listeners = []
+        self.unique_indexes = {
+            entity: UniqueIndex(constraints)
+            for entity, constraints in UNIQUE_CONSTRAINTS.items()
+        }
+
+    def check_unique(self, entity, record, record_id=None):
+        """Проверка ограничений уникальности для новых значений полей.
+
+        record - новые значения полей, record_id - id изменяемой записи.
+        Выбрасывает UniqueConstraintError. Запись, изменяемую на месте,
+        нужно проверить до изменения: update тоже проверяет ограничения,
+        но к этому моменту запись уже изменена.
+        """
+        index = self.unique_indexes.get(entity)
+        if index is not None:
+            index.check(record, record_id)
+
+    def find_unique(self, entity, field, value):
+        """id записи по значению уникального поля (None - не найдена)"""
+        ids = self.unique_indexes[entity].find(field, value)
+        return min(ids) if ids else None
+
+    def index_unique(self, entity, record):
+        """Добавление записи в индексы уникальности"""
+        index = self.unique_indexes.get(entity)
+        if index is not None:
+            index.add(record)
+
+    def unindex_unique(self, entity, record_id):
+        """Удаление записи из индексов уникальности"""
+        index = self.unique_indexes.get(entity)
+        if index is not None:
+            index.remove(record_id)
+
+    def subscribe(self, listener):
+        """Подписка на изменения записей.
+
+        listener(entity, record_id, record) вызывается после добавления
+        и изменения записи, а после удаления - с record=None.
+        """
+        self.listeners.append(listener)
+
+    def notify(self, entity, record_id, record):
+        """Оповещение подписчиков об изменении записи"""
+        for listener in self.listeners:
+            listener(entity, record_id, record)
+
+    def get(self, entity, record_id, default=None):
+        """Получение записи по id"""
+        raise NotImplementedError
+
+    def all(self, entity):
+        """Все записи сущности в порядке id"""
+        raise NotImplementedError
+
+    def count(self, entity):
+        """Количество записей сущности"""
+        raise NotImplementedError
+
+    def slice(self, entity, start, stop):
+        """Записи сущности с позиции start до stop"""
+        raise NotImplementedError
+
+    def iter_records(self, entity, chunk_size=500):
+        """Записи сущности по порядку, порциями по chunk_size"""
+        start = 0
+        while True:
+            records = self.slice(entity, start, start + chunk_size)
+            yield from records
+            if len(records) < chunk_size:
+                return
+            start += chunk_size
+
+    def iter_order_history(self, date_from=None, date_to=None):
+        """Все заказы, включая архивные: сначала архив по месяцам, затем рабочий набор.
+
+        date_from и date_to ('ГГГГ-ММ-ДД') только отсекают месяцы архива,
+        отбор заказов по дате - дело вызывающего.
+        """
+        if self.archive is not None:
+            for order in self.archive.iter_orders(date_from, date_to):
+                # После сбоя при переносе заказ может остаться и в рабочем наборе
+                if self.get('orders', order['id']) is None:
+                    yield order
+        yield from self.iter_records('orders')
+
+    def archived_months(self):
+        """Месяцы архива заказов по возрастанию"""
+        return self.archive.months() if self.archive is not None else []
+
+    def archived_orders(self, month):
+        """Архивные заказы одного месяца"""
+        return self.archive.read_month(month) if self.archive is not None else []
+
+    def get_archived_order(self, order_id):
+        """Архивный заказ по id"""
+        return self.archive.get(order_id) if self.archive is not None else None
+
+    def archive_orders(self, statuses, before):
+        """Перенос в архив заказов со статусом из statuses и датой не позже before.
+
+        Возвращает количество перенесенных заказов.
+        """
+        return 0
+
+    def next_id(self, entity_type):
+        """Получение следующего ID ('client', 'car', 'order', 'part')"""
+        raise NotImplementedError
+
+    def allocate_ids(self, entity_type, count):
+        """Выделение count идущих подряд ID (range)"""
+        raise NotImplementedError
+
+    def insert(self, entity, record):
+        """Добавление записи"""
+        raise NotImplementedError
+
+    def update(self, entity, record):
+        """Сохранение изменений записи"""
+        raise NotImplementedError
+
+    def delete(self, entity, record_id):
+        """Удаление записи по id"""
+        raise NotImplementedError
+
+    def cars_of_client(self, client_id):
+        """Автомобили клиента"""
+        raise NotImplementedError
+
+    def count_cars(self, client_id):
+        """Количество автомобилей клиента"""
+        raise NotImplementedError
+
+    def count_orders(self, car_id):
+        """Количество заказов автомобиля"""
+        raise NotImplementedError
+
+    def count_part_usage(self, part_id):
+        """Количество строк заказов с запчастью"""
+        raise NotImplementedError
+
+    def save(self):
+        """Фиксация изменений"""
+        raise NotImplementedError
+
+    def close(self):
+        """Завершение работы с хранилищем"""
+
+
+class DataStore(Repository):
+    """Данные автосервиса в памяти с индексами по первичному ключу.
+
+    Записи хранятся как объекты Record со слотами (см. autoservice_records):
+    загруженные и добавляемые словари заменяются ими.
+
+    Все добавления, изменения и удаления записей проходят через методы
+    хранилища, которые поддерживают индексы и копят список изменений
+    для сохранения в журнал.
+
+    Кроме индексов по id поддерживаются обратные индексы внешних ключей:
+    автомобили клиента, заказы автомобиля и число строк заказов с каждой
+    запчастью. Записи меняются на месте, поэтому для каждой записи
+    запоминаются ключи, под которыми она проиндексирована.
+    """
+
+    def __init__(self, data, storage=None, archive=None):
+        super().__init__()
+        self.data = data
+        self.storage = storage
+        self.archive = archive
+        self.changes = []
+        if getattr(storage, 'data_lock', None) is not None:
+            self.lock = storage.data_lock
+        self.reindex()
+
+    def reindex(self):
+        """Построение индексов по текущим данным"""
+        for entity in ENTITY_TYPES:
+            make_records(entity, self.data[entity])
+        self.by_id = {
+            entity: {r['id']: r for r in self.data[entity]}
+            for entity in ENTITY_TYPES
+        }
+        for entity in self.unique_indexes:
+            for record in self.data[entity]:
+                self.index_unique(entity, record)
+        self.cars_by_client = defaultdict(set)
+        self.orders_by_car = defaultdict(set)
+        self.part_usage = Counter()
+        self.links = {'cars': {}, 'orders': {}}
+        for entity in self.links:
+            for record in self.data[entity]:
+                self.link(entity, record)
+
+    def link(self, entity, record):
+        """Добавление записи в обратные индексы"""
+        if entity == 'cars':
+            keys = record['client_id']
+            self.cars_by_client[keys].add(record['id'])
+        elif entity == 'orders':
+            keys = (record.get('car_id'), [p['part_id'] for p in record.get('parts', [])])
+            self.orders_by_car[keys[0]].add(record['id'])
+            self.part_usage.update(keys[1])
+        else:
+            return
+        self.links[entity][record['id']] = keys
+
+    def unlink(self, entity, record_id):
+        """Удаление записи из обратных индексов"""
+        if entity not in self.links or record_id not in self.links[entity]:
+            return
+        keys = self.links[entity].pop(record_id)
+        if entity == 'cars':
+            self.cars_by_client[keys].discard(record_id)
+        else:
+            self.orders_by_car[keys[0]].discard(record_id)
+            self.part_usage.subtract(keys[1])
+
+    def cars_of_client(self, client_id):
+        """Автомобили клиента"""
+        return [self.by_id['cars'][i] for i in sorted(self.cars_by_client.get(client_id, ()))]
+
+    def count_cars(self, client_id):
+        """Количество автомобилей клиента"""
+        return len(self.cars_by_client.get(client_id, ()))
+
+    def count_orders(self, car_id):
+        """Количество заказов автомобиля (с архивными)"""
+        count = len(self.orders_by_car.get(car_id, ()))
+        if self.archive is not None:
+            count += self.archive.count_orders(car_id)
+        return count
+
+    def count_part_usage(self, part_id):
+        """Количество строк заказов с запчастью (с архивными)"""
+        count = self.part_usage[part_id]
+        if self.archive is not None:
+            count += self.archive.count_part_usage(part_id)
+        return count
+
+    def get(self, entity, record_id, default=None):
+        """Получение записи по id"""
+        return self.by_id[entity].get(record_id, default)
+
+    def all(self, entity):
+        """Все записи сущности"""
+        return self.data[entity]
+
+    def count(self, entity):
+        """Количество записей сущности"""
+        return len(self.data[entity])
+
+    def slice(self, entity, start, stop):
+        """Записи сущности с позиции start до stop"""
+        return self.data[entity][start:stop]
+
+    def next_id(self, entity_type):
+        """Получение следующего ID"""
+        next_id = self.data['next_ids'][entity_type]
+        self.data['next_ids'][entity_type] += 1
+        return next_id
+
+    def allocate_ids(self, entity_type, count):
+        """Выделение count идущих подряд ID"""
+        start = self.data['next_ids'][entity_type]
+        self.data['next_ids'][entity_type] += count
+        return range(start, start + count)
+
+    @locked
+    def insert(self, entity, record):
+        """Добавление записи (словарь заменяется записью Record)"""
+        self.check_unique(entity, record)
+        record = make_record(entity, record)
+        self.data[entity].append(record)
+        self.by_id[entity][record['id']] = record
+        self.index_unique(entity, record)
+        self.link(entity, record)
+        self.changes.append({'op': 'put', 'entity': entity, 'record': record})
+        self.notify(entity, record['id'], record)
+        return record
+
+    @locked
+    def extend(self, entity, records):
+        """Добавление загруженных записей (без записи в журнал)"""
+        records = make_records(entity, records)
+        self.data[entity].extend(records)
+        index = self.by_id[entity]
+        for record in records:
+            index[record['id']] = record
+            self.index_unique(entity, record)
+            self.link(entity, record)
+
+    @locked
+    def discard_orders(self):
+        """Удаление из памяти частично загруженных заказов (без записи в журнал).
+
+        Вызывается при ошибке фоновой загрузки: заказы остаются
+        незагруженными (orders_loaded ложно), пока загрузка не повторится.
+        """
+        self.pending_orders = None
+        for order in self.data['orders']:
+            del self.by_id['orders'][order['id']]
+            self.unlink('orders', order['id'])
+        self.data['orders'] = []
+
+    @locked
+    def reload_orders(self):
+        """Повторная загрузка заказов: в pending_orders - новый генератор порций"""
+        self.discard_orders()
+        data, self.pending_orders = self.storage.load_partial()
+
+    @locked
+    def update(self, entity, record):
+        """Регистрация изменения записи (запись меняется на месте)"""
+        self.check_unique(entity, record, record['id'])
+        self.unindex_unique(entity, record['id'])
+        self.index_unique(entity, record)
+        self.unlink(entity, record['id'])
+        self.link(entity, record)
+        self.changes.append({'op': 'put', 'entity': entity, 'record': record})
+        self.notify(entity, record['id'], record)
+        return record
+
+    @locked
+    def delete(self, entity, record_id):
+        """Удаление записи по id"""
+        record = self.by_id[entity].pop(record_id, None)
+        if record is None:
+            return None
+        self.unindex_unique(entity, record_id)
+        self.unlink(entity, record_id)
+        self.data[entity] = [r for r in self.data[entity] if r['id'] != record_id]
+        self.changes.append({'op': 'delete', 'entity': entity, 'id': record_id})
+        self.notify(entity, record_id, None)
+        return record
+
+    @locked
+    def archive_orders(self, statuses, before):
+        """Перенос закрытых заказов в архив.
+
+        Заказы сначала записываются в архив, затем удаляются из рабочего
+        набора одним проходом по списку. Пока заказы загружаются, перенос
+        не выполняется.
+        """
+        if self.archive is None or not self.orders_loaded:
+            return 0
+        moved = [
+            order for order in self.data['orders']
+            if order.get('status') in statuses and str(order.get('date', '')) <= before
+        ]
+        if not moved:
+            return 0
+        self.archive.add(moved)
+        moved_ids = {order['id'] for order in moved}
+        self.data['orders'] = [order for order in self.data['orders'] if order['id'] not in moved_ids]
+        for order_id in moved_ids:
+            del self.by_id['orders'][order_id]
+            self.unlink('orders', order_id)
+            self.changes.append({'op': 'delete', 'entity': 'orders', 'id': order_id})
+            self.notify('orders', order_id, None)
+        return len(moved)
+
+    def take_changes(self):
+        """Получение и сброс накопленных изменений"""
+        changes, self.changes = self.changes, []
+        return changes
+
+    def save(self):
+        """Сохранение накопленных изменений"""
+        if self.storage is not None:
+            self.storage.save(self.data, self.take_changes())
+
+    def close(self):
+        """Завершение работы с хранилищем"""
+        if self.storage is not None:
+            self.storage.close()
+
+
+def create_store(mode=None, lazy_orders=False):
+    """Создание хранилища данных для выбранного режима.
+
+    lazy_orders - загружать сразу все, кроме заказов, а заказы отдать
+    генератором pending_orders. Поддерживается только режимом журнала:
+    он не перезаписывает снимок из памяти, пока заказы не загружены.
+    """
+    mode = mode or STORAGE_MODE
+    if mode == 'sqlite':
+        from autoservice_sqlite import SqliteStore
+        return SqliteStore()
+    storage = create_storage(mode)
+    archive = OrderArchive()
+    if lazy_orders and mode == 'journal':
+        data, orders = storage.load_partial()
+        store = DataStore(data, storage, archive)
+        store.pending_orders = orders
+        store.orders_loaded = False
+        return store
+    return DataStore(storage.load(), storage, archive)
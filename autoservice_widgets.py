@@ -0,0 +1,389 @@
+import tkinter as tk
+from tkinter import ttk
+
+# Высота строки и заголовка таблицы, если стиль их не задает
+DEFAULT_ROW_HEIGHT = 20
+HEADER_HEIGHT = 25
+
+# Если у представления накопилось больше DIRTY_IDS_LIMIT измененных записей
+# одной сущности, оно обновляется целиком, а id не запоминаются
+DIRTY_IDS_LIMIT = 1000
+
+
+class ChangeBus:
+    """Пометка представлений устаревшими по изменениям записей.
+
+    Представление регистрируется под именем вместе с сущностями, от которых
+    зависит, и функцией обновления refresh(changes). on_change - подписчик
+    Repository.subscribe: он ничего не обновляет, а только копит для
+    зависящих от сущности представлений id измененных записей
+    ({сущность: множество id}) и вызывает on_dirty. Представление
+    обновляется методом refresh, когда его показывают, одним вызовом на
+    любое число изменений; changes=None - обновить целиком (так помечены
+    новые представления и представления, помеченные методом mark).
+    """
+
+    def __init__(self, on_dirty=None):
+        self.views = {}
+        self.dirty = {}
+        self.on_dirty = on_dirty
+
+    def register(self, name, entities, refresh):
+        """Регистрация представления (до первого показа оно устаревшее)"""
+        self.views[name] = (frozenset(entities), refresh)
+        self.dirty[name] = None
+
+    def mark(self, *names):
+        """Пометка представлений для обновления целиком (без имен - всех)"""
+        for name in names or self.views:
+            self.dirty[name] = None
+        if self.on_dirty is not None:
+            self.on_dirty()
+
+    def on_change(self, entity, record_id, record):
+        """Подписчик хранилища: запоминание измененной записи"""
+        for name, (entities, _) in self.views.items():
+            if entity not in entities:
+                continue
+            changes = self.dirty.setdefault(name, {})
+            if changes is None:
+                continue
+            ids = changes.setdefault(entity, set())
+            ids.add(record_id)
+            if len(ids) > DIRTY_IDS_LIMIT:
+                self.dirty[name] = None
+        if self.on_dirty is not None:
+            self.on_dirty()
+
+    def is_dirty(self, name):
+        """Устарело ли представление"""
+        return name in self.dirty
+
+    def refresh(self, name):
+        """Обновление представления, если оно устарело"""
+        if name not in self.dirty:
+            return False
+        changes = self.dirty.pop(name)
+        self.views[name][1](changes)
+        return True
+
+
+class VirtualTable:
+    """Таблица с виртуальной прокруткой.
+
+    В Treeview создаются только строки видимого окна плюс запас (всего не
+    больше page_size строк). Строки запрашиваются функцией
+    rows(start, stop) -> [(id записи, значения)], общее количество - функцией
+    count(). Полоса прокрутки управляется вручную по смещению окна.
+    """
+
+    def __init__(self, parent, columns, count, rows, page_size=100):
+        self.count = count
+        self.rows = rows
+        self.page_size = page_size
+        self.offset = 0
+        self.total = 0
+        self.shown = {}
+        self.shown_ids = []
+
+        self.tree = ttk.Treeview(parent, columns=columns, show="headings")
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.yview)
+
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Up>", lambda e: self.move_focus(-1))
+        self.tree.bind("<Down>", lambda e: self.move_focus(1))
+        self.tree.bind("<Prior>", lambda e: self.move_focus(-self.visible_rows()))
+        self.tree.bind("<Next>", lambda e: self.move_focus(self.visible_rows()))
+        self.tree.bind("<Home>", lambda e: self.move_focus(-self.total))
+        self.tree.bind("<End>", lambda e: self.move_focus(self.total))
+        self.tree.bind("<Configure>", lambda e: self.refresh())
+
+    def visible_rows(self):
+        """Количество строк, помещающихся в видимой области"""
+        row_height = ttk.Style().lookup("Treeview", "rowheight")
+        try:
+            row_height = int(row_height) or DEFAULT_ROW_HEIGHT
+        except (TypeError, ValueError, tk.TclError):
+            row_height = DEFAULT_ROW_HEIGHT
+        height = self.tree.winfo_height() - HEADER_HEIGHT
+        return max(1, height // row_height)
+
+    def window_size(self):
+        """Количество создаваемых строк: видимое окно плюс запас"""
+        return max(self.page_size, self.visible_rows() + 1)
+
+    def refresh(self):
+        """Перезаполнение окна таблицы по текущему смещению"""
+        self.total = self.count()
+        self.offset = max(0, min(self.offset, self.total - self.visible_rows()))
+        rows = self.rows(self.offset, self.offset + self.window_size())
+        ids = [row_id for row_id, values in rows]
+
+        if ids != self.shown_ids:
+            self.shift_window(ids, rows)
+        for row_id, values in rows:
+            if self.shown.get(row_id) != values:
+                self.tree.item(row_id, values=values)
+
+        self.shown = dict(rows)
+        self.shown_ids = ids
+        self.tree.yview_moveto(0)
+        self.update_scrollbar()
+
+    def shift_window(self, ids, rows):
+        """Замена строк окна с сохранением уже созданных строк при сдвиге"""
+        old_ids = self.shown_ids
+        new_values = dict(rows)
+        if ids and old_ids and ids[0] in self.shown:
+            # Прокрутка вниз: удаляем строки сверху, добавляем снизу
+            start = old_ids.index(ids[0])
+            kept = old_ids[start:start + len(ids)]
+            if kept == ids[:len(kept)]:
+                self.delete_rows(old_ids[:start] + old_ids[start + len(kept):])
+                for row_id in ids[len(kept):]:
+                    self.tree.insert("", "end", iid=row_id, values=new_values[row_id])
+                    self.shown[row_id] = new_values[row_id]
+                return
+        if ids and old_ids and old_ids[0] in new_values:
+            # Прокрутка вверх: добавляем строки сверху, удаляем снизу
+            start = ids.index(old_ids[0])
+            kept = ids[start:start + len(old_ids)]
+            if kept == old_ids[:len(kept)]:
+                self.delete_rows(old_ids[len(kept):])
+                for index, row_id in enumerate(ids[:start]):
+                    self.tree.insert("", index, iid=row_id, values=new_values[row_id])
+                    self.shown[row_id] = new_values[row_id]
+                return
+
+        focus = self.tree.focus()
+        selection = self.tree.selection()
+        self.delete_rows(old_ids)
+        for row_id in ids:
+            self.tree.insert("", "end", iid=row_id, values=new_values[row_id])
+            self.shown[row_id] = new_values[row_id]
+        if focus and self.tree.exists(focus):
+            self.tree.focus(focus)
+        kept_selection = [iid for iid in selection if self.tree.exists(iid)]
+        if kept_selection:
+            self.tree.selection_set(kept_selection)
+
+    def delete_rows(self, ids):
+        """Удаление строк из окна"""
+        if ids:
+            self.tree.delete(*ids)
+        for row_id in ids:
+            self.shown.pop(row_id, None)
+
+    def update_scrollbar(self):
+        """Установка ползунка по смещению окна"""
+        if not self.total:
+            self.scrollbar.set(0, 1)
+            return
+        first = self.offset / self.total
+        last = min(1, (self.offset + self.visible_rows()) / self.total)
+        self.scrollbar.set(first, last)
+
+    def yview(self, *args):
+        """Обработка команд полосы прокрутки"""
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * self.total)
+            self.refresh()
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.visible_rows()
+            self.scroll(step)
+
+    def scroll(self, step):
+        """Сдвиг окна на step строк"""
+        self.offset += step
+        self.refresh()
+        return "break"
+
+    def on_mousewheel(self, event):
+        """Прокрутка колесом мыши"""
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def move_focus(self, step):
+        """Перемещение выделенной строки с прокруткой окна"""
+        if not self.total:
+            return "break"
+        children = [str(iid) for iid in self.tree.get_children()]
+        focus = self.tree.focus()
+        index = children.index(focus) if focus in children else 0
+        position = max(0, min(self.total - 1, self.offset + index + step))
+
+        visible = self.visible_rows()
+        if position < self.offset:
+            self.offset = position
+        elif position >= self.offset + visible:
+            self.offset = position - visible + 1
+        self.refresh()
+
+        children = self.tree.get_children()
+        iid = children[position - self.offset]
+        self.tree.focus(iid)
+        self.tree.selection_set(iid)
+        return "break"
+
+
+class TableSync:
+    """Применение строк к Treeview порциями через after.
+
+    records - записи таблицы по порядку, row(запись) - значения строки;
+    id записи служит iid строки. Список записей копируется при создании:
+    записи могут добавляться и удаляться, пока строки применяются.
+    shown - словарь показанных строк таблицы {id: значения}: строки, которых
+    нет в records, удаляются сразу, меняются только измененные строки, а
+    новые вставляются на свое место по порядку records (после поиска
+    таблица снова идет в порядке записей). Первые first_rows строк (экран)
+    применяются сразу в start, остальные - по chunk_size строк за вызов
+    из цикла событий Tk, так что окно не перестает отвечать. Пока строки
+    применяются, под таблицей виден индикатор.
+    """
+
+    def __init__(self, table, shown, records, row, chunk_size=500, first_rows=100, on_done=None):
+        self.table = table
+        self.shown = shown
+        self.records = list(records)
+        self.row = row
+        self.chunk_size = chunk_size
+        self.first_rows = first_rows
+        self.on_done = on_done
+        self.applied = 0
+        self.after_id = None
+        self.progress = None
+
+    def start(self):
+        """Применение первого экрана строк; True - строки кончились, остальное не нужно"""
+        removed = self.shown.keys() - {record['id'] for record in self.records}
+        if removed:
+            self.table.delete(*removed)
+            for row_id in removed:
+                del self.shown[row_id]
+        if self.step(self.first_rows):
+            self.finish()
+            return True
+        if self.records:
+            self.progress = ttk.Progressbar(self.table.master, maximum=len(self.records))
+            self.progress.pack(side='bottom', fill='x', padx=5, before=self.table)
+            self.progress['value'] = self.applied
+        self.after_id = self.table.after_idle(self.run)
+        return False
+
+    def run(self):
+        """Применение очередной порции строк из цикла событий"""
+        self.after_id = None
+        if self.step(self.chunk_size):
+            self.finish()
+            return
+        if self.progress is not None:
+            self.progress['value'] = self.applied
+        # after(1) вместо after_idle: между порциями обрабатываются события
+        self.after_id = self.table.after(1, self.run)
+
+    def step(self, limit):
+        """Применение следующих limit строк; True - строки кончились"""
+        stop = min(self.applied + limit, len(self.records))
+        for index in range(self.applied, stop):
+            record = self.records[index]
+            row_id = record['id']
+            values = self.row(record)
+            old_values = self.shown.get(row_id)
+            if old_values is None:
+                # Строки таблицы - подмножество records в том же порядке,
+                # поэтому место новой строки - ее номер в records. "end"
+                # дешевле числовой позиции, для которой Tk обходит строки
+                position = "end" if index >= len(self.shown) else index
+                self.table.insert("", position, iid=row_id, values=values)
+            elif old_values != values:
+                self.table.item(row_id, values=values)
+            self.shown[row_id] = values
+        self.applied = stop
+        return stop == len(self.records)
+
+    def finish(self):
+        """Завершение: удаление индикатора"""
+        self.remove_progress()
+        if self.on_done is not None:
+            self.on_done()
+
+    def complete(self):
+        """Применение всех оставшихся строк сразу"""
+        if self.after_id is not None:
+            self.table.after_cancel(self.after_id)
+            self.after_id = None
+        self.step(float('inf'))
+        self.finish()
+
+    def cancel(self):
+        """Отмена незаконченного применения (таблица обновляется заново)"""
+        if self.after_id is not None:
+            self.table.after_cancel(self.after_id)
+            self.after_id = None
+        self.remove_progress()
+
+    def remove_progress(self):
+        """Удаление индикатора"""
+        if self.progress is not None:
+            self.progress.destroy()
+            self.progress = None
+
+
+class AutocompleteCombobox(ttk.Combobox):
+    """Поле выбора записи с подсказками по мере ввода.
+
+    Список не заполняется всеми записями: функция lookup(text, limit) ->
+    [(id записи, подпись)] возвращает не больше limit записей, подходящих
+    под введенный текст, и только они попадают в выпадающий список.
+    Список обновляется при вводе и при открытии.
+    """
+
+    # Клавиши, которые не меняют текст поля
+    NAVIGATION_KEYS = {'Up', 'Down', 'Left', 'Right', 'Return', 'Escape', 'Tab', 'Home', 'End'}
+
+    def __init__(self, parent, lookup, limit=50, **kwargs):
+        super().__init__(parent, postcommand=self.refresh, **kwargs)
+        self.lookup = lookup
+        self.limit = limit
+        self.ids = {}
+        self.text = None
+        self.bind("<KeyRelease>", self.on_key)
+
+    def on_key(self, event):
+        """Обновление подсказок после изменения текста"""
+        if event.keysym not in self.NAVIGATION_KEYS and self.get() != self.text:
+            self.refresh()
+
+    def refresh(self):
+        """Заполнение списка записями, подходящими под текст поля"""
+        text = self.get()
+        selected = self.ids.get(text)
+        # Если выбрана запись из списка, показываем первые записи
+        matches = self.lookup('' if selected is not None else text, self.limit)
+        self.ids = {label: record_id for record_id, label in matches}
+        if selected is not None:
+            self.ids.setdefault(text, selected)
+        self['values'] = [label for record_id, label in matches]
+        self.text = text
+
+    def selected_id(self):
+        """id выбранной записи (None - запись не выбрана из списка)"""
+        return self.ids.get(self.get())
+
+    def select(self, record_id, label):
+        """Выбор записи с подписью label (например, после ее изменения)"""
+        self.set(label)
+        self.ids[label] = record_id
+        self.text = label
+
+    def reset(self):
+        """Сброс текста и выбор первой записи списка"""
+        self.set('')
+        self.ids = {}
+        self.refresh()
+        if self['values']:
+            self.current(0)
+        self.text = self.get()
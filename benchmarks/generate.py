@@ -0,0 +1,115 @@
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from autoservice_core import ORDER_STATUSES, WORK_PRICE
+from autoservice_storage import empty_data, write_snapshot
+
+LAST_NAMES = ['Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев',
+              'Соколов', 'Михайлов', 'Новиков', 'Федоров', 'Морозов', 'Волков', 'Алексеев',
+              'Лебедев', 'Семенов', 'Егоров', 'Павлов', 'Козлов', 'Степанов']
+FIRST_NAMES = ['Александр', 'Сергей', 'Дмитрий', 'Андрей', 'Алексей', 'Максим', 'Иван',
+               'Михаил', 'Николай', 'Павел', 'Артем', 'Владимир', 'Евгений', 'Олег']
+MIDDLE_NAMES = ['Александрович', 'Сергеевич', 'Дмитриевич', 'Андреевич', 'Иванович',
+                'Петрович', 'Михайлович', 'Николаевич', 'Владимирович', 'Олегович']
+MODELS = {
+    'Lada': ['Granta', 'Vesta', 'Niva', 'Largus', 'XRAY'],
+    'Kia': ['Rio', 'Ceed', 'Sportage', 'Sorento'],
+    'Hyundai': ['Solaris', 'Creta', 'Tucson', 'Elantra'],
+    'Toyota': ['Camry', 'Corolla', 'RAV4', 'Land Cruiser'],
+    'Volkswagen': ['Polo', 'Tiguan', 'Passat', 'Golf'],
+    'Renault': ['Logan', 'Duster', 'Sandero', 'Kaptur'],
+    'Skoda': ['Octavia', 'Rapid', 'Kodiaq'],
+    'BMW': ['X5', '3 Series', '5 Series']
+}
+PART_KINDS = [('Масляный фильтр', 600), ('Воздушный фильтр', 700), ('Салонный фильтр', 500),
+              ('Топливный фильтр', 900), ('Свеча зажигания', 450), ('Тормозные колодки', 2500),
+              ('Тормозной диск', 4000), ('Ремень ГРМ', 3500), ('Помпа', 4500), ('Аккумулятор', 8000),
+              ('Амортизатор', 5000), ('Шаровая опора', 1800), ('Масло моторное 4л', 3200),
+              ('Антифриз 5л', 1500), ('Щетки стеклоочистителя', 900), ('Лампа фары', 350)]
+WORKS = ['Замена масла', 'Замена фильтров', 'Диагностика', 'Замена колодок', 'Замена ГРМ',
+         'Развал-схождение', 'Шиномонтаж', 'Замена свечей', 'Замена амортизаторов',
+         'Замена антифриза', 'Ремонт подвески', 'Компьютерная диагностика']
+VIN_CHARS = 'ABCDEFGHJKLMNPRSTUVWXYZ0123456789'
+
+
+def generate(orders_count, seed=0):
+    """Синтетические данные автосервиса с orders_count заказами.
+
+    Клиентов в 4 раза меньше заказов, автомобилей на 20% больше клиентов,
+    запчастей - по одной на 50 заказов (от 50 до 2000).
+    """
+    rng = random.Random(seed)
+    data = empty_data()
+    clients_count = max(10, orders_count // 4)
+    cars_count = clients_count * 6 // 5
+    parts_count = min(2000, max(50, orders_count // 50))
+
+    for client_id in range(1, clients_count + 1):
+        data['clients'].append({
+            'id': client_id,
+            'fio': f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(MIDDLE_NAMES)}",
+            'phone': f"+7 9{client_id // 10000000 % 100:02d} {client_id // 10000 % 1000:03d}-{client_id % 10000:04d}",
+            'email': f"client{client_id}@example.ru" if rng.random() < 0.6 else ''
+        })
+
+    for car_id in range(1, cars_count + 1):
+        brand = rng.choice(list(MODELS))
+        data['cars'].append({
+            'id': car_id,
+            'vin': ''.join(rng.choice(VIN_CHARS) for _ in range(11)) + f"{car_id:06d}",
+            'brand': brand,
+            'model': rng.choice(MODELS[brand]),
+            'client_id': car_id if car_id <= clients_count else rng.randint(1, clients_count)
+        })
+
+    for part_id in range(1, parts_count + 1):
+        name, price = PART_KINDS[(part_id - 1) % len(PART_KINDS)]
+        data['parts'].append({
+            'id': part_id,
+            'name': f"{name} #{part_id}",
+            'price': float(round(price * rng.uniform(0.7, 1.5))),
+            'quantity': rng.randint(0, 200)
+        })
+
+    start = datetime(2022, 1, 1)
+    step = timedelta(days=3 * 365) / max(1, orders_count)
+    for order_id in range(1, orders_count + 1):
+        car = data['cars'][rng.randrange(cars_count)]
+        works = rng.sample(WORKS, rng.randint(0, 3))
+        lines = []
+        for part_id in rng.sample(range(1, parts_count + 1), rng.randint(0 if works else 1, 4)):
+            part = data['parts'][part_id - 1]
+            lines.append({
+                'part_id': part_id,
+                'name': part['name'],
+                'price': part['price'],
+                'quantity': rng.randint(1, 4)
+            })
+        data['orders'].append({
+            'id': order_id,
+            'date': (start + step * order_id).strftime("%Y-%m-%d %H:%M:%S"),
+            'client_id': car['client_id'],
+            'car_id': car['id'],
+            'works': works,
+            'parts': lines,
+            'status': rng.choices(ORDER_STATUSES, weights=(2, 7, 1))[0],
+            'total': sum(line['price'] * line['quantity'] for line in lines) + len(works) * WORK_PRICE
+        })
+
+    data['next_ids'] = {
+        'client': clients_count + 1,
+        'car': cars_count + 1,
+        'order': orders_count + 1,
+        'part': parts_count + 1
+    }
+    return data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Генерация файла данных автосервиса для бенчмарков")
+    parser.add_argument('orders', type=int, help="количество заказов")
+    parser.add_argument('path', nargs='?', default='autoservice_data.json')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_snapshot(args.path, generate(args.orders, args.seed))
@@ -0,0 +1,74 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Модули приложения лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoservice_records import make_records
+from benchmarks.generate import generate
+
+
+def traced(func):
+    """Результат func и прирост занятой памяти после его выполнения, байт"""
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    gc.collect()
+    return result, tracemalloc.get_traced_memory()[0] - before
+
+
+def compare(orders_count, seed=0):
+    """Память записей-словарей и записей со слотами для каждой сущности.
+
+    Записи разбираются из JSON, как при загрузке файла данных, поэтому
+    одинаковые строки в словарях - разные объекты.
+    """
+    data = generate(orders_count, seed)
+    results = []
+    tracemalloc.start()
+    try:
+        for entity in ('clients', 'cars', 'parts', 'orders'):
+            text = json.dumps(data[entity], ensure_ascii=False)
+            parsed, dicts_size = traced(lambda: json.loads(text))
+            start = time.perf_counter()
+            records, delta = traced(lambda: make_records(entity, parsed))
+            elapsed = time.perf_counter() - start
+            results.append({
+                'entity': entity,
+                'records': len(records),
+                'dicts_bytes': dicts_size,
+                'records_bytes': dicts_size + delta,
+                'convert_ms': round(elapsed * 1000, 1)
+            })
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение памяти записей-словарей и записей со слотами")
+    parser.add_argument('--orders', type=int, default=100000, help="количество заказов")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    results = compare(args.orders, args.seed)
+    print(f"{'Сущность':<10} {'Записей':>9} {'Словари, МБ':>12} {'Слоты, МБ':>10} {'Экономия':>9} {'Перевод, мс':>12}")
+    total_dicts = total_records = 0
+    for r in results:
+        total_dicts += r['dicts_bytes']
+        total_records += r['records_bytes']
+        print(f"{r['entity']:<10} {r['records']:>9} {r['dicts_bytes'] / 2**20:>12.1f} "
+              f"{r['records_bytes'] / 2**20:>10.1f} {1 - r['records_bytes'] / r['dicts_bytes']:>9.0%} "
+              f"{r['convert_ms']:>12}")
+    print(f"{'всего':<10} {'':>9} {total_dicts / 2**20:>12.1f} {total_records / 2**20:>10.1f} "
+          f"{1 - total_records / total_dicts:>9.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
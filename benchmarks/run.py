@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Модули приложения лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import tk_stubs
+from benchmarks.generate import generate
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+class Timer:
+    """Замеры операций для отчета"""
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def measure(self, size, operation, func, repeat=None):
+        """Замер func (repeat раз) с записью медианы и минимума"""
+        times = []
+        for _ in range(repeat or self.repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        self.results.append({
+            'orders': size,
+            'operation': operation,
+            'median': statistics.median(times),
+            'min': min(times),
+            'runs': len(times)
+        })
+        print(f"{size:>9} {operation:<28} {statistics.median(times) * 1000:10.2f} ms", file=sys.stderr)
+
+
+def archive_data(path):
+    """Перенос закрытых заказов сгенерированных данных в архив каталога path"""
+    from autoservice_archive import ARCHIVE_DIR, OrderArchive
+    from autoservice_core import AutoserviceService
+    from autoservice_storage import DATA_FILE, JsonStorage
+    from autoservice_store import DataStore
+
+    storage = JsonStorage(os.path.join(path, DATA_FILE))
+    store = DataStore(storage.load(), storage, OrderArchive(os.path.join(path, ARCHIVE_DIR)))
+    AutoserviceService(store).archive_closed_orders()
+    store.save()
+
+
+def prepare_data(workdir, size, storage, archive=False):
+    """Файл данных (и база SQLite) с size заказами в отдельном каталоге.
+
+    archive - закрытые заказы перенесены в архив (отдельный каталог данных).
+    """
+    from autoservice_sqlite import SQLITE_FILE, import_json
+    from autoservice_storage import DATA_FILE, write_snapshot
+
+    path = os.path.join(workdir, f"{size}-archive" if archive else str(size))
+    os.makedirs(path, exist_ok=True)
+    data_file = os.path.join(path, DATA_FILE)
+    if not os.path.exists(data_file):
+        write_snapshot(data_file, generate(size))
+        if archive:
+            archive_data(path)
+    if storage == 'sqlite' and not os.path.exists(os.path.join(path, SQLITE_FILE)):
+        import_json(data_file, os.path.join(path, SQLITE_FILE))
+    return path
+
+
+def flush(store):
+    """Ожидание фоновой записи изменений"""
+    storage = getattr(store, 'storage', None)
+    if hasattr(storage, 'flush'):
+        storage.flush()
+
+
+def focus_row(table, record_id):
+    """Выделение строки таблицы-заглушки с записью record_id"""
+    if not table.exists(record_id):
+        table.insert("", "end", iid=record_id, values=(record_id,))
+    table.focus(record_id)
+
+
+def bench_size(timer, size, app_module):
+    """Замеры операций приложения на данных из текущего каталога"""
+    app = app_module.AutoserviceApp.__new__(app_module.AutoserviceApp)
+    timer.measure(size, 'init_data', lambda: app.init_data().close(), repeat=1)
+
+    root = tk_stubs.Tk()
+    holder = {}
+    timer.measure(size, 'startup', lambda: holder.update(app=app_module.AutoserviceApp(root)), repeat=1)
+    app = holder['app']
+    store = app.store
+    timer.measure(size, 'build_tabs', app.build_tabs, repeat=1)
+
+    # Таблицы заполняются порциями из цикла событий - в замере до конца сразу
+    for table in ('clients', 'cars', 'orders', 'parts'):
+        update_table = getattr(app, f'update_{table}_table')
+        timer.measure(size, f'update_{table}_table', lambda: (update_table(), app.flush_tables()))
+    timer.measure(size, 'update_parts_combobox', app.update_parts_combobox)
+    # Подсказки по префиксу телефона (индекс строится в фоне при запуске)
+    timer.measure(size, 'lookup_clients_phone', lambda: app.lookup_clients('+7 900', app_module.AUTOCOMPLETE_LIMIT))
+    timer.measure(size, 'order_history', lambda: sum(1 for _ in store.iter_order_history()))
+
+    # Сохранение одного изменения (с ожиданием фоновой записи)
+    part = store.get('parts', 1)
+
+    def save_change():
+        store.update('parts', part)
+        app.save_data()
+        flush(store)
+    timer.measure(size, 'save_data', save_change)
+
+    # Создание заказа через форму: клиент, автомобиль, работа и запчасть.
+    # Форма открыта, поэтому после сохранения обновляется ее вкладка
+    # (в приложении - через after_idle, см. refresh_current_tab)
+    order = store.slice('orders', 0, 1)[0]
+    app.notebook.select(app.new_order_tab)
+
+    def new_order():
+        app.client_combobox.set(app.client_label(store.get('clients', order['client_id'])))
+        app.client_combobox.ids = {app.client_combobox.get(): order['client_id']}
+        app.update_cars_combobox()
+        app.works_text.insert("1.0", "Диагностика")
+        stocked = next(p for p in store.iter_records('parts') if app.reservation.available(p) > 0)
+        app.reservation.reserve(stocked, 1)
+        app.save_new_order()
+        app.refresh_current_tab()
+        flush(store)
+    timer.measure(size, 'save_new_order', new_order)
+
+    # Проверки целостности при удалении (удаление не подтверждается)
+    car = store.get('cars', order['car_id'])
+    focus_row(app.clients_table, car['client_id'])
+    timer.measure(size, 'delete_client_check', app.delete_client)
+    focus_row(app.cars_table, car['id'])
+    timer.measure(size, 'delete_car_check', app.delete_car)
+    focus_row(app.parts_table, order['parts'][0]['part_id'] if order['parts'] else 1)
+    timer.measure(size, 'delete_part_check', app.delete_part)
+
+    store.close()
+
+
+def compare(results, baseline_path, threshold):
+    """Сравнение с предыдущим отчетом: операции, замедлившиеся больше threshold раз"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['orders'], r['operation']): r['median'] for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        old = baseline.get((result['orders'], result['operation']))
+        if old and result['median'] > old * threshold:
+            regressions.append((result['orders'], result['operation'], old, result['median']))
+            print(f"Замедление: {result['operation']} ({result['orders']} заказов) "
+                  f"{old * 1000:.2f} -> {result['median'] * 1000:.2f} ms", file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности автосервиса на синтетических данных")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="количества заказов")
+    parser.add_argument('--storage', choices=('json', 'journal', 'sqlite'), default='journal')
+    parser.add_argument('--repeat', type=int, default=3, help="повторов каждой операции")
+    parser.add_argument('--archive', action='store_true',
+                        help="замеры на данных с закрытыми заказами в архиве")
+    parser.add_argument('--workdir', help="каталог для сгенерированных данных (по умолчанию временный)")
+    parser.add_argument('--output', help="файл JSON-отчета (по умолчанию стандартный вывод)")
+    parser.add_argument('--baseline', help="JSON-отчет для сравнения")
+    parser.add_argument('--threshold', type=float, default=1.2, help="допустимое замедление относительно baseline")
+    args = parser.parse_args(argv)
+    if args.archive and args.storage == 'sqlite':
+        parser.error("архив заказов не используется в режиме sqlite")
+
+    tk_stubs.install()
+    import autoservice_app
+    import autoservice_store
+    autoservice_store.STORAGE_MODE = args.storage
+    autoservice_app.LAZY_ORDERS = False
+    autoservice_app.ARCHIVE_ON_START = False
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='autoservice-bench-')
+    timer = Timer(args.repeat)
+    cwd = os.getcwd()
+    try:
+        for size in args.sizes:
+            os.chdir(prepare_data(workdir, size, args.storage, args.archive))
+            bench_size(timer, size, autoservice_app)
+    finally:
+        os.chdir(cwd)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'storage': args.storage,
+        'archive': args.archive,
+        'results': timer.results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+    if args.baseline and compare(timer.results, args.baseline, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
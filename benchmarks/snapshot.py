@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Модули приложения лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoservice_records import make_records
+from autoservice_storage import ENTITY_TYPES, read_snapshot, write_snapshot
+from benchmarks.generate import generate
+
+# Сравниваемые варианты: (название, формат, сжатие)
+VARIANTS = (
+    ('json', 'json', None),
+    ('binary', 'binary', 'none'),
+    ('binary+zlib', 'binary', 'zlib'),
+    ('binary+lzma', 'binary', 'lzma')
+)
+
+
+def median_time(func, repeat):
+    """Медиана времени выполнения func, секунд"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def load_records(path):
+    """Загрузка снимка до записей Record, как при запуске приложения"""
+    data = read_snapshot(path)
+    for entity in ENTITY_TYPES:
+        make_records(entity, data[entity])
+    return data
+
+
+def compare(orders_count, workdir, repeat=3, seed=0):
+    """Время записи и загрузки снимка и размер файла для каждого варианта.
+
+    Данные пишутся из записей Record, как их сохраняет приложение;
+    загрузка включает преобразование в записи.
+    """
+    data = generate(orders_count, seed)
+    for entity in ENTITY_TYPES:
+        make_records(entity, data[entity])
+    results = []
+    for name, snapshot_format, compression in VARIANTS:
+        path = os.path.join(workdir, f"snapshot-{orders_count}-{name}")
+        save = median_time(lambda: write_snapshot(path, data, snapshot_format, compression), repeat)
+        load = median_time(lambda: load_records(path), repeat)
+        results.append({
+            'orders': orders_count,
+            'variant': name,
+            'save': save,
+            'load': load,
+            'bytes': os.path.getsize(path)
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение JSON и двоичного снимка данных")
+    parser.add_argument('--orders', type=int, nargs='+', default=[100000], help="количества заказов")
+    parser.add_argument('--repeat', type=int, default=3, help="повторов каждой операции")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help="каталог для файлов снимков (по умолчанию временный)")
+    parser.add_argument('--output', help="файл JSON-отчета")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='autoservice-snapshot-')
+    os.makedirs(workdir, exist_ok=True)
+    print(f"{'Заказов':>9} {'Вариант':<12} {'Запись, мс':>11} {'Загрузка, мс':>13} {'Размер, МБ':>11}")
+    results = []
+    for orders_count in args.orders:
+        for r in compare(orders_count, workdir, args.repeat, args.seed):
+            results.append(r)
+            print(f"{r['orders']:>9} {r['variant']:<12} {r['save'] * 1000:>11.1f} "
+                  f"{r['load'] * 1000:>13.1f} {r['bytes'] / 2**20:>11.2f}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': results}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+import sys
+import types
+
+# Размер окна, который "видят" таблицы с виртуальной прокруткой
+WINDOW_HEIGHT = 600
+
+
+class TclError(Exception):
+    pass
+
+
+class Widget:
+    """Виджет-заглушка: принимает любые параметры и не рисует ничего"""
+
+    def __init__(self, master=None, **options):
+        self.master = master
+        self.options = options
+
+    def __getitem__(self, key):
+        return self.options.get(key, '')
+
+    def __setitem__(self, key, value):
+        self.options[key] = value
+
+    def configure(self, **options):
+        self.options.update(options)
+
+    config = configure
+
+    def pack(self, **options):
+        pass
+
+    def grid(self, **options):
+        pass
+
+    def bind(self, sequence=None, func=None, add=None):
+        pass
+
+    def destroy(self):
+        pass
+
+    def winfo_height(self):
+        return WINDOW_HEIGHT
+
+    def after(self, ms, func=None, *args):
+        return 'after#0'
+
+    def after_idle(self, func, *args):
+        return 'after#0'
+
+    def after_cancel(self, after_id):
+        pass
+
+
+class Tk(Widget):
+    def title(self, text=None):
+        pass
+
+    def geometry(self, spec=None):
+        pass
+
+    def protocol(self, name, func=None):
+        pass
+
+    def resizable(self, width=None, height=None):
+        pass
+
+    def withdraw(self):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+    def update(self):
+        pass
+
+    def mainloop(self):
+        pass
+
+
+class Toplevel(Tk):
+    pass
+
+
+class StringVar:
+    def __init__(self, master=None, value=''):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+    def trace_add(self, mode, callback):
+        pass
+
+
+class Entry(Widget):
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.text = ''
+
+    def get(self):
+        return self.text
+
+    def set(self, value):
+        self.text = str(value)
+
+    def insert(self, index, value):
+        self.text = self.text + str(value) if index == 'end' else str(value) + self.text
+
+    def delete(self, first, last=None):
+        self.text = ''
+
+
+class Spinbox(Entry):
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.text = str(options.get('from_', ''))
+
+
+class Combobox(Entry):
+    def __getitem__(self, key):
+        value = self.options.get(key, '')
+        return tuple(value) if key == 'values' and value else value
+
+    def current(self, index=None):
+        values = self['values']
+        if index is None:
+            return values.index(self.text) if self.text in values else -1
+        self.text = values[index]
+
+
+class Text(Widget):
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.text = ''
+
+    def get(self, first, last=None):
+        return self.text
+
+    def insert(self, index, value):
+        self.text += value
+
+    def delete(self, first, last=None):
+        self.text = ''
+
+
+class Notebook(Widget):
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.current = ''
+
+    def add(self, child, **options):
+        if not self.current:
+            self.current = str(child)
+
+    def select(self, tab_id=None):
+        if tab_id is None:
+            return self.current
+        self.current = str(tab_id)
+
+    def tab(self, tab_id, option=None, **options):
+        pass
+
+
+class Scrollbar(Widget):
+    def set(self, first, last):
+        pass
+
+
+class Canvas(Widget):
+    def create_window(self, *args, **options):
+        return 1
+
+    def bbox(self, *args):
+        return (0, 0, 0, 0)
+
+    def yview(self, *args):
+        pass
+
+
+class Style:
+    def lookup(self, style, option):
+        return 20
+
+
+class Treeview(Widget):
+    """Таблица-заглушка: хранит строки, чтобы работали diff и выделение"""
+
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.rows = {}
+        self.order = []
+        self.focused = ''
+        self.selected = ()
+
+    def heading(self, column, **options):
+        pass
+
+    def column(self, column, **options):
+        pass
+
+    def insert(self, parent, index, iid=None, values=()):
+        iid = str(iid if iid is not None else len(self.order) + 1)
+        if index == 'end':
+            self.order.append(iid)
+        else:
+            self.order.insert(index, iid)
+        self.rows[iid] = values
+        return iid
+
+    def item(self, iid, values=None):
+        if values is None:
+            return {'values': list(self.rows[str(iid)])}
+        self.rows[str(iid)] = values
+
+    def delete(self, *items):
+        removed = {str(iid) for iid in items}
+        for iid in removed:
+            del self.rows[iid]
+        self.order = [iid for iid in self.order if iid not in removed]
+
+    def get_children(self, item=None):
+        return tuple(self.order)
+
+    def exists(self, iid):
+        return str(iid) in self.rows
+
+    def focus(self, iid=None):
+        if iid is None:
+            return self.focused
+        self.focused = str(iid)
+
+    def selection(self):
+        return self.selected
+
+    def selection_set(self, items):
+        self.selected = tuple(items) if isinstance(items, (list, tuple)) else (items,)
+
+    def yview(self, *args):
+        pass
+
+    def yview_moveto(self, fraction):
+        pass
+
+
+def ask_no(*args, **options):
+    return False
+
+
+def show(*args, **options):
+    return 'ok'
+
+
+def install():
+    """Подмена модулей tkinter заглушками (до импорта приложения)"""
+    tk = types.ModuleType('tkinter')
+    ttk = types.ModuleType('tkinter.ttk')
+    messagebox = types.ModuleType('tkinter.messagebox')
+    tk.TclError = TclError
+    tk.Tk = Tk
+    tk.Toplevel = Toplevel
+    tk.StringVar = StringVar
+    tk.Label = tk.Frame = Widget
+    tk.Text = Text
+    tk.Canvas = Canvas
+    ttk.Frame = ttk.Label = ttk.LabelFrame = ttk.Button = ttk.Radiobutton = ttk.Progressbar = Widget
+    ttk.Entry = Entry
+    ttk.Spinbox = Spinbox
+    ttk.Combobox = Combobox
+    ttk.Notebook = Notebook
+    ttk.Scrollbar = Scrollbar
+    ttk.Style = Style
+    ttk.Treeview = Treeview
+    messagebox.showinfo = messagebox.showwarning = messagebox.showerror = show
+    messagebox.askyesno = ask_no
+    tk.ttk = ttk
+    tk.messagebox = messagebox
+    sys.modules.update({'tkinter': tk, 'tkinter.ttk': ttk, 'tkinter.messagebox': messagebox})
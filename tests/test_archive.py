@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from autoservice_archive import OrderArchive
+from autoservice_core import AutoserviceService
+from autoservice_store import DataStore
+from autoservice_storage import empty_data
+
+
+def order(order_id, date, status):
+    """Заказ без работ и запчастей"""
+    return {
+        'id': order_id, 'date': date.strftime("%Y-%m-%d %H:%M:%S"), 'client_id': None, 'car_id': None,
+        'works': [], 'parts': [], 'status': status, 'total': 0
+    }
+
+
+class ArchiveClosedOrdersTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        now = datetime.now()
+        data = empty_data()
+        data['orders'] = [
+            order(1, now - timedelta(days=10), 'готово'),
+            order(2, now - timedelta(days=2), 'отменен'),
+            order(3, now - timedelta(minutes=1), 'готово'),
+            order(4, now - timedelta(days=10), 'в работе')
+        ]
+        data['next_ids']['order'] = 5
+        self.archive = OrderArchive(os.path.join(self.workdir.name, 'archive'))
+        self.store = DataStore(data, archive=self.archive)
+        self.service = AutoserviceService(self.store)
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def remaining(self):
+        """id заказов, оставшихся в рабочем наборе"""
+        return [o['id'] for o in self.store.all('orders')]
+
+    def test_days_boundary(self):
+        self.assertEqual(self.service.archive_closed_orders(3), 1)
+        self.assertEqual(self.remaining(), [2, 3, 4])
+
+    def test_zero_days_archives_today(self):
+        self.assertEqual(self.service.archive_closed_orders(0), 3)
+        self.assertEqual(self.remaining(), [4])
+        self.assertEqual(self.archive.count(), 3)
+        self.assertEqual(self.store.get_archived_order(3)['status'], 'готово')
+
+
+if __name__ == '__main__':
+    unittest.main()
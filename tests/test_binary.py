@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+import unittest
+
+from autoservice_binary import HEADER, MAGIC, SnapshotError, decode_snapshot, decode_snapshot_head, encode_snapshot
+from autoservice_records import make_records, plain_copy
+from autoservice_storage import ENTITY_TYPES, read_snapshot, write_snapshot
+
+
+def sample_data():
+    """Данные со всеми видами столбцов: числа, строки, списки, строки заказов, пропуски"""
+    return {
+        'clients': [
+            {'id': 1, 'fio': 'Иванов Иван', 'phone': '+7 900 000-00-01', 'email': ''},
+            {'id': 2, 'fio': 'Петров Петр', 'phone': '', 'email': 'petrov@example.com', 'note': 'VIP'}
+        ],
+        'cars': [
+            {'id': 1, 'vin': 'XTA21099000000001', 'brand': 'Lada', 'model': 'Vesta', 'client_id': 1}
+        ],
+        'parts': [
+            {'id': 1, 'name': 'Свеча зажигания', 'price': 450, 'quantity': 10},
+            {'id': 2, 'name': 'Масло моторное 4л', 'price': 3200.5, 'quantity': 0}
+        ],
+        'orders': [
+            {
+                'id': 1, 'date': '2024-01-15 10:00:00', 'client_id': 1, 'car_id': 1,
+                'works': ['Замена свечей', 'Диагностика'],
+                'parts': [{'part_id': 1, 'name': 'Свеча зажигания', 'price': 450, 'quantity': 4}],
+                'status': 'готово', 'total': 3800
+            },
+            {
+                'id': 2, 'date': '2024-02-01 09:30:00', 'client_id': 2, 'car_id': None,
+                'works': [], 'parts': [], 'status': 'в работе', 'total': 0.0
+            }
+        ],
+        'next_ids': {'client': 3, 'car': 2, 'order': 3, 'part': 3}
+    }
+
+
+def as_plain(data):
+    """Данные без записей Record - для сравнения"""
+    return {key: plain_copy(value) for key, value in data.items()}
+
+
+class SnapshotRoundTripTest(unittest.TestCase):
+    def test_round_trip(self):
+        for compression in ('none', 'zlib', 'lzma'):
+            with self.subTest(compression=compression):
+                data = sample_data()
+                decoded = decode_snapshot(encode_snapshot(data, compression))
+                self.assertEqual(as_plain(decoded), data)
+
+    def test_round_trip_records(self):
+        data = sample_data()
+        for entity in ENTITY_TYPES:
+            make_records(entity, data[entity])
+        decoded = decode_snapshot(encode_snapshot(data))
+        self.assertEqual(as_plain(decoded), sample_data())
+
+    def test_number_types_kept(self):
+        data = sample_data()
+        data['parts'] = [
+            {'id': 1, 'name': 'a', 'price': 10, 'quantity': 1},
+            {'id': 2, 'name': 'b', 'price': 10.0, 'quantity': 2 ** 70}
+        ]
+        parts = decode_snapshot(encode_snapshot(data))['parts']
+        self.assertIs(type(parts[0]['price']), int)
+        self.assertIs(type(parts[1]['price']), float)
+        self.assertEqual(parts[1]['quantity'], 2 ** 70)
+
+    def test_head_without_orders(self):
+        data, orders = decode_snapshot_head(encode_snapshot(sample_data()))
+        self.assertEqual(data['orders'], [])
+        self.assertEqual(plain_copy(orders()), sample_data()['orders'])
+
+    def test_write_and_read_file(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'data')
+            write_snapshot(path, sample_data(), 'binary', 'zlib')
+            self.assertEqual(as_plain(read_snapshot(path)), sample_data())
+            write_snapshot(path, sample_data(), 'json')
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f), sample_data())
+
+
+class SnapshotCorruptionTest(unittest.TestCase):
+    def test_truncated(self):
+        content = encode_snapshot(sample_data())
+        for size in (len(content) - 1, len(content) // 2, HEADER.size + 3):
+            with self.subTest(size=size):
+                with self.assertRaises(SnapshotError):
+                    decode_snapshot(content[:size])
+
+    def test_bad_magic_version_and_compression(self):
+        content = encode_snapshot(sample_data())
+        for header in (
+            HEADER.pack(b'XXXX', 1, 0, 5),
+            HEADER.pack(MAGIC, 99, 0, 5),
+            HEADER.pack(MAGIC, 1, 7, 5)
+        ):
+            with self.subTest(header=header):
+                with self.assertRaises(SnapshotError):
+                    decode_snapshot(header + content[HEADER.size:])
+
+    def test_damaged_compressed_section(self):
+        content = bytearray(encode_snapshot(sample_data(), 'zlib'))
+        content[-10] ^= 0xff
+        with self.assertRaises(SnapshotError):
+            decode_snapshot(bytes(content))
+
+    def test_damaged_column(self):
+        content = encode_snapshot(sample_data())
+        # Вид и длина столбца ФИО клиентов идут сразу после имени столбца
+        pos = content.index(b'\x03fio') + 4
+        for damage in (b'?', b'i' + (10 ** 6).to_bytes(8, 'little')):
+            with self.subTest(damage=damage):
+                damaged = content[:pos] + damage + content[pos + len(damage):]
+                with self.assertRaises(SnapshotError):
+                    decode_snapshot(damaged)
+
+
+if __name__ == '__main__':
+    unittest.main()
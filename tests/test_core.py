@@ -0,0 +1,125 @@
+import unittest
+
+from autoservice_core import (
+    WORK_PRICE, AutoserviceService, ReservationLedger, ServiceError, StockError, ValidationError, change_stock
+)
+from autoservice_records import plain_copy
+from autoservice_storage import empty_data
+from autoservice_store import DataStore
+
+
+def sample_data():
+    """Клиент с автомобилем и две запчасти"""
+    data = empty_data()
+    data['clients'] = [{'id': 1, 'fio': 'Иванов Иван', 'phone': '+7 900 000-00-01', 'email': ''}]
+    data['cars'] = [{'id': 1, 'vin': 'XTA21099000000001', 'brand': 'Lada', 'model': 'Vesta', 'client_id': 1}]
+    data['parts'] = [
+        {'id': 1, 'name': 'Свеча', 'price': 450, 'quantity': 10},
+        {'id': 2, 'name': 'Фильтр', 'price': 250, 'quantity': 3}
+    ]
+    data['next_ids'] = {'client': 2, 'car': 2, 'order': 1, 'part': 3}
+    return data
+
+
+class ChangeStockTest(unittest.TestCase):
+    def setUp(self):
+        self.store = DataStore(sample_data())
+
+    def test_all_changes_applied(self):
+        change_stock(self.store, [(self.store.get('parts', 1), -4), (self.store.get('parts', 2), 2)])
+        self.assertEqual([p['quantity'] for p in self.store.all('parts')], [6, 5])
+        self.assertEqual(len(self.store.changes), 2)
+
+    def test_rollback_on_unique_constraint(self):
+        candle, filter_part = self.store.get('parts', 1), self.store.get('parts', 2)
+        # Название изменено на месте в обход проверки: update второй запчасти отклонится
+        filter_part['name'] = 'свеча'
+        with self.assertRaises(ServiceError):
+            change_stock(self.store, [(candle, -4), (filter_part, -1)])
+        self.assertEqual(candle['quantity'], 10)
+        self.assertEqual(filter_part['quantity'], 3)
+        # В журнал попадает и возврат остатка первой запчасти
+        self.assertEqual(plain_copy(self.store.changes[-1]['record'])['quantity'], 10)
+        self.assertEqual(self.store.find_unique('parts', 'name', 'Фильтр'), 2)
+
+
+class ReservationLedgerTest(unittest.TestCase):
+    def setUp(self):
+        self.store = DataStore(sample_data())
+        self.service = AutoserviceService(self.store)
+        self.ledger = ReservationLedger(self.store)
+        self.candle, self.filter_part = self.store.get('parts', 1), self.store.get('parts', 2)
+
+    def test_reserve_and_release(self):
+        self.assertFalse(self.ledger)
+        self.ledger.reserve(self.candle, 4)
+        self.ledger.reserve(self.candle, 2)
+        self.ledger.reserve(self.filter_part, 1)
+        self.assertTrue(self.ledger)
+        self.assertEqual(self.ledger.reserved(1), 6)
+        self.assertEqual(self.ledger.available(self.candle), 4)
+        self.assertEqual(self.ledger.total(), 6 * 450 + 250)
+        with self.assertRaises(StockError):
+            self.ledger.reserve(self.candle, 5)
+        self.assertEqual(self.ledger.reserved(1), 6)
+        self.assertEqual(self.ledger.release(1)['quantity'], 6)
+        self.assertEqual(self.ledger.available(self.candle), 10)
+        self.assertEqual([line['part_id'] for line in self.ledger.lines()], [2])
+        # Резерв не меняет склад
+        self.assertEqual(self.candle['quantity'], 10)
+        self.assertEqual(self.store.changes, [])
+
+    def test_commit(self):
+        self.ledger.reserve(self.candle, 4)
+        self.ledger.reserve(self.filter_part, 3)
+        lines = self.ledger.commit()
+        self.assertEqual([(line['part_id'], line['quantity']) for line in lines], [(1, 4), (2, 3)])
+        self.assertEqual((self.candle['quantity'], self.filter_part['quantity']), (6, 0))
+        self.assertFalse(self.ledger)
+
+    def test_commit_short_stock_changes_nothing(self):
+        self.ledger.reserve(self.candle, 4)
+        self.ledger.reserve(self.filter_part, 3)
+        # Остаток уменьшился после резервирования (например, другим заказом)
+        self.filter_part['quantity'] = 2
+        with self.assertRaises(StockError):
+            self.ledger.commit()
+        self.assertEqual(self.candle['quantity'], 10)
+        self.assertEqual(self.ledger.reserved(1), 4)
+        self.assertEqual(self.store.changes, [])
+
+    def test_create_order(self):
+        self.service.reserve(self.ledger, 1, 2)
+        order = self.service.create_order(1, 1, ['Замена свечей', ' '], self.ledger)
+        self.assertEqual(order['total'], 2 * 450 + WORK_PRICE)
+        self.assertEqual(order['parts'][0]['quantity'], 2)
+        self.assertEqual(self.candle['quantity'], 8)
+        self.assertEqual(self.store.count_part_usage(1), 1)
+        with self.assertRaises(ValidationError):
+            self.service.reserve(self.ledger, 1, 0)
+
+
+class ServiceUniqueTest(unittest.TestCase):
+    def setUp(self):
+        self.store = DataStore(sample_data())
+        self.service = AutoserviceService(self.store)
+
+    def test_duplicate_vin_rejected_without_changes(self):
+        self.service.add_car(1, 'XTA21099000000002', 'Lada', 'Granta')
+        with self.assertRaises(ValidationError):
+            self.service.update_car(2, 'xta21099000000001 ', 'Lada', 'Granta')
+        self.assertEqual(self.store.get('cars', 2)['vin'], 'XTA21099000000002')
+        self.assertEqual(self.store.find_unique('cars', 'vin', 'XTA21099000000002'), 2)
+
+    def test_duplicate_phone_and_part_name(self):
+        with self.assertRaises(ValidationError):
+            self.service.add_client('Петров Петр', '89000000001')
+        with self.assertRaises(ValidationError):
+            self.service.add_part('  СВЕЧА ', 100, 1)
+        self.assertEqual(self.store.count('clients'), 1)
+        self.assertEqual(self.store.count('parts'), 2)
+        self.assertEqual(self.store.data['next_ids'], sample_data()['next_ids'])
+
+
+if __name__ == '__main__':
+    unittest.main()
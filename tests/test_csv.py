@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+
+from autoservice_csv import import_csv, import_rows
+from autoservice_storage import empty_data
+from autoservice_store import DataStore
+
+
+def sample_store():
+    """Хранилище с одним клиентом, автомобилем и запчастью"""
+    data = empty_data()
+    data['clients'] = [{'id': 1, 'fio': 'Иванов Иван', 'phone': '+7 900 000-00-01', 'email': ''}]
+    data['cars'] = [{'id': 1, 'vin': 'XTA21099000000001', 'brand': 'Lada', 'model': 'Vesta', 'client_id': 1}]
+    data['parts'] = [{'id': 1, 'name': 'Свеча', 'price': 450, 'quantity': 10}]
+    data['next_ids'] = {'client': 2, 'car': 2, 'order': 1, 'part': 2}
+    return DataStore(data)
+
+
+class SavingStore(DataStore):
+    """Хранилище, считающее вызовы save"""
+
+    saves = 0
+
+    def save(self):
+        self.saves += 1
+
+
+class ImportRowsTest(unittest.TestCase):
+    def setUp(self):
+        self.store = sample_store()
+
+    def test_clients(self):
+        rows = [
+            {'fio': 'Петров Петр', 'phone': '+7 900 000-00-02'},
+            {'fio': '  ', 'phone': '+7 900 000-00-03'},
+            {'fio': 'Сидоров Сидор', 'phone': '8 900 000 00 01'},
+            {'fio': 'Смирнов Олег', 'phone': '79000000002'},
+            {'fio': 'Козлов Павел'}
+        ]
+        imported, rejected = import_rows(self.store, 'clients', rows)
+        self.assertEqual(imported, 2)
+        self.assertEqual([line for line, message in rejected], [3, 4, 5])
+        self.assertIn("ФИО", rejected[0][1])
+        self.assertEqual([c['fio'] for c in self.store.all('clients')], ['Иванов Иван', 'Петров Петр', 'Козлов Павел'])
+
+    def test_duplicates_inside_one_batch(self):
+        rows = [{'fio': 'Петров Петр', 'phone': '111'}, {'fio': 'Петров Павел', 'phone': '111'}]
+        imported, rejected = import_rows(self.store, 'clients', rows, batch_size=10)
+        self.assertEqual(imported, 1)
+        self.assertEqual([line for line, message in rejected], [3])
+        self.assertEqual(self.store.count('clients'), 2)
+
+    def test_cars(self):
+        rows = [
+            {'vin': 'xta21099000000002', 'brand': 'Lada', 'model': 'Granta', 'client_id': '1'},
+            {'vin': 'XTA21099000000001', 'brand': 'Lada', 'model': 'Vesta', 'client_id': '1'},
+            {'vin': 'XTA21099000000003', 'brand': 'Lada', 'model': 'Niva', 'client_phone': '8 (900) 000-00-01'},
+            {'vin': 'XTA21099000000004', 'brand': 'Lada', 'model': 'Niva', 'client_id': '7'},
+            {'vin': 'XTA21099000000005', 'brand': 'Lada', 'model': 'Niva', 'client_id': 'x'},
+            {'vin': 'XTA21099000000006', 'brand': '', 'model': 'Niva', 'client_id': '1'},
+            {'vin': 'XTA21099000000007', 'brand': 'Lada', 'model': 'Niva'}
+        ]
+        imported, rejected = import_rows(self.store, 'cars', rows)
+        self.assertEqual(imported, 2)
+        self.assertEqual([line for line, message in rejected], [3, 5, 6, 7, 8])
+        self.assertEqual(self.store.get('cars', 2)['vin'], 'XTA21099000000002')
+        self.assertEqual(self.store.count_cars(1), 3)
+
+    def test_parts(self):
+        rows = [
+            {'name': 'Фильтр', 'price': '250,5', 'quantity': '3'},
+            {'name': 'Ремень', 'price': '0', 'quantity': '1'},
+            {'name': 'Колодки', 'price': '2500', 'quantity': '-1'},
+            {'name': 'Масло', 'price': 'дорого', 'quantity': '1'},
+            {'name': 'свеча', 'price': '100', 'quantity': '1'},
+            {'name': 'Лампа', 'price': '90', 'quantity': '0'}
+        ]
+        imported, rejected = import_rows(self.store, 'parts', rows)
+        self.assertEqual(imported, 2)
+        self.assertEqual([line for line, message in rejected], [3, 4, 5, 6])
+        self.assertEqual(self.store.get('parts', 2)['price'], 250.5)
+        self.assertEqual(self.store.data['next_ids']['part'], 4)
+
+
+class ImportCsvTest(unittest.TestCase):
+    def test_file_saved_once(self):
+        data = sample_store().data
+        store = SavingStore(data)
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'parts.csv')
+            with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+                f.write('name;price;quantity\r\n')
+                for number in range(2500):
+                    f.write(f'Деталь {number};{number + 1};{number % 7}\r\n')
+                f.write('Деталь 5;10;1\r\n')
+            imported, rejected = import_csv(store, 'parts', path, delimiter=';')
+        self.assertEqual(imported, 2500)
+        self.assertEqual(rejected, [(2502, "Запчасть с таким названием уже существует")])
+        self.assertEqual(store.saves, 1)
+        self.assertEqual(store.count('parts'), 2501)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import random
+import time
+import unittest
+
+from autoservice_search import TOKEN, SearchIndex, normalize, tokenize
+
+CLIENTS_COUNT = 100000
+
+
+def synthetic_clients(count, seed=0):
+    """Клиенты с телефонами в разных форматах записи"""
+    rng = random.Random(seed)
+    names = ['Иванов', 'Петров', 'Сидоров', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев', 'Ёлкин']
+    formats = ['+7 9{0:02d} {1:03d}-{2:04d}', '8 (9{0:02d}) {1:03d} {2:04d}', '79{0:02d}{1:03d}{2:04d}']
+    clients = []
+    for client_id in range(1, count + 1):
+        parts = (client_id // 10000000 % 100, client_id // 10000 % 1000, client_id % 10000)
+        clients.append({
+            'id': client_id,
+            'fio': f"{rng.choice(names)} Иван",
+            'phone': rng.choice(formats).format(*parts),
+            'email': f"{rng.choice(['ivan', 'petr', 'olga'])}@example.com" if client_id % 3 else ''
+        })
+    return clients
+
+
+def client_terms(client):
+    """Слова и строки цифр клиента - как их видит индекс"""
+    return client['id'], tokenize('\n'.join(str(client.get(field) or '') for field in ('fio', 'phone', 'email')))
+
+
+def brute_force(terms_by_client, query):
+    """id клиентов, у которых каждое слово запроса - префикс слова или строки цифр"""
+    terms = set(TOKEN.findall(normalize(query)))
+    return {
+        client_id for client_id, (tokens, digits) in terms_by_client
+        if all(
+            any(token.startswith(term) for token in tokens)
+            or term.isdecimal() and any(line_digits.startswith(term) for line_digits in digits)
+            for term in terms
+        )
+    }
+
+
+class SearchIndexTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.clients = synthetic_clients(CLIENTS_COUNT)
+        cls.index = SearchIndex.build('clients', cls.clients)
+        cls.terms = [client_terms(client) for client in cls.clients]
+
+    def test_phone_digits_kept_out_of_words(self):
+        # Строки цифр телефонов (и телефоны без разделителей) не раздувают список слов
+        self.assertLess(len(self.index.tokens), 20000)
+        self.assertEqual(len(self.index.digits), CLIENTS_COUNT)
+
+    def test_queries_match_brute_force(self):
+        for query in ('+7 900', '7', '8 (900) 001', '79000010', '900 000-00', 'ёлкин 7', 'иван 9000', 'olga@'):
+            with self.subTest(query=query):
+                self.assertEqual(self.index.search(query), brute_force(self.terms, query))
+
+    def test_phone_prefix_is_fast(self):
+        # Раньше префикс "7" объединял множества по всем клиентам (~160 мс)
+        start = time.perf_counter()
+        for _ in range(5):
+            self.index.search('+7 900')
+        self.assertLess((time.perf_counter() - start) / 5, 0.1)
+
+    def test_update_and_remove(self):
+        index = SearchIndex.build('clients', self.clients[:1000])
+        client = dict(self.clients[10], phone='+7 111 222-33-44')
+        index.update(client)
+        self.assertEqual(index.search('7111'), {client['id']})
+        self.assertNotIn(client['id'], index.search(self.clients[10]['phone']))
+        index.remove(client['id'])
+        self.assertEqual(index.search('7111'), set())
+        self.assertNotIn(client['id'], index.record_digits)
+        self.assertEqual(len(index.digits), 999)
+
+
+if __name__ == '__main__':
+    unittest.main()
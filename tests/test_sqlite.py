@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from autoservice_archive import ARCHIVE_DIR, OrderArchive
+from autoservice_core import AutoserviceService, IntegrityError
+from autoservice_sqlite import SqliteStore, import_json
+from autoservice_storage import empty_data, write_snapshot
+
+
+def order(order_id, date, car_id, part_id, status='готово'):
+    """Заказ с одной запчастью"""
+    return {
+        'id': order_id, 'date': date, 'client_id': 1, 'car_id': car_id,
+        'works': ['Диагностика'],
+        'parts': [{'part_id': part_id, 'name': 'Свеча', 'price': 450, 'quantity': 1}],
+        'status': status, 'total': 2450
+    }
+
+
+class ImportJsonTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.workdir.name, 'data.json')
+        self.db_path = os.path.join(self.workdir.name, 'data.db')
+        data = empty_data()
+        data['clients'] = [{'id': 1, 'fio': 'Иванов Иван', 'phone': '', 'email': ''}]
+        data['cars'] = [
+            {'id': 1, 'vin': 'XTA21099000000001', 'brand': 'Lada', 'model': 'Vesta', 'client_id': 1},
+            {'id': 2, 'vin': 'XTA21099000000002', 'brand': 'Lada', 'model': 'Granta', 'client_id': 1}
+        ]
+        data['parts'] = [
+            {'id': 1, 'name': 'Свеча', 'price': 450, 'quantity': 10},
+            {'id': 2, 'name': 'Фильтр', 'price': 250, 'quantity': 5}
+        ]
+        data['orders'] = [order(3, '2024-03-01 10:00:00', 1, 1, 'в работе')]
+        data['next_ids'] = {'client': 2, 'car': 3, 'order': 4, 'part': 3}
+        write_snapshot(self.json_path, data, 'json')
+        # Архивные заказы - единственные, где встречаются автомобиль 2 и запчасть 2
+        OrderArchive(os.path.join(self.workdir.name, ARCHIVE_DIR)).add([
+            order(1, '2023-11-05 09:00:00', 2, 2),
+            order(2, '2023-12-20 15:30:00', 2, 1)
+        ])
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def test_archived_orders_imported(self):
+        counts = import_json(self.json_path, self.db_path)
+        self.assertEqual(counts['orders'], 3)
+        store = SqliteStore(self.db_path)
+        try:
+            self.assertEqual([o['id'] for o in store.all('orders')], [1, 2, 3])
+            self.assertEqual(store.get('orders', 1)['parts'][0]['part_id'], 2)
+            service = AutoserviceService(store)
+            with self.assertRaises(IntegrityError):
+                service.delete_part(2)
+            with self.assertRaises(IntegrityError):
+                service.delete_car(2)
+            self.assertEqual(store.next_id('order'), 4)
+        finally:
+            store.close()
+
+    def test_no_side_files(self):
+        import_json(self.json_path, self.db_path)
+        names = sorted(os.listdir(self.workdir.name))
+        self.assertEqual([n for n in names if n.startswith('data.json')], ['data.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from autoservice_records import plain_copy
+from autoservice_storage import BackgroundWriter, JournalStorage, JsonStorage, empty_data, read_journal, read_snapshot
+
+
+def part(part_id, name, price=100, quantity=1):
+    """Словарь запчасти"""
+    return {'id': part_id, 'name': name, 'price': price, 'quantity': quantity}
+
+
+def put(record, entity='parts'):
+    """Запись журнала о добавлении или изменении записи"""
+    return {'op': 'put', 'entity': entity, 'record': record}
+
+
+def delete(record_id, entity='parts'):
+    """Запись журнала об удалении записи"""
+    return {'op': 'delete', 'entity': entity, 'id': record_id}
+
+
+class JournalStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.workdir.name, 'data.json')
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def save(self, *changes):
+        """Загрузка, сохранение изменений и закрытие хранилища"""
+        storage = JournalStorage(self.path)
+        storage.save(storage.load(), list(changes))
+        storage.close()
+
+    def load(self):
+        """Данные, загруженные в режиме журнала"""
+        storage = JournalStorage(self.path)
+        try:
+            return storage.load()
+        finally:
+            storage.close()
+
+    def test_replay(self):
+        self.save(put(part(1, 'Свеча', 450, 10)), put(part(2, 'Фильтр', 250, 3)))
+        self.save(put(part(1, 'Свеча', 450, 7)), delete(2))
+        self.assertFalse(os.path.exists(self.path))
+        data = self.load()
+        self.assertEqual(plain_copy(data['parts']), [part(1, 'Свеча', 450, 7)])
+        self.assertEqual(data['next_ids']['part'], 3)
+
+    def test_replay_is_idempotent(self):
+        self.save(put(part(1, 'Свеча', 450, 10)), delete(1), put(part(1, 'Свеча', 450, 9)))
+        with open(self.path + '.journal', encoding='utf-8') as f:
+            lines = f.read()
+        with open(self.path + '.journal', 'a', encoding='utf-8') as f:
+            f.write(lines)
+        self.assertEqual(plain_copy(self.load()['parts']), [part(1, 'Свеча', 450, 9)])
+
+    def test_torn_tail_repaired(self):
+        self.save(put(part(1, 'Свеча', 450, 10)))
+        with open(self.path + '.journal', 'ab') as f:
+            f.write('{"op": "put", "entity": "parts", "record": {"id": 2, "name": "Фил'.encode('utf-8'))
+        self.assertEqual(plain_copy(self.load()['parts']), [part(1, 'Свеча', 450, 10)])
+        # Оборванная запись отрезана, следующая дописывается с новой строки
+        with open(self.path + '.journal', 'rb') as f:
+            self.assertTrue(f.read().endswith(b'\n'))
+        self.save(put(part(3, 'Ремень', 3500, 1)))
+        self.assertEqual([p['id'] for p in self.load()['parts']], [1, 3])
+
+    def test_compaction(self):
+        storage = JournalStorage(self.path, compact_threshold=2)
+        data = storage.load()
+        storage.save(data, [put(part(1, 'Свеча', 450, 10))])
+        storage.save(data, [put(part(2, 'Фильтр', 250, 3)), delete(1)])
+        storage.wait()
+        storage.save(data, [put(part(2, 'Фильтр', 250, 2))])
+        storage.close()
+        self.assertFalse(os.path.exists(self.path + '.journal.compacting'))
+        self.assertEqual(plain_copy(read_snapshot(self.path)['parts']), [part(2, 'Фильтр', 250, 3)])
+        self.assertEqual(list(read_journal(self.path + '.journal')), [put(part(2, 'Фильтр', 250, 2))])
+        self.assertEqual(plain_copy(self.load()['parts']), [part(2, 'Фильтр', 250, 2)])
+
+    def test_interrupted_compaction(self):
+        # Сбой после переименования журнала: .compacting применяется при загрузке
+        self.save(put(part(1, 'Свеча', 450, 10)))
+        os.replace(self.path + '.journal', self.path + '.journal.compacting')
+        self.save(put(part(1, 'Свеча', 450, 8)))
+        self.assertEqual(plain_copy(self.load()['parts']), [part(1, 'Свеча', 450, 8)])
+        storage = JournalStorage(self.path)
+        storage.compact()
+        storage.close()
+        self.assertEqual(plain_copy(read_snapshot(self.path)['parts']), [part(1, 'Свеча', 450, 10)])
+        self.assertEqual(plain_copy(self.load()['parts']), [part(1, 'Свеча', 450, 8)])
+
+    def test_json_mode_reads_and_folds_journal(self):
+        self.save(put(part(1, 'Свеча', 450, 10)))
+        storage = JsonStorage(self.path)
+        data = storage.load()
+        self.assertEqual(plain_copy(data['parts']), [part(1, 'Свеча', 450, 10)])
+        data['parts'].append(part(2, 'Фильтр', 250, 3))
+        storage.save(data)
+        self.assertFalse(os.path.exists(self.path + '.journal'))
+        self.assertEqual([p['id'] for p in self.load()['parts']], [1, 2])
+
+
+class BlockingStorage(JsonStorage):
+    """Хранилище, запись которого ждет разрешения теста"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def save_snapshot(self, content):
+        self.writing.set()
+        self.release.wait(5)
+        super().save_snapshot(content)
+
+
+class BackgroundWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.workdir.name, 'data.json')
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def test_data_lock_free_during_disk_write(self):
+        storage = BlockingStorage(self.path)
+        writer = BackgroundWriter(storage, delay=0, max_delay=0)
+        data = empty_data()
+        data['clients'].append({'id': 1, 'fio': 'Иванов Иван', 'phone': '', 'email': ''})
+        writer.save(data)
+        self.assertTrue(storage.writing.wait(5))
+        # Пока файл пишется, данные можно менять: в снимок они уже не попадут
+        self.assertTrue(writer.data_lock.acquire(timeout=1))
+        data['clients'][0]['fio'] = 'Петров Петр'
+        writer.data_lock.release()
+        storage.release.set()
+        writer.close()
+        self.assertEqual(read_snapshot(self.path)['clients'][0]['fio'], 'Иванов Иван')
+
+
+if __name__ == '__main__':
+    unittest.main()
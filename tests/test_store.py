@@ -0,0 +1,179 @@
+import os
+import tempfile
+import unittest
+
+from autoservice_storage import JournalStorage, empty_data, write_snapshot
+from autoservice_store import DataStore, UniqueConstraintError
+
+
+def sample_data():
+    """Клиент, автомобиль, запчасть и три заказа"""
+    data = empty_data()
+    data['clients'] = [{'id': 1, 'fio': 'Иванов Иван', 'phone': '+7 900 000-00-01', 'email': ''}]
+    data['cars'] = [{'id': 1, 'vin': 'XTA21099000000001', 'brand': 'Lada', 'model': 'Vesta', 'client_id': 1}]
+    data['parts'] = [{'id': 1, 'name': 'Свеча', 'price': 450, 'quantity': 10}]
+    data['orders'] = [
+        {
+            'id': order_id, 'date': '2024-01-15 10:00:00', 'client_id': 1, 'car_id': 1, 'works': [],
+            'parts': [{'part_id': 1, 'name': 'Свеча', 'price': 450, 'quantity': 1}],
+            'status': 'в работе', 'total': 450
+        }
+        for order_id in (1, 2, 3)
+    ]
+    data['next_ids'] = {'client': 2, 'car': 2, 'order': 4, 'part': 2}
+    return data
+
+
+class IdIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.store = DataStore(sample_data())
+
+    def test_get_after_load(self):
+        for entity in ('clients', 'cars', 'orders', 'parts'):
+            for record in self.store.all(entity):
+                self.assertIs(self.store.get(entity, record['id']), record)
+        self.assertIsNone(self.store.get('clients', 99))
+        self.assertEqual(self.store.get('clients', 99, 'нет'), 'нет')
+
+    def test_insert_update_delete(self):
+        client = self.store.insert('clients', {'id': 2, 'fio': 'Петров Петр', 'phone': '', 'email': ''})
+        self.assertIs(self.store.get('clients', 2), client)
+        client['fio'] = 'Петров Павел'
+        self.store.update('clients', client)
+        self.assertEqual(self.store.get('clients', 2)['fio'], 'Петров Павел')
+        self.assertIs(self.store.delete('clients', 2), client)
+        self.assertIsNone(self.store.get('clients', 2))
+        self.assertEqual([c['id'] for c in self.store.all('clients')], [1])
+        self.assertIsNone(self.store.delete('clients', 2))
+
+    def test_extend(self):
+        self.store.extend('parts', [{'id': 5, 'name': 'Фильтр', 'price': 250, 'quantity': 3}])
+        self.assertEqual(self.store.get('parts', 5)['name'], 'Фильтр')
+        self.assertEqual(self.store.count('parts'), 2)
+
+
+class ForeignKeyIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.store = DataStore(sample_data())
+        self.store.insert('parts', {'id': 2, 'name': 'Фильтр', 'price': 250, 'quantity': 3})
+
+    def test_counts_after_load(self):
+        self.assertEqual(self.store.count_cars(1), 1)
+        self.assertEqual(self.store.count_orders(1), 3)
+        self.assertEqual(self.store.count_part_usage(1), 3)
+        self.assertEqual(self.store.count_cars(2), 0)
+        self.assertEqual(self.store.count_part_usage(2), 0)
+
+    def test_car_moves_between_clients(self):
+        self.store.insert('clients', {'id': 2, 'fio': 'Петров Петр', 'phone': '', 'email': ''})
+        car = self.store.get('cars', 1)
+        car['client_id'] = 2
+        self.store.update('cars', car)
+        self.assertEqual(self.store.count_cars(1), 0)
+        self.assertEqual([c['id'] for c in self.store.cars_of_client(2)], [1])
+        self.store.delete('cars', 1)
+        self.assertEqual(self.store.count_cars(2), 0)
+
+    def test_order_lines_change(self):
+        order = self.store.get('orders', 1)
+        order['parts'] = [
+            {'part_id': 2, 'name': 'Фильтр', 'price': 250, 'quantity': 1},
+            {'part_id': 2, 'name': 'Фильтр', 'price': 250, 'quantity': 1}
+        ]
+        order['car_id'] = None
+        self.store.update('orders', order)
+        self.assertEqual(self.store.count_part_usage(1), 2)
+        self.assertEqual(self.store.count_part_usage(2), 2)
+        self.assertEqual(self.store.count_orders(1), 2)
+        self.store.delete('orders', 1)
+        self.assertEqual(self.store.count_part_usage(2), 0)
+        self.store.delete('orders', 2)
+        self.assertEqual(self.store.count_orders(1), 1)
+        self.assertEqual(self.store.count_part_usage(1), 1)
+
+    def test_new_order(self):
+        self.store.insert('orders', {
+            'id': 4, 'date': '2024-02-01 09:00:00', 'client_id': 1, 'car_id': 1, 'works': [],
+            'parts': [{'part_id': 2, 'name': 'Фильтр', 'price': 250, 'quantity': 2}],
+            'status': 'в работе', 'total': 500
+        })
+        self.assertEqual(self.store.count_orders(1), 4)
+        self.assertEqual(self.store.count_part_usage(2), 1)
+
+
+class UniqueConstraintTest(unittest.TestCase):
+    def setUp(self):
+        self.store = DataStore(sample_data())
+
+    def test_rejected_insert_leaves_no_trace(self):
+        with self.assertRaises(UniqueConstraintError):
+            self.store.insert('clients', {'id': 2, 'fio': 'Петров Петр', 'phone': '8 (900) 000-00-01', 'email': ''})
+        with self.assertRaises(UniqueConstraintError):
+            self.store.insert('cars', {'id': 2, 'vin': ' xta21099000000001', 'brand': 'Lada', 'model': 'Granta', 'client_id': 1})
+        self.assertIsNone(self.store.get('clients', 2))
+        self.assertEqual(self.store.count('cars'), 1)
+        self.assertEqual(self.store.changes, [])
+        self.assertEqual(self.store.find_unique('clients', 'phone', '+79000000001'), 1)
+
+    def test_rejected_update_keeps_index(self):
+        self.store.insert('parts', {'id': 2, 'name': 'Фильтр', 'price': 250, 'quantity': 3})
+        part = self.store.get('parts', 2)
+        with self.assertRaises(UniqueConstraintError):
+            self.store.check_unique('parts', {'name': 'свеча'}, 2)
+        self.assertEqual(self.store.find_unique('parts', 'name', 'Фильтр'), 2)
+        part['name'] = 'Фильтр масляный'
+        self.store.update('parts', part)
+        self.assertEqual(self.store.find_unique('parts', 'name', 'Фильтр'), None)
+        self.assertEqual(self.store.find_unique('parts', 'name', 'фильтр  масляный'), 2)
+
+    def test_existing_duplicates_do_not_block_other_changes(self):
+        data = sample_data()
+        data['parts'].append({'id': 2, 'name': 'СВЕЧА', 'price': 450, 'quantity': 1})
+        store = DataStore(data)
+        part = store.get('parts', 2)
+        part['quantity'] = 0
+        store.update('parts', part)
+        self.assertEqual(store.unique_indexes['parts'].find('name', 'свеча'), {1, 2})
+
+
+class LazyOrdersTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.workdir.name, 'data.json')
+        write_snapshot(path, sample_data(), 'json')
+        self.storage = JournalStorage(path)
+        data, orders = self.storage.load_partial()
+        self.store = DataStore(data, self.storage)
+        self.store.pending_orders = orders
+        self.store.orders_loaded = False
+
+    def tearDown(self):
+        self.storage.close()
+        self.workdir.cleanup()
+
+    def test_discard_after_failed_load(self):
+        for orders, progress in self.store.pending_orders:
+            self.store.extend('orders', orders[:2])
+            break
+        self.assertEqual(self.store.count_orders(1), 2)
+        self.store.discard_orders()
+        self.assertIsNone(self.store.pending_orders)
+        self.assertEqual(self.store.all('orders'), [])
+        self.assertIsNone(self.store.get('orders', 1))
+        self.assertEqual(self.store.count_orders(1), 0)
+        self.assertEqual(self.store.count_part_usage(1), 0)
+
+    def test_reload_orders(self):
+        for orders, progress in self.store.pending_orders:
+            self.store.extend('orders', orders[:1])
+            break
+        self.store.reload_orders()
+        for orders, progress in self.store.pending_orders:
+            self.store.extend('orders', orders)
+        self.assertEqual([order['id'] for order in self.store.all('orders')], [1, 2, 3])
+        self.assertEqual(self.store.count_orders(1), 3)
+        self.assertEqual(self.store.count_part_usage(1), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()